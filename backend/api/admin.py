@@ -0,0 +1,28 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from recipes.admin import ScalableAdmin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(ScalableAdmin):
+    list_display = (
+        'id', 'name', 'status', 'attempts', 'run_at', 'finished_at',
+        'locked_by'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    readonly_fields = (
+        'attempts', 'locked_at', 'locked_by', 'created_at', 'finished_at'
+    )
+    actions = ('requeue',)
+
+    @admin.action(description='Поставить в очередь повторно')
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            finished_at=None, error=''
+        )
+        self.message_user(request, f'В очередь поставлено задач: {updated}.')
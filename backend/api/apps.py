@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
+
+        if settings.STARTUP_WARMUP:
+            from .warmup import warm_up
+
+            warm_up()
@@ -0,0 +1,80 @@
+"""
+Асинхронные вьюхи для запуска под ASGI (backend/asgi.py).
+
+Django 3.2 выполняет синхронные вьюхи под ASGI в одном потоке
+на процесс. Чтение рецептов, тегов и ингредиентов и выгрузка списка
+покупок вместо этого выполняются в пуле из ASYNC_VIEW_THREADS
+потоков, а цикл событий тем временем принимает тела запросов и отдаёт
+ответы медленным клиентам. У каждого потока пула своё соединение
+с базой, поэтому соединений на процесс не больше размера пула.
+"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from .connections import check_connections
+from .profiling import profile_view
+
+ASYNC_VIEW_NAMES = (
+    'recipes-list',
+    'recipes-detail',
+    'recipes-download-shopping-cart',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_VIEW_THREADS, thread_name_prefix='api-view'
+)
+
+
+def render_view(view, request, *args, **kwargs):
+    """Ответ DRF отрисовывается здесь же, а не в потоке Django."""
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def run_view(view, request, *args, **kwargs):
+    """
+    Вьюха в потоке пула. Сигналы начала и конца запроса приходят
+    в другой поток, поэтому соединения потока проверяются здесь.
+    """
+    close_old_connections()
+    check_connections()
+    try:
+        return profile_view(
+            request, functools.partial(render_view, view), *args, **kwargs
+        )
+    finally:
+        close_old_connections()
+
+
+def as_async_view(view):
+    run = sync_to_async(run_view, thread_sensitive=False, executor=executor)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run(view, request, *args, **kwargs)
+
+    # Для вызова из синхронного кода, например из BatchView.
+    async_view.sync_view = view
+    return async_view
+
+
+def get_async_urls(urls):
+    """Маршруты, в которых вьюхи ASYNC_VIEW_NAMES заменены асинхронными."""
+    return [
+        URLPattern(
+            url.pattern, as_async_view(url.callback), url.default_args,
+            url.name
+        ) if url.name in ASYNC_VIEW_NAMES else url
+        for url in urls
+    ]
@@ -0,0 +1,54 @@
+import copy
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import CountingCache
+
+token_cache = CountingCache(
+    'auth-token',
+    max_size=settings.TOKEN_CACHE_SIZE,
+    timeout=settings.TOKEN_CACHE_TIMEOUT,
+    alias=settings.TOKEN_CACHE_ALIAS,
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кэшем токен -> пользователь.
+    Записи сбрасываются сигналами из api.signals при удалении токена
+    (logout) и при сохранении пользователя (смена пароля, деактивация)
+    после фиксации транзакции.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+            return user, token
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
+
+
+def invalidate_tokens(keys):
+    """
+    Сбросить токены после фиксации транзакции: при сбросе до неё
+    параллельный запрос снова закэширует пользователя из ещё не
+    изменённой строки.
+    """
+    keys = list(keys)
+    transaction.on_commit(lambda: token_cache.delete_many(keys))
+
+
+def invalidate_user_tokens(user_ids):
+    """
+    Сбросить токены пользователей. Для изменений через QuerySet.update,
+    которые не отправляют post_save.
+    """
+    invalidate_tokens(
+        Token.objects.filter(user__in=user_ids).values_list('key', flat=True)
+    )
@@ -0,0 +1,113 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS, AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .serializers import BatchSerializer
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = '/api/'
+FORWARDED_META = (
+    'HTTP_HOST', 'SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR',
+    'HTTP_X_FORWARDED_FOR', 'HTTP_X_FORWARDED_PROTO', 'HTTP_ACCEPT_LANGUAGE',
+)
+
+
+class BatchView(APIView):
+    """
+    Запрос к эндпоинту /batch/.
+    Выполнение нескольких запросов к API за один HTTP-запрос.
+    Пользователь аутентифицируется один раз, подписки, избранное
+    и список покупок загружаются один раз на весь батч.
+    Предел BATCH_MAX_SECONDS мягкий: он проверяется перед каждым
+    подзапросом и не прерывает уже начатый.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def get_factory(self, request):
+        return RequestFactory(**{
+            key: request.META[key]
+            for key in FORWARDED_META if key in request.META
+        })
+
+    def build_request(self, factory, request, item, relation_cache):
+        body = item.get('body')
+        sub_request = factory.generic(
+            item['method'],
+            item['path'],
+            data=json.dumps(body) if body is not None else '',
+            content_type='application/json',
+            secure=request.is_secure(),
+        )
+        if request.user.is_authenticated:
+            sub_request._force_auth_user = request.user
+            sub_request._force_auth_token = request.auth
+        sub_request.relation_cache = relation_cache
+        return sub_request
+
+    def run(self, sub_request):
+        path = sub_request.path_info
+        if (not path.startswith(API_PREFIX)
+           or path == self.request.path_info):
+            return {'status': 400, 'body': {'message': 'Недопустимый путь.'}}
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return {'status': 404, 'body': {'message': 'Не найдено.'}}
+        try:
+            view = getattr(match.func, 'sync_view', match.func)
+            response = view(sub_request, *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            body = self.get_body(response)
+        except Exception:
+            logger.exception('Ошибка запроса %s в батче.', path)
+            return {'status': 500, 'body': None}
+        return {'status': response.status_code, 'body': body}
+
+    def get_body(self, response):
+        """
+        Тело ответа подзапроса. Потоковые ответы, например снимок
+        каталога ингредиентов, читаются целиком.
+        """
+        try:
+            if response.streaming:
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+        finally:
+            response.close()
+        if not content:
+            return None
+        if response.get('Content-Type', '').startswith('application/json'):
+            return json.loads(content)
+        return content.decode(response.charset)
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        factory = self.get_factory(request)
+        relation_cache = {}
+        deadline = time.monotonic() + settings.BATCH_MAX_SECONDS
+        results = []
+        for item in serializer.validated_data['requests']:
+            if time.monotonic() > deadline:
+                results.append({
+                    'status': 503,
+                    'body': {'message': 'Превышено время выполнения батча.'},
+                })
+                continue
+            results.append(self.run(self.build_request(
+                factory, request, item, relation_cache
+            )))
+            if item['method'] not in SAFE_METHODS:
+                relation_cache.clear()
+        return Response(results)
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from .metrics import count_cache
+
+
+class LocalCache:
+    """
+    Ограниченный по размеру TTL/LRU-кэш внутри процесса.
+    Интерфейс совпадает с кэшами Django: get, set, delete, delete_many.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + timeout)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class CountingCache:
+    """
+    Кэш с префиксом ключей и счётчиками попаданий.
+    Хранилище — LocalCache или, если задан alias, общий кэш Django.
+    """
+
+    def __init__(self, prefix, max_size, timeout, alias=None):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.alias = alias
+        self.local = LocalCache(max_size, timeout)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias] if self.alias else self.local
+
+    def make_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key):
+        value = self.backend.get(self.make_key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        count_cache(self.prefix, value is not None)
+        return value
+
+    def set(self, key, value):
+        self.backend.set(self.make_key(key), value, self.timeout)
+
+    def delete_many(self, keys):
+        self.backend.delete_many([self.make_key(key) for key in keys])
+
+
+def get_relation_ids(request, name, ids):
+    """
+    Те из ids, что есть у пользователя в подписках ('follows', id
+    авторов), в избранном ('favorites') или в списке покупок
+    ('shopping_cart', id рецептов). Из базы запрашиваются только
+    ещё не проверенные id; запросы одного батча делят общий кэш
+    relation_cache.
+    """
+    from recipes.models import Favorite, ShoppingCart
+    from users.models import Follow
+
+    relations = {
+        'follows': (Follow, 'follower', 'following_id'),
+        'favorites': (Favorite, 'user', 'recipe_id'),
+        'shopping_cart': (ShoppingCart, 'user', 'recipe_id'),
+    }
+    cache = getattr(request, 'relation_cache', None)
+    if cache is None:
+        cache = request.relation_cache = {}
+    checked, found = cache.setdefault(name, (set(), set()))
+    missing = set(ids) - checked
+    if missing:
+        model, owner, field = relations[name]
+        found.update(model.objects.filter(
+            **{owner: request.user, f'{field}__in': missing}
+        ).values_list(field, flat=True))
+        checked.update(missing)
+    return found
@@ -0,0 +1,33 @@
+"""
+Постоянные соединения с базой (CONN_MAX_AGE): проверка соединения
+перед повторным использованием не чаще раза в
+DB_HEALTH_CHECK_INTERVAL секунд и учёт новых соединений в метриках.
+"""
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import DB_CONNECTIONS, DB_HEALTH_CHECKS
+
+
+def connection_opened(connection):
+    connection.health_checked_at = time.monotonic()
+    DB_CONNECTIONS.labels(connection.alias).inc()
+
+
+def check_connections():
+    """Закрыть соединения, оборванные перезапуском базы или сетью."""
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        checked_at = getattr(connection, 'health_checked_at', 0)
+        if now - checked_at < settings.DB_HEALTH_CHECK_INTERVAL:
+            continue
+        connection.health_checked_at = now
+        if connection.is_usable():
+            DB_HEALTH_CHECKS.labels(connection.alias, 'ok').inc()
+        else:
+            DB_HEALTH_CHECKS.labels(connection.alias, 'failed').inc()
+            connection.close()
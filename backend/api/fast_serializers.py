@@ -0,0 +1,144 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            Tag)
+from users.models import Follow
+
+User = get_user_model()
+
+TAG_FIELDS = ("id", "name", "color", "slug")
+INGREDIENT_FIELDS = ("id", "name", "measurement_unit")
+AUTHOR_FIELDS = ("email", "id", "username", "first_name", "last_name")
+
+
+class ValuesSerializer:
+    """
+    Облегчённый сериализатор для списков только на чтение.
+    Строки берутся через .values(), ответ собирается из обычных dict
+    той же формы, что и у соответствующего ModelSerializer.
+    """
+
+    fields = ()
+
+    def __init__(self, request=None):
+        self.request = request
+
+    def get_values(self, queryset):
+        return queryset.values(*self.fields)
+
+    def to_representation(self, rows):
+        return [dict(row) for row in rows]
+
+
+class TagValuesSerializer(ValuesSerializer):
+    """Аналог TagSerializer."""
+
+    fields = TAG_FIELDS
+
+
+class IngredientValuesSerializer(ValuesSerializer):
+    """Аналог IngredientSerializer."""
+
+    fields = INGREDIENT_FIELDS
+
+
+class RecipeListValuesSerializer(ValuesSerializer):
+    """
+    Аналог RecipeListSerializer.
+    Теги, ингредиенты, авторы и флаги пользователя догружаются
+    пачкой по id рецептов текущей страницы.
+    """
+
+    fields = (
+        "id", "name", "image", "text", "cooking_time", "pub_date",
+        "author_id",
+    )
+
+    def get_image_url(self, name):
+        if not name:
+            return None
+        url = Recipe._meta.get_field("image").storage.url(name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def get_user_ids(self, model, owner, field, ids):
+        """Id объектов из ids, связанных с текущим пользователем."""
+        user = getattr(self.request, "user", None)
+        if user is None or user.is_anonymous:
+            return set()
+        return set(model.objects.filter(
+            **{owner: user, f"{field}__in": ids}
+        ).values_list(field, flat=True))
+
+    def get_tags(self, recipe_ids):
+        tags = defaultdict(list)
+        rows = Tag.objects.filter(recipes__in=recipe_ids).values(
+            "recipes", *TAG_FIELDS
+        )
+        for row in rows:
+            tags[row.pop("recipes")].append(row)
+        return tags
+
+    def get_ingredients(self, recipe_ids):
+        ingredients = defaultdict(list)
+        rows = RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list(
+            "recipe_id", "ingredient__id", "ingredient__name",
+            "ingredient__measurement_unit", "amount",
+        )
+        for recipe_id, pk, name, measurement_unit, amount in rows:
+            ingredients[recipe_id].append({
+                "id": pk,
+                "name": name,
+                "measurement_unit": measurement_unit,
+                "amount": amount,
+            })
+        return ingredients
+
+    def get_authors(self, author_ids):
+        subscribed = self.get_user_ids(
+            Follow, "follower", "following_id", author_ids
+        )
+        authors = {}
+        for row in User.objects.filter(id__in=author_ids).values(
+            *AUTHOR_FIELDS
+        ):
+            row["is_subscribed"] = row["id"] in subscribed
+            authors[row["id"]] = row
+        return authors
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        recipe_ids = [row["id"] for row in rows]
+        author_ids = {row["author_id"] for row in rows}
+        tags = self.get_tags(recipe_ids)
+        ingredients = self.get_ingredients(recipe_ids)
+        authors = self.get_authors(author_ids)
+        favorited = self.get_user_ids(
+            Favorite, "user", "recipe_id", recipe_ids
+        )
+        in_cart = self.get_user_ids(
+            ShoppingCart, "user", "recipe_id", recipe_ids
+        )
+        return [
+            {
+                "id": row["id"],
+                "tags": tags[row["id"]],
+                "ingredients": ingredients[row["id"]],
+                "author": dict(authors[row["author_id"]]),
+                "is_favorited": row["id"] in favorited,
+                "is_in_shopping_cart": row["id"] in in_cart,
+                "name": row["name"],
+                "image": self.get_image_url(row["image"]),
+                "text": row["text"],
+                "cooking_time": row["cooking_time"],
+                "pub_date": (
+                    row["pub_date"].isoformat() if row["pub_date"] else None
+                ),
+            }
+            for row in rows
+        ]
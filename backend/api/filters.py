@@ -1,5 +1,9 @@
+from django import forms
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
-from recipes.models import Ingredient
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
 
 
 class IngredientSearch(SearchFilter):
@@ -8,3 +12,70 @@ class IngredientSearch(SearchFilter):
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+
+class MultipleValueField(forms.MultipleChoiceField):
+    """Список произвольных строк без проверки по списку вариантов."""
+
+    def valid_value(self, value):
+        return True
+
+
+class MultipleValueFilter(filters.MultipleChoiceFilter):
+    field_class = MultipleValueField
+
+
+class RecipeFilter(filters.FilterSet):
+    """
+    Фильтры рецептов.
+    Фильтры по тегам, избранному и списку покупок строятся
+    как EXISTS-подзапросы, поэтому DISTINCT не нужен
+    и все фильтры комбинируются между собой.
+    """
+
+    tags = MultipleValueFilter(method='filter_tags')
+    tags_match = filters.ChoiceFilter(
+        choices=(('any', 'Любой из тегов'), ('all', 'Все теги')),
+        method='filter_nothing',
+    )
+    author = filters.NumberFilter(field_name='author_id')
+    is_favorited = filters.BooleanFilter(method='filter_is_favorited')
+    is_in_shopping_cart = filters.BooleanFilter(
+        method='filter_is_in_shopping_cart'
+    )
+    cooking_time = filters.RangeFilter()
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'tags', 'tags_match', 'author', 'is_favorited',
+            'is_in_shopping_cart', 'cooking_time',
+        )
+
+    def filter_nothing(self, queryset, name, value):
+        return queryset
+
+    def filter_tags(self, queryset, name, value):
+        tags = Recipe.tags.through.objects.filter(recipe_id=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_match') == 'all':
+            for slug in value:
+                queryset = queryset.filter(
+                    Exists(tags.filter(tag__slug=slug))
+                )
+            return queryset
+        return queryset.filter(Exists(tags.filter(tag__slug__in=value)))
+
+    def filter_user_relation(self, queryset, model, value):
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none() if value else queryset
+        exists = Exists(model.objects.filter(
+            recipe_id=OuterRef('pk'), user=user
+        ))
+        return queryset.filter(exists if value else ~exists)
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_relation(queryset, Favorite, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_relation(queryset, ShoppingCart, value)
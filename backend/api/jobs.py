@@ -0,0 +1,211 @@
+"""
+Фоновые задачи без внешних сервисов.
+
+Очередь — таблица api_job. Вьюха ставит задачу через enqueue() и сразу
+отвечает, manage.py run_worker выполняет задачи в пуле процессов.
+Задача, поставленная внутри транзакции, видна воркеру только после
+её фиксации и пропадает при откате.
+
+На PostgreSQL воркеры забирают задачи через SELECT ... FOR UPDATE
+SKIP LOCKED и не ждут друг друга. В SQLite блокировок строк нет:
+задача достаётся воркеру, чей условный UPDATE по статусу изменил
+строку.
+
+Задача — функция, зарегистрированная декоратором task, аргументы
+берутся из payload (JSON). Упавшая задача повторяется с
+экспоненциальной задержкой, пока не кончатся max_attempts попыток;
+после исключения JobFailed задача не повторяется. Задача с ключом
+идемпотентности (key) ставится в очередь один раз, пока выполненная
+запись не удалена через JOB_RETENTION_DAYS; задача с тем же ключом,
+завершившаяся ошибкой, ставится в очередь заново. Задачи,
+которые числятся выполняющимися дольше JOB_TIMEOUT (воркер убит),
+возвращаются в очередь.
+"""
+import logging
+import random
+import signal
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .metrics import JOBS, JOBS_ENQUEUED
+from .models import Job
+
+logger = logging.getLogger('api.jobs')
+
+RETRY = 'retry'
+
+tasks = {}
+
+
+class JobFailed(Exception):
+    """Ошибка, которую повтор задачи не исправит."""
+
+
+def task(name):
+    """Зарегистрировать функцию как задачу name."""
+    def decorator(function):
+        tasks[name] = function
+        return function
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    """Поставить задачу в очередь; для известного key вернуть прежнюю."""
+    if name not in tasks:
+        raise ValueError(f'Неизвестная задача: {name}.')
+    values = {
+        'name': name,
+        'payload': payload or {},
+        'max_attempts': max_attempts or settings.JOB_MAX_ATTEMPTS,
+        'run_at': timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        job, created = Job.objects.create(**values), True
+    else:
+        job, created = Job.objects.get_or_create(key=key, defaults=values)
+        if not created and job.status == Job.FAILED:
+            created = Job.objects.filter(
+                id=job.id, status=Job.FAILED
+            ).update(
+                attempts=0, locked_at=None, locked_by='', error='',
+                finished_at=None, status=Job.QUEUED, **values
+            )
+            job.refresh_from_db()
+    if created:
+        JOBS_ENQUEUED.labels(name).inc()
+    return job
+
+
+def claim(limit, worker):
+    """Взять в работу до limit готовых задач: [(id, name, run_at)]."""
+    now = timezone.now()
+    ready = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'id').values_list('id', 'name', 'run_at')
+    running = {
+        'status': Job.RUNNING,
+        'locked_at': now,
+        'locked_by': worker,
+        'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(ready.select_for_update(skip_locked=True)[:limit])
+            Job.objects.filter(id__in=[job[0] for job in jobs]).update(
+                **running
+            )
+        return jobs
+    return [
+        job for job in ready[:limit]
+        if Job.objects.filter(id=job[0], status=Job.QUEUED).update(**running)
+    ]
+
+
+def get_retry_delay(attempts):
+    """Экспоненциальная задержка со случайной добавкой до четверти."""
+    delay = min(
+        settings.JOB_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY
+    )
+    return delay * random.uniform(1, 1.25)
+
+
+def finish(job, error=None, retry=True):
+    """Записать итог попытки: Job.DONE, RETRY или Job.FAILED."""
+    now = timezone.now()
+    values = {'locked_at': None, 'locked_by': '', 'error': error or ''}
+    if error is None:
+        result = Job.DONE
+        values.update(status=Job.DONE, finished_at=now)
+    elif retry and job.attempts < job.max_attempts:
+        result = RETRY
+        values.update(
+            status=Job.QUEUED,
+            run_at=now + timedelta(seconds=get_retry_delay(job.attempts))
+        )
+    else:
+        result = Job.FAILED
+        values.update(status=Job.FAILED, finished_at=now)
+    # Задачу, возвращённую в очередь как зависшую, уже мог взять
+    # другой воркер: её запись не трогаем.
+    Job.objects.filter(id=job.id, locked_at=job.locked_at).update(**values)
+    return result
+
+
+def execute(job_id):
+    """
+    Выполнить задачу в процессе пула run_worker.
+    Возвращает итог попытки и время выполнения в секундах.
+    """
+    # Ctrl+C получает вся группа процессов; останавливает пул
+    # главный процесс, дождавшись выполняемых задач.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    close_old_connections()
+    try:
+        job = Job.objects.get(id=job_id)
+        started = time.perf_counter()
+        try:
+            function = tasks.get(job.name)
+            if function is None:
+                raise LookupError(f'Неизвестная задача: {job.name}.')
+            function(**job.payload)
+        except JobFailed:
+            logger.warning(
+                'Задача %s завершена ошибкой без повторов.', job,
+                exc_info=True
+            )
+            result = finish(job, traceback.format_exc(), retry=False)
+        except Exception:
+            logger.warning(
+                'Задача %s не выполнена, попытка %s из %s.',
+                job, job.attempts, job.max_attempts, exc_info=True
+            )
+            result = finish(job, traceback.format_exc())
+        else:
+            result = finish(job)
+        return result, time.perf_counter() - started
+    finally:
+        close_old_connections()
+
+
+def requeue_stale():
+    """Вернуть в очередь задачи, зависшие дольше JOB_TIMEOUT."""
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+    )
+    values = {
+        'locked_at': None,
+        'locked_by': '',
+        'error': 'Превышено время выполнения JOB_TIMEOUT.',
+    }
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), **values
+    )
+    return failed + stale.update(status=Job.QUEUED, **values)
+
+
+def purge_done():
+    """Удалить выполненные задачи старше JOB_RETENTION_DAYS."""
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - timedelta(
+            days=settings.JOB_RETENTION_DAYS
+        )
+    ).delete()[0]
+
+
+def update_stats():
+    """Число задач по статусам для метрики api_jobs."""
+    counts = dict(
+        Job.objects.values_list('status').annotate(Count('id')).order_by()
+    )
+    for status, _ in Job.STATUSES:
+        JOBS.labels(status).set(counts.get(status, 0))
+    return counts
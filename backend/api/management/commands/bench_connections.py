@@ -0,0 +1,88 @@
+import io
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер накладных расходов на соединение с базой: запросы через '
+        'полный цикл WSGI с новым соединением на каждый запрос '
+        'и с постоянным соединением (CONN_MAX_AGE).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Количество запросов на режим.'
+        )
+        parser.add_argument(
+            '--path', default='/api/tags/',
+            help='Путь запроса.'
+        )
+        parser.add_argument(
+            '--max-age', type=int, default=None,
+            help='CONN_MAX_AGE постоянного режима; по умолчанию '
+                 'из настроек, 0 в настройках заменяется на 60.'
+        )
+
+    def request(self, handler, path):
+        environ = {'PATH_INFO': path, 'wsgi.input': io.BytesIO()}
+        setup_testing_defaults(environ)
+        statuses = []
+        response = handler(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        b''.join(response)
+        response.close()
+        return statuses[0]
+
+    def measure(self, handler, path, max_age, count):
+        opened = []
+
+        def on_connect(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection.close()
+        settings_dict = connection.settings_dict
+        old_max_age = settings_dict['CONN_MAX_AGE']
+        settings_dict['CONN_MAX_AGE'] = max_age
+        connection_created.connect(on_connect)
+        try:
+            started = time.perf_counter()
+            for _ in range(count):
+                status = self.request(handler, path)
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(on_connect)
+            settings_dict['CONN_MAX_AGE'] = old_max_age
+            connection.close()
+        return status, elapsed * 1000 / count, len(opened)
+
+    def handle(self, *args, **options):
+        max_age = options['max_age']
+        if max_age is None:
+            max_age = connection.settings_dict['CONN_MAX_AGE'] or 60
+        handler = WSGIHandler()
+        setup_test_environment()
+        try:
+            for title, mode_max_age in (
+                ('новое соединение на запрос', 0),
+                (f'CONN_MAX_AGE={max_age}', max_age),
+            ):
+                status, latency, opened = self.measure(
+                    handler, options['path'], mode_max_age,
+                    options['requests']
+                )
+                self.stdout.write(
+                    f'{title}: {status}, {latency:.2f} мс на запрос, '
+                    f'соединений открыто: {opened}.'
+                )
+        finally:
+            teardown_test_environment()
@@ -0,0 +1,404 @@
+import base64
+import csv
+import io
+import json
+import math
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.queries import record_queries
+from recipes.catalog import catalog, compile_catalog
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+SIZES = {
+    'small': {'users': 100, 'recipes': 1000},
+    'medium': {'users': 1000, 'recipes': 20000},
+    'large': {'users': 10000, 'recipes': 200000},
+}
+BASELINE_PATH = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+INGREDIENTS_PATH = os.path.join(
+    os.path.dirname(settings.BASE_DIR), 'data', 'ingredients.csv'
+)
+
+
+def get_image():
+    content = io.BytesIO()
+    Image.new('RGB', (8, 8), '#49B64E').save(content, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        content.getvalue()
+    ).decode()
+
+
+def get_recipe_data(ctx, name):
+    return {
+        'ingredients': [
+            {'id': pk, 'amount': 10} for pk in ctx['ingredient_ids']
+        ],
+        'tags': ctx['tag_ids'],
+        'name': name,
+        'image': ctx['image'],
+        'text': 'Рецепт для замера производительности.',
+        'cooking_time': 30,
+    }
+
+
+# (название, метод, путь, тело запроса). Путь и тело строятся
+# по контексту замера ctx, в котором есть номер круга round.
+ENDPOINTS = (
+    ('tags: list', 'get', lambda ctx: '/api/tags/', None),
+    ('tags: detail', 'get',
+     lambda ctx: f"/api/tags/{ctx['tag_ids'][0]}/", None),
+    ('ingredients: list', 'get', lambda ctx: '/api/ingredients/', None),
+    ('ingredients: search', 'get',
+     lambda ctx: f"/api/ingredients/?name={ctx['search']}", None),
+    ('ingredients: detail', 'get',
+     lambda ctx: f"/api/ingredients/{ctx['ingredient_ids'][0]}/", None),
+    ('users: list', 'get', lambda ctx: '/api/users/', None),
+    ('users: detail', 'get',
+     lambda ctx: f"/api/users/{ctx['author'].id}/", None),
+    ('users: me', 'get', lambda ctx: '/api/users/me/', None),
+    ('users: subscriptions', 'get',
+     lambda ctx: '/api/users/subscriptions/', None),
+    ('recipes: list', 'get', lambda ctx: '/api/recipes/', None),
+    ('recipes: page 10', 'get', lambda ctx: '/api/recipes/?page=10', None),
+    ('recipes: tags', 'get',
+     lambda ctx: f"/api/recipes/?tags={ctx['tag_slugs'][0]}", None),
+    ('recipes: tags all', 'get',
+     lambda ctx: '/api/recipes/?tags_match=all&' + '&'.join(
+         f'tags={slug}' for slug in ctx['tag_slugs']
+     ), None),
+    ('recipes: author', 'get',
+     lambda ctx: f"/api/recipes/?author={ctx['author'].id}", None),
+    ('recipes: is_favorited', 'get',
+     lambda ctx: '/api/recipes/?is_favorited=1', None),
+    ('recipes: is_in_shopping_cart', 'get',
+     lambda ctx: '/api/recipes/?is_in_shopping_cart=1', None),
+    ('recipes: cooking_time', 'get',
+     lambda ctx: '/api/recipes/?cooking_time_min=10&cooking_time_max=60',
+     None),
+    ('recipes: detail', 'get',
+     lambda ctx: f"/api/recipes/{ctx['recipe'].id}/", None),
+    ('recipes: download_shopping_cart', 'get',
+     lambda ctx: '/api/recipes/download_shopping_cart/', None),
+    ('recipes: create', 'post', lambda ctx: '/api/recipes/',
+     lambda ctx: get_recipe_data(ctx, f"Замер {ctx['round']}")),
+    ('recipes: update', 'patch',
+     lambda ctx: f"/api/recipes/{ctx['own_recipe']}/",
+     lambda ctx: get_recipe_data(ctx, f"Изменён {ctx['round']}")),
+    ('recipes: favorite add', 'post',
+     lambda ctx: f"/api/recipes/{ctx['recipe'].id}/favorite/", None),
+    ('recipes: favorite remove', 'delete',
+     lambda ctx: f"/api/recipes/{ctx['recipe'].id}/favorite/", None),
+    ('recipes: cart add', 'post',
+     lambda ctx: f"/api/recipes/{ctx['recipe'].id}/shopping_cart/", None),
+    ('recipes: cart remove', 'delete',
+     lambda ctx: f"/api/recipes/{ctx['recipe'].id}/shopping_cart/", None),
+    ('users: subscribe', 'post',
+     lambda ctx: f"/api/users/{ctx['author'].id}/subscribe/", None),
+    ('users: unsubscribe', 'delete',
+     lambda ctx: f"/api/users/{ctx['author'].id}/subscribe/", None),
+    ('users: create', 'post', lambda ctx: '/api/users/',
+     lambda ctx: {
+         'email': f"bench{ctx['round']}@example.com",
+         'username': f"bench{ctx['round']}",
+         'first_name': 'Замер',
+         'last_name': 'Замеров',
+         'password': 'Bench-password-1',
+     }),
+    ('auth: token login', 'post', lambda ctx: '/api/auth/token/login/',
+     lambda ctx: {'email': ctx['user'].email, 'password': ctx['password']}),
+    ('batch: recipes and tags', 'post', lambda ctx: '/api/batch/',
+     lambda ctx: {'requests': [
+         {'method': 'GET', 'path': '/api/recipes/'},
+         {'method': 'GET', 'path': '/api/tags/'},
+     ]}),
+)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер эндпоинтов API на заполненных базах разного размера: '
+        'p50/p95 времени ответа, количество SQL-запросов и прочитанных '
+        'строк, сравнение с сохранённым базовым замером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', default=['small', 'medium'],
+            choices=[*SIZES, 'current'],
+            help='Размеры тестовых баз. current — замер на текущей базе '
+                 'без заполнения (запросы на запись изменят её).'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество кругов замера после прогревочного.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help='Seed для generate_fake_data.'
+        )
+        parser.add_argument(
+            '--password', default='password',
+            help='Пароль пользователей из generate_fake_data.'
+        )
+        parser.add_argument(
+            '--ingredients', default=INGREDIENTS_PATH,
+            help='CSV с каталогом ингредиентов для тестовых баз.'
+        )
+        parser.add_argument(
+            '--baseline', default=BASELINE_PATH,
+            help='JSON с базовым замером.'
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новый базовый замер.'
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help='Куда записать результаты в JSON.'
+        )
+        parser.add_argument(
+            '--query-budget', type=int, default=0,
+            help='Допустимый рост числа запросов.'
+        )
+        parser.add_argument(
+            '--rows-budget', type=float, default=0.1,
+            help='Допустимый рост числа строк, доля.'
+        )
+        parser.add_argument(
+            '--latency-budget', type=float, default=0.5,
+            help='Допустимый рост p95, доля.'
+        )
+        parser.add_argument(
+            '--latency-slack', type=float, default=2.0,
+            help='Допустимый рост p95 сверх доли, мс: защищает быстрые '
+                 'эндпоинты от ложных срабатываний из-за шума.'
+        )
+
+    def seed(self, size, options):
+        with open(options['ingredients'], encoding='utf-8') as file:
+            Ingredient.objects.bulk_create(
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in csv.reader(file)
+            )
+        call_command(
+            'generate_fake_data', seed=options['seed'],
+            password=options['password'], stdout=io.StringIO(),
+            **SIZES[size]
+        )
+
+    def get_context(self, client, options):
+        user = User.objects.annotate(
+            cart=Count('shopping_cart')
+        ).order_by('-cart', 'pk').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        tags = list(Tag.objects.values_list('pk', 'slug')[:2])
+        ingredients = list(
+            Ingredient.objects.values_list('pk', 'name')[:5]
+        )
+        recipe = Recipe.objects.exclude(favorite__user=user).exclude(
+            shopping_cart__user=user
+        ).order_by('-favorites_count', 'pk').first()
+        author = User.objects.exclude(pk=user.pk).exclude(
+            followers__follower=user
+        ).order_by('-followers_count', 'pk').first()
+        if not tags or not ingredients or recipe is None or author is None:
+            raise CommandError(
+                'Для замера нужны теги, ингредиенты, рецепты и хотя бы '
+                'два пользователя.'
+            )
+        ctx = {
+            'user': user,
+            'password': options['password'],
+            'author': author,
+            'recipe': recipe,
+            'tag_ids': [pk for pk, _ in tags],
+            'tag_slugs': [slug for _, slug in tags],
+            'ingredient_ids': [pk for pk, _ in ingredients],
+            'search': ingredients[0][1][:2],
+            'image': get_image(),
+            'round': 'setup',
+        }
+        response = client.post(
+            '/api/recipes/', get_recipe_data(ctx, 'Замер'), format='json'
+        )
+        if response.status_code != 201:
+            raise CommandError(
+                f'Не удалось создать рецепт: {response.status_code}.'
+            )
+        ctx['own_recipe'] = response.data['id']
+        return ctx
+
+    def request(self, client, method, path, data):
+        if method == 'get':
+            response = client.get(path)
+        else:
+            response = getattr(client, method)(path, data, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        response.close()
+        return response
+
+    def measure(self, client, ctx, repeat):
+        results = {name: [] for name, *_ in ENDPOINTS}
+        for number in range(repeat + 1):
+            ctx['round'] = f'{ctx["run"]}-{number}'
+            for name, method, path, data in ENDPOINTS:
+                path = path(ctx)
+                data = data and data(ctx)
+                with record_queries() as recorder:
+                    started = time.perf_counter()
+                    response = self.request(client, method, path, data)
+                    elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{name}: {method.upper()} {path} — '
+                        f'{response.status_code}.'
+                    )
+                if number:
+                    results[name].append(
+                        (elapsed * 1000, recorder.count, recorder.rows)
+                    )
+        return {
+            name: {
+                'p50': round(percentile([row[0] for row in rows], 0.5), 2),
+                'p95': round(percentile([row[0] for row in rows], 0.95), 2),
+                'queries': max(row[1] for row in rows),
+                'rows': max(row[2] for row in rows),
+            }
+            for name, rows in results.items()
+        }
+
+    def run_size(self, size, options):
+        client = APIClient()
+        catalog_path = catalog.path
+        with tempfile.TemporaryDirectory() as directory:
+            catalog.path = os.path.join(directory, 'ingredients.bin')
+            try:
+                if size != 'current':
+                    self.seed(size, options)
+                compile_catalog(catalog.path)
+                ctx = self.get_context(client, options)
+                ctx['run'] = f'{size}{int(time.time())}'
+                return self.measure(client, ctx, options['repeat'])
+            finally:
+                catalog.path = catalog_path
+
+    def run_test_db(self, size, options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            return self.run_size(size, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def report(self, size, results):
+        self.stdout.write(f'{connection.vendor}/{size}:')
+        self.stdout.write(
+            f'  {"endpoint":36} {"p50, ms":>9} {"p95, ms":>9} '
+            f'{"queries":>8} {"rows":>8}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'  {name:36} {result["p50"]:9.2f} {result["p95"]:9.2f} '
+                f'{result["queries"]:8} {result["rows"]:8}'
+            )
+
+    def compare(self, results, baseline, options):
+        missing = [
+            f'{connection.vendor}/{size} {name}'
+            for size, endpoints in results.items()
+            for name in endpoints
+            if name not in baseline.get(size, {})
+        ]
+        if missing:
+            raise CommandError(
+                'Нет базового замера для:\n' + '\n'.join(missing)
+                + '\nЗапишите его с --save-baseline.'
+            )
+        regressions = []
+        for size, endpoints in results.items():
+            for name, result in endpoints.items():
+                base = baseline[size][name]
+                limits = {
+                    'queries': base['queries'] + options['query_budget'],
+                    'rows': base['rows'] * (1 + options['rows_budget']),
+                    'p95': base['p95'] * (1 + options['latency_budget'])
+                    + options['latency_slack'],
+                }
+                regressions.extend(
+                    f'{connection.vendor}/{size} {name}: {metric} '
+                    f'{result[metric]} > {base[metric]}'
+                    for metric, limit in limits.items()
+                    if result[metric] > limit
+                )
+        return regressions
+
+    def handle(self, *args, **options):
+        stored = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline'], encoding='utf-8') as file:
+                stored = json.load(file)
+        elif not options['save_baseline']:
+            raise CommandError(
+                f'Нет файла базового замера {options["baseline"]}: '
+                'запишите его с --save-baseline.'
+            )
+        results = {}
+        setup_test_environment()
+        try:
+            with override_settings(THROTTLE_ENABLED=False):
+                for size in options['sizes']:
+                    if size == 'current':
+                        results[size] = self.run_size(size, options)
+                    else:
+                        results[size] = self.run_test_db(size, options)
+                    self.report(size, results[size])
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({connection.vendor: results}, file, indent=2)
+        if options['save_baseline']:
+            stored.setdefault(connection.vendor, {}).update(results)
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(stored, file, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовый замер записан в {options["baseline"]}.'
+            ))
+            return
+        regressions = self.compare(
+            results, stored.get(connection.vendor, {}), options
+        )
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно базового замера:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
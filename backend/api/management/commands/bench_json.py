@@ -0,0 +1,78 @@
+import base64
+import time
+from io import BytesIO
+
+from django.core.management import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeListSerializer
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер рендеринга и разбора JSON на реальных рецептах: '
+        'стандартные JSONRenderer/JSONParser против быстрых.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Количество рецептов в ответе.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Количество повторов.'
+        )
+        parser.add_argument(
+            '--image-size', type=int, default=512 * 1024,
+            help='Размер изображения в теле запроса, байт.'
+        )
+
+    def get_payloads(self, options):
+        recipes = Recipe.objects.prefetch_related(
+            'tags', 'recipe_ingredients__ingredient'
+        ).select_related('author')[:options['recipes']]
+        data = RecipeListSerializer(recipes, many=True).data
+        image = base64.b64encode(bytes(options['image_size'])).decode()
+        body = {
+            'ingredients': [{'id': 1, 'amount': 10}] * 10,
+            'tags': [1, 2],
+            'name': 'Рецепт',
+            'image': f'data:image/png;base64,{image}',
+            'text': 'Описание рецепта',
+            'cooking_time': 10,
+        }
+        return data, JSONRenderer().render(body)
+
+    def measure(self, func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = time.perf_counter() - start
+        return repeat / elapsed
+
+    def handle(self, *args, **options):
+        data, body = self.get_payloads(options)
+        repeat = options['repeat']
+        stock, fast = JSONRenderer(), FastJSONRenderer()
+        rendered = stock.render(data)
+        if fast.render(data) != rendered:
+            self.stderr.write('Вывод рендереров различается.')
+        for renderer in (stock, fast):
+            rate = self.measure(lambda: renderer.render(data), repeat)
+            self.stdout.write(
+                f'render {len(rendered)} байт: '
+                f'{type(renderer).__name__} {rate:.0f}/с.'
+            )
+        for parser in (JSONParser(), FastJSONParser()):
+            rate = self.measure(
+                lambda: parser.parse(BytesIO(body)), repeat
+            )
+            self.stdout.write(
+                f'parse {len(body)} байт: '
+                f'{type(parser).__name__} {rate:.0f}/с.'
+            )
@@ -0,0 +1,212 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.http import QueryDict
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.filters import RecipeFilter
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Follow
+
+User = get_user_model()
+
+# Имена индексов, по которым идёт чтение в плане запроса.
+INDEX_SCAN = {
+    'postgresql': re.compile(
+        r'(?:Index Scan|Index Only Scan)(?: Backward)? using (\w+)'
+        r'|Bitmap Index Scan on (\w+)'
+    ),
+    'sqlite': re.compile(r'USING (?:COVERING )?INDEX (\w+)'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN горячих запросов API с настройками планировщика '
+        'по умолчанию: проверка, что каждый запрос читает таблицы '
+        'по ожидаемому индексу. Запускать на базе, заполненной '
+        'generate_fake_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Обновить статистику планировщика перед проверкой.'
+        )
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать планы всех запросов.'
+        )
+
+    def get_table_indexes(self, table):
+        """Индексы таблицы: имя -> столбцы по порядку."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                # Уникальные ограничения SQLite строит как
+                # sqlite_autoindex_*; в планах видны именно эти имена.
+                cursor.execute(f'PRAGMA index_list({table})')
+                names = [row[1] for row in cursor.fetchall()]
+                indexes = {}
+                for name in names:
+                    cursor.execute(f'PRAGMA index_info({name})')
+                    indexes[name] = [row[2] for row in cursor.fetchall()]
+                return indexes
+            constraints = connection.introspection.get_constraints(
+                cursor, table
+            )
+        return {
+            name: constraint['columns']
+            for name, constraint in constraints.items()
+            if constraint['index'] or constraint['unique']
+        }
+
+    def index(self, model, *fields):
+        """Индексы модели, начинающиеся со столбцов полей fields."""
+        columns = {model._meta.get_field(field).column for field in fields}
+        return {
+            name
+            for name, index_columns in self.get_table_indexes(
+                model._meta.db_table
+            ).items()
+            if set(index_columns[:len(columns)]) == columns
+        }
+
+    def recipe_filter(self, user, params):
+        request = APIRequestFactory().get('/api/recipes/')
+        force_authenticate(request, user=user)
+        request = Request(request)
+        request.user = user
+        return RecipeFilter(
+            QueryDict(params), queryset=Recipe.objects.all(), request=request
+        ).qs
+
+    def get_filter_queries(self, user, tags):
+        """Фильтры списка рецептов (RecipeFilter)."""
+        Tags = Recipe.tags.through
+        by_tags = self.index(Tags, 'recipe') | self.index(Tags, 'tag')
+        by_author = self.index(Recipe, 'author', 'pub_date')
+        favorites = self.index(Favorite, 'user', 'recipe')
+        cart = self.index(ShoppingCart, 'user', 'recipe')
+        tag_params = '&'.join(f'tags={slug}' for slug in tags)
+        filters = (
+            ('recipes: tags any', tag_params, [by_tags]),
+            ('recipes: tags all', f'{tag_params}&tags_match=all',
+             [by_tags]),
+            ('recipes: author', f'author={user.id}', [by_author]),
+            ('recipes: is_favorited', 'is_favorited=1', [favorites]),
+            ('recipes: is_in_shopping_cart', 'is_in_shopping_cart=1',
+             [cart]),
+            ('recipes: all filters',
+             f'{tag_params}&author={user.id}&is_favorited=1'
+             '&is_in_shopping_cart=1&cooking_time_min=1&cooking_time_max=60',
+             [by_author, by_tags, favorites, cart]),
+        )
+        return [
+            (name, self.recipe_filter(user, params)[:6], expected)
+            for name, params, expected in filters
+        ]
+
+    def get_hot_queries(self, user):
+        """Запросы из api/views.py, api/serializers.py и api/cache.py."""
+        recipe_ids = list(
+            Recipe.objects.values_list('id', flat=True)[:6]
+        )
+        author_ids = list(
+            User.objects.values_list('id', flat=True)[:6]
+        )
+        by_recipe = self.index(RecipeIngredient, 'recipe')
+        queries = [
+            ('recipes: list page', Recipe.objects.all()[:6],
+             [self.index(Recipe, 'pub_date', 'id')]),
+            ('recipes: author recipes', Recipe.objects.filter(
+                author=user
+            )[:6], [self.index(Recipe, 'author', 'pub_date')]),
+            ('recipes: ingredients of page', RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids
+            ), [by_recipe]),
+            ('relations: follows', Follow.objects.filter(
+                follower=user, following_id__in=author_ids
+            ).values_list('following_id'), [self.index(Follow, 'follower')]),
+            ('relations: favorites', Favorite.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id'),
+             [self.index(Favorite, 'user', 'recipe')]),
+            ('relations: shopping_cart', ShoppingCart.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id'),
+             [self.index(ShoppingCart, 'user', 'recipe')]),
+            ('users: subscriptions', User.objects.filter(
+                followers__follower=user.id
+            )[:6], [self.index(Follow, 'follower')]),
+            ('recipes: download_shopping_cart',
+             RecipeIngredient.objects.filter(
+                 recipe__shopping_cart__user=user
+             ).order_by('ingredient__name').values(
+                 'ingredient__name', 'ingredient__measurement_unit'
+             ).annotate(amount=Sum('amount')),
+             [self.index(ShoppingCart, 'user', 'recipe'), by_recipe]),
+        ]
+        if connection.vendor == 'postgresql':
+            queries.append((
+                'ingredients: name search',
+                Ingredient.objects.filter(name__istartswith='а'),
+                [{'ingredient_name_prefix_idx'}]
+            ))
+        return queries
+
+    def analyze(self):
+        """Статистика планировщика после массовой загрузки данных."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'VACUUM ANALYZE' if connection.vendor == 'postgresql'
+                else 'ANALYZE'
+            )
+
+    def handle(self, *args, **options):
+        pattern = INDEX_SCAN.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f'База {connection.vendor} не поддерживается.'
+            )
+        user = User.objects.order_by('id').first()
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        if user is None or not tags:
+            raise CommandError(
+                'Для проверки нужны пользователи и теги в базе.'
+            )
+        if options['analyze']:
+            self.analyze()
+        failures = []
+        queries = (
+            self.get_filter_queries(user, tags) + self.get_hot_queries(user)
+        )
+        for name, queryset, expected in queries:
+            plan = queryset.explain()
+            used = {
+                index for match in pattern.findall(plan)
+                for index in ([match] if isinstance(match, str) else match)
+                if index
+            }
+            missing = [
+                ', '.join(sorted(indexes)) or '-'
+                for indexes in expected if not indexes & used
+            ]
+            if options['verbose_plans'] or missing:
+                self.stdout.write(f'{name}:\n{plan}\n')
+            failures.extend(
+                f'{name}: нет ни одного из индексов {indexes}'
+                for indexes in missing
+            )
+        if failures:
+            raise CommandError(
+                'Запросы не используют ожидаемые индексы:\n'
+                + '\n'.join(failures)
+            )
+        self.stdout.write(
+            self.style.SUCCESS('Все запросы идут по ожидаемым индексам.')
+        )
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+ALLOWED_STATUSES = {'post': {201, 400}, 'delete': {204, 400}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельные запросы к favorite, shopping_cart и subscribe: '
+        'проверка, что гонки не дают ошибок 5xx и счётчики не расходятся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True)
+        parser.add_argument('--recipe', type=int, required=True)
+        parser.add_argument('--author', type=int, required=True)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def request(self, method, url):
+        try:
+            client = Client(HTTP_AUTHORIZATION=f'Token {self.token}')
+            return method, getattr(client, method)(url).status_code
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        user = User.objects.get(id=options['user'])
+        self.token = Token.objects.get_or_create(user=user)[0].key
+        urls = (
+            f'/api/recipes/{options["recipe"]}/favorite/',
+            f'/api/recipes/{options["recipe"]}/shopping_cart/',
+            f'/api/users/{options["author"]}/subscribe/',
+        )
+        errors = []
+        with ThreadPoolExecutor(options['threads']) as executor:
+            for _ in range(options['rounds']):
+                for method in ('post', 'delete'):
+                    futures = [
+                        executor.submit(self.request, method, url)
+                        for url in urls
+                        for _ in range(options['threads'])
+                    ]
+                    errors += [
+                        result for result in (
+                            future.result() for future in futures
+                        )
+                        if result[1] not in ALLOWED_STATUSES[result[0]]
+                    ]
+        recipe = Recipe.objects.get(id=options['recipe'])
+        author = User.objects.get(id=options['author'])
+        drift = [
+            name for name, stored, actual in (
+                ('favorites_count', recipe.favorites_count,
+                 Favorite.objects.filter(recipe=recipe).count()),
+                ('in_carts_count', recipe.in_carts_count,
+                 ShoppingCart.objects.filter(recipe=recipe).count()),
+                ('followers_count', author.followers_count,
+                 Follow.objects.filter(following=author).count()),
+            )
+            if stored != actual
+        ]
+        if errors or drift:
+            raise CommandError(
+                f'Ошибки: {errors[:10]}, расхождение счётчиков: {drift}.'
+            )
+        self.stdout.write(self.style.SUCCESS('Ошибок и расхождений нет.'))
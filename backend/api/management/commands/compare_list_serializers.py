@@ -0,0 +1,126 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+User = get_user_model()
+
+ENDPOINTS = (
+    ('tags', TagViewSet, '/api/tags/'),
+    ('ingredients', IngredientViewSet, '/api/ingredients/'),
+    ('recipes', RecipeViewSet, '/api/recipes/'),
+)
+# Атрибуты вьюсета для эталона (ModelSerializer) и быстрых путей.
+# Быстрый путь проверяется, если у вьюсета есть его атрибут.
+SERIALIZER = {'values_list_enabled': False, 'catalog_enabled': False}
+VARIANTS = (
+    ('values', 'values_list_enabled'),
+    ('snapshot', 'catalog_enabled'),
+)
+
+
+def get_content(response):
+    """Тело ответа, в том числе потокового (снимок каталога)."""
+    if not response.streaming:
+        return response.content
+    try:
+        return b''.join(response.streaming_content)
+    finally:
+        response.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение быстрого пути list (.values()) с ModelSerializer: '
+        'побайтовая проверка ответов и замер CPU на запрос. Для '
+        'ингредиентов с тем же ответом сравнивается снимок каталога '
+        '(compile_ingredients), если он собран.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, default=None,
+            help='id пользователя, от имени которого делаются запросы.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Количество запросов на замер.'
+        )
+        parser.add_argument(
+            '--page-size', type=int, default=None,
+            help='Размер страницы для списка рецептов.'
+        )
+
+    def get_response(self, viewset, url, attributes):
+        request = APIRequestFactory().get(url)
+        if self.user is not None:
+            force_authenticate(request, user=self.user)
+        initkwargs = {
+            key: value for key, value in attributes.items()
+            if hasattr(viewset, key)
+        }
+        if self.pagination_class and viewset.pagination_class:
+            initkwargs['pagination_class'] = self.pagination_class
+        view = viewset.as_view({'get': 'list'}, **initkwargs)
+        response = view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def measure(self, viewset, url, attributes, repeat):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        for _ in range(repeat):
+            get_content(self.get_response(viewset, url, attributes))
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+        return cpu * 1000 / repeat, repeat / wall
+
+    def handle(self, *args, **options):
+        self.user = None
+        if options['user'] is not None:
+            self.user = User.objects.get(id=options['user'])
+        self.pagination_class = None
+        if options['page_size']:
+            self.pagination_class = type(
+                'BenchmarkPagination', (PageNumberPagination,),
+                {'page_size': options['page_size']}
+            )
+        mismatches = []
+        for name, viewset, url in ENDPOINTS:
+            expected = get_content(
+                self.get_response(viewset, url, SERIALIZER)
+            )
+            results = [('serializer', SERIALIZER)]
+            for variant, key in VARIANTS:
+                if not hasattr(viewset, key):
+                    continue
+                attributes = dict(SERIALIZER, **{key: True})
+                response = self.get_response(viewset, url, attributes)
+                if variant == 'snapshot' and not response.streaming:
+                    get_content(response)
+                    self.stdout.write(f'{name}: снимок каталога не собран.')
+                    continue
+                if get_content(response) != expected:
+                    mismatches.append(f'{name} ({variant})')
+                    self.stderr.write(f'{name}: ответ {variant} отличается.')
+                    continue
+                results.append((variant, attributes))
+            self.stdout.write(f'{name}: ' + '; '.join(
+                '{} {:.2f} ms CPU, {:.1f} rps'.format(
+                    variant, *self.measure(
+                        viewset, url, attributes, options['repeat']
+                    )
+                )
+                for variant, attributes in results
+            ) + '.')
+        if mismatches:
+            raise CommandError(
+                'Быстрый путь расходится с сериализаторами: '
+                + ', '.join(mismatches)
+            )
+        self.stdout.write(self.style.SUCCESS('Ответы совпадают.'))
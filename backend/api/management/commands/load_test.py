@@ -0,0 +1,147 @@
+import threading
+import time
+
+import requests
+from django.core.management import BaseCommand, CommandError
+
+from .bench_endpoints import percentile
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/tags/',
+    '/api/ingredients/?name=с',
+)
+
+
+class Client(threading.Thread):
+    """Клиент, повторяющий запросы по кругу до deadline."""
+
+    def __init__(self, base_url, paths, headers, deadline, offset):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.paths = paths
+        self.headers = headers
+        self.deadline = deadline
+        self.offset = offset
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        session = requests.Session()
+        session.headers.update(self.headers)
+        number = self.offset
+        while time.monotonic() < self.deadline:
+            path = self.paths[number % len(self.paths)]
+            number += 1
+            started = time.perf_counter()
+            try:
+                response = session.get(self.base_url + path, timeout=30)
+                response.content
+            except requests.RequestException:
+                self.errors += 1
+                continue
+            if response.status_code >= 400:
+                self.errors += 1
+                continue
+            self.latencies.append((time.perf_counter() - started) * 1000)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенных серверов: пропускная способность '
+        'и время ответа при одновременных клиентах. Для сравнения WSGI '
+        'и ASGI запустите оба сервера, например '
+        'gunicorn backend.wsgi:application -b :8000 и '
+        'gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker '
+        '-b :8001 с THROTTLE_ENABLED=False, и передайте оба адреса '
+        'в --target.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            metavar='NAME=URL',
+            help='Сервер, например wsgi=http://localhost:8000; '
+                 'можно указать несколько раз.'
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь запроса; можно указать несколько раз. '
+                 'По умолчанию списки рецептов, тегов и ингредиентов.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, action='append',
+            help='Число одновременных клиентов; можно указать несколько '
+                 'раз. По умолчанию 1, 10 и 50.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Секунд на каждый уровень нагрузки.'
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен API, например для '
+                 '/api/recipes/download_shopping_cart/.'
+        )
+
+    def get_targets(self, values):
+        targets = []
+        for value in values:
+            name, separator, url = value.partition('=')
+            if not separator or not url.startswith('http'):
+                raise CommandError(f'Ожидается NAME=URL: {value}.')
+            targets.append((name, url.rstrip('/')))
+        return targets
+
+    def run(self, base_url, paths, headers, concurrency, duration):
+        deadline = time.monotonic() + duration
+        clients = [
+            Client(base_url, paths, headers, deadline, number)
+            for number in range(concurrency)
+        ]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - started
+        latencies = [
+            latency for client in clients for latency in client.latencies
+        ]
+        errors = sum(client.errors for client in clients)
+        if not latencies:
+            return 0, None, None, errors
+        return (
+            len(latencies) / elapsed, percentile(latencies, 0.5),
+            percentile(latencies, 0.95), errors
+        )
+
+    def handle(self, *args, **options):
+        targets = self.get_targets(options['target'])
+        paths = options['paths'] or DEFAULT_PATHS
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        results = {}
+        for concurrency in options['concurrency'] or (1, 10, 50):
+            for name, base_url in targets:
+                rps, p50, p95, errors = self.run(
+                    base_url, paths, headers, concurrency,
+                    options['duration']
+                )
+                results[name, concurrency] = rps
+                line = f'{name} x{concurrency}: {rps:.1f} запр./с'
+                if p50 is not None:
+                    line += f', p50 {p50:.1f} мс, p95 {p95:.1f} мс'
+                if errors:
+                    line += f', ошибок: {errors}'
+                self.stdout.write(line)
+            base_name = targets[0][0]
+            base_rps = results[base_name, concurrency]
+            for name, _ in targets[1:]:
+                if base_rps:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{name} / {base_name} x{concurrency}: '
+                        f'{results[name, concurrency] / base_rps:.2f}'
+                    ))
@@ -0,0 +1,84 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from api.warmup import WARMUP_PATHS
+
+# Выполняется в новом процессе: загрузка приложения, как в воркере
+# gunicorn, затем первый и второй запрос к каждому пути.
+CHILD_SCRIPT = '''
+import json
+import sys
+import time
+
+started = time.perf_counter()
+from backend.wsgi import application
+loaded = time.perf_counter()
+from django.test import Client
+
+client = Client()
+result = {'load': (loaded - started) * 1000, 'first': {}, 'second': {}}
+for path in sys.argv[1:]:
+    for key in ('first', 'second'):
+        request_started = time.perf_counter()
+        status = client.get(path).status_code
+        result[key][path] = (time.perf_counter() - request_started) * 1000
+        if status >= 400:
+            raise SystemExit(f'{path}: {status}')
+print(json.dumps(result))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Время запуска процесса приложения и первых запросов '
+        'без прогрева и с прогревом (STARTUP_WARMUP).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Запусков процесса на режим; выводится медиана.'
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь первого запроса; можно указать несколько раз. '
+                 'По умолчанию пути прогрева.'
+        )
+
+    def run_child(self, warmup, paths):
+        env = dict(os.environ, STARTUP_WARMUP=str(warmup))
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, *paths],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or WARMUP_PATHS
+        for warmup in (False, True):
+            runs = [
+                self.run_child(warmup, paths)
+                for _ in range(options['repeat'])
+            ]
+            title = 'с прогревом' if warmup else 'без прогрева'
+            load = statistics.median(run['load'] for run in runs)
+            self.stdout.write(self.style.SUCCESS(
+                f'{title}: загрузка приложения {load:.0f} мс'
+            ))
+            for path in paths:
+                first = statistics.median(run['first'][path] for run in runs)
+                second = statistics.median(
+                    run['second'][path] for run in runs
+                )
+                self.stdout.write(
+                    f'  {path}: первый запрос {first:.1f} мс, '
+                    f'второй {second:.1f} мс'
+                )
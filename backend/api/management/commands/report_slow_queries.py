@@ -0,0 +1,98 @@
+import json
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+
+class Shape:
+    """Статистика одной формы запроса по журналу."""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.explain = None
+        self.views = Counter()
+        self.params = Counter()
+
+    def add(self, record):
+        self.count += 1
+        self.total += record['ms']
+        self.max = max(self.max, record['ms'])
+        self.explain = self.explain or record.get('explain')
+        if record.get('view'):
+            self.views[f"{record['view']}.{record['action']}"] += 1
+            self.params[json.dumps(
+                record.get('params') or {}, ensure_ascii=False, sort_keys=True
+            )] += 1
+
+
+class Command(BaseCommand):
+    help = 'Самые затратные формы медленных SQL-запросов из журнала.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.SLOW_QUERY_LOG,
+            help='Файл журнала; ротированные копии читаются тоже.'
+        )
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Количество форм запросов в отчёте.'
+        )
+        parser.add_argument(
+            '--order', choices=('total', 'count', 'max'), default='total',
+            help='Сортировка: суммарное время, количество или максимум.'
+        )
+        parser.add_argument(
+            '--no-plans', action='store_true',
+            help='Не выводить планы запросов.'
+        )
+
+    def read(self, path):
+        paths = [path] + [
+            f'{path}.{number}'
+            for number in range(1, settings.SLOW_QUERY_LOG_BACKUPS + 1)
+        ]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def handle(self, *args, **options):
+        shapes = {}
+        for record in self.read(options['path']):
+            shapes.setdefault(
+                record['shape'], Shape(record['sql'])
+            ).add(record)
+        if not shapes:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        top = sorted(
+            shapes.items(),
+            key=lambda item: getattr(item[1], options['order']),
+            reverse=True
+        )[:options['top']]
+        for number, (shape_id, shape) in enumerate(top, 1):
+            self.stdout.write(self.style.WARNING(
+                f'{number}. {shape_id}: {shape.count} раз, '
+                f'всего {shape.total:.0f} мс, '
+                f'в среднем {shape.total / shape.count:.1f} мс, '
+                f'максимум {shape.max:.1f} мс'
+            ))
+            self.stdout.write(f'   SQL: {shape.sql}')
+            for view, count in shape.views.most_common(3):
+                self.stdout.write(f'   {view}: {count}')
+            for params, count in shape.params.most_common(3):
+                self.stdout.write(f'   параметры {params}: {count}')
+            if shape.explain and not options['no_plans']:
+                self.stdout.write('   План:')
+                for line in shape.explain.splitlines():
+                    self.stdout.write(f'     {line}')
@@ -0,0 +1,127 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from collections import Counter
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                as_completed, wait)
+
+import django
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from prometheus_client import start_http_server
+
+from api import jobs
+from api.metrics import JOB_DELAY, JOB_DURATION, JOBS_FINISHED, get_registry
+
+logger = logging.getLogger('api.jobs')
+
+# Как часто возвращать в очередь зависшие задачи, удалять старые
+# выполненные и обновлять метрику api_jobs, в секундах.
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер фоновых задач api.jobs: забирает готовые задачи из '
+        'таблицы api_job и выполняет их в пуле процессов. SIGTERM или '
+        'Ctrl+C останавливают приём задач; выполняемые дожидаются '
+        'завершения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Процессов в пуле, по умолчанию число CPU.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, в секундах.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+        parser.add_argument(
+            '--metrics-port', type=int,
+            help='Порт HTTP-сервера с метриками Prometheus.'
+        )
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def maintain(self):
+        requeued = jobs.requeue_stale()
+        if requeued:
+            logger.warning('Возвращено зависших задач: %s.', requeued)
+        jobs.purge_done()
+        jobs.update_stats()
+
+    def record(self, future, name):
+        try:
+            result, duration = future.result()
+        except Exception:
+            # Задача останется в статусе running и вернётся в очередь
+            # через JOB_TIMEOUT.
+            logger.exception('Процесс пула не вернул итог задачи %s.', name)
+            result = 'error'
+        else:
+            JOB_DURATION.labels(name).observe(duration)
+        JOBS_FINISHED.labels(name, result).inc()
+        self.results[result] += 1
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        self.results = Counter()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        if options['metrics_port']:
+            start_http_server(options['metrics_port'], registry=get_registry())
+        processes = options['processes']
+        poll_interval = options['poll_interval']
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Воркер {worker}: процессов {processes}.')
+        running = {}
+        maintained_at = None
+        # spawn: процессы пула не наследуют соединения с базой.
+        with ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup
+        ) as pool:
+            while not self.stopping:
+                close_old_connections()
+                if (maintained_at is None
+                   or time.monotonic() - maintained_at > MAINTENANCE_INTERVAL):
+                    self.maintain()
+                    maintained_at = time.monotonic()
+                claimed = jobs.claim(processes - len(running), worker)
+                now = timezone.now()
+                for job_id, name, run_at in claimed:
+                    JOB_DELAY.labels(name).observe(
+                        max((now - run_at).total_seconds(), 0)
+                    )
+                    running[pool.submit(jobs.execute, job_id)] = name
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                done, _ = wait(
+                    running, timeout=poll_interval,
+                    return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    self.record(future, running.pop(future))
+            for future in as_completed(running):
+                self.record(future, running.pop(future))
+        jobs.update_stats()
+        self.stdout.write(self.style.SUCCESS(
+            'Воркер остановлен. Итоги задач: ' + (', '.join(
+                f'{result} {count}'
+                for result, count in sorted(self.results.items())
+            ) or 'нет') + '.'
+        ))
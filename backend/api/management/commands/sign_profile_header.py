@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from api.profiling import sign_profile_header
+
+
+class Command(BaseCommand):
+    help = (
+        'Значение заголовка X-Profile-Signature для профилирования '
+        'запросов без учётной записи сотрудника.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(sign_profile_header())
+        self.stderr.write(
+            f'Действует {settings.PROFILE_SIGNATURE_MAX_AGE} с.'
+        )
@@ -0,0 +1,157 @@
+"""
+Метрики API в формате Prometheus.
+
+При нескольких воркерах gunicorn каждый процесс пишет значения
+в каталог PROMETHEUS_MULTIPROC_DIR, а /metrics собирает их
+из всех файлов каталога (см. gunicorn.conf.py).
+"""
+import os
+import time
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+from .middleware import StepMiddleware
+
+VIEW_LABELS = ('view', 'action', 'method')
+
+REQUESTS = Counter(
+    'api_requests_total', 'Количество запросов.', (*VIEW_LABELS, 'status')
+)
+LATENCY = Histogram(
+    'api_request_duration_seconds', 'Время ответа.', VIEW_LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes', 'Размер тела ответа.', VIEW_LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+DB_QUERIES = Histogram(
+    'api_db_queries', 'SQL-запросов на запрос (по выборке запросов).',
+    VIEW_LABELS, buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_DURATION = Histogram(
+    'api_db_duration_seconds',
+    'Время SQL-запросов на запрос (по выборке запросов).', VIEW_LABELS,
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+CACHE_REQUESTS = Counter(
+    'api_cache_requests_total', 'Обращения к кэшам.', ('cache', 'result')
+)
+DB_CONNECTIONS = Counter(
+    'api_db_connections_total', 'Открытые Django соединения с базой.',
+    ('database',)
+)
+DB_HEALTH_CHECKS = Counter(
+    'api_db_health_checks_total',
+    'Проверки постоянных соединений перед повторным использованием.',
+    ('database', 'result')
+)
+POOL_CONNECTS = Counter(
+    'api_db_pool_connects_total', 'Новые соединения пула с PostgreSQL.',
+    ('database',)
+)
+POOL_IN_USE = Gauge(
+    'api_db_pool_in_use', 'Соединения пула, выданные потокам.',
+    ('database',), multiprocess_mode='livesum',
+)
+POOL_WAIT = Histogram(
+    'api_db_pool_wait_seconds', 'Ожидание свободного соединения пула.',
+    ('database',), buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+THROTTLED = Counter(
+    'api_throttled_total', 'Запросы, отклонённые троттлингом.', ('scope',)
+)
+JOBS_ENQUEUED = Counter(
+    'api_jobs_enqueued_total', 'Поставленные в очередь фоновые задачи.',
+    ('task',)
+)
+JOBS_FINISHED = Counter(
+    'api_jobs_finished_total', 'Выполненные попытки фоновых задач.',
+    ('task', 'result')
+)
+JOB_DURATION = Histogram(
+    'api_job_duration_seconds', 'Время выполнения фоновой задачи.',
+    ('task',), buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+JOB_DELAY = Histogram(
+    'api_job_delay_seconds', 'Ожидание фоновой задачи в очереди.',
+    ('task',), buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800),
+)
+JOBS = Gauge(
+    'api_jobs', 'Фоновые задачи в базе по статусу.', ('status',),
+    multiprocess_mode='livemax',
+)
+IN_FLIGHT = Gauge(
+    'api_requests_in_flight', 'Запросов в обработке.',
+    multiprocess_mode='livesum',
+)
+
+
+def count_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def get_view_labels(request):
+    """
+    Имя вьюсета и action запроса. Для запросов без маршрута —
+    'unresolved', чтобы число меток не росло от произвольных URL.
+    """
+    method = request.method.lower()
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', '', method
+    view = getattr(match.func, 'cls', None)
+    actions = getattr(match.func, 'actions', None) or {}
+    return (
+        view.__name__ if view else match.view_name,
+        actions.get(method, ''),
+        method,
+    )
+
+
+def get_response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+class MetricsMiddleware(StepMiddleware):
+    """
+    Время ответа, размер ответа и число запросов в обработке
+    для каждого запроса. Количество и время SQL-запросов берутся
+    у SQLInstrumentationMiddleware, который должен стоять после
+    этого middleware, поэтому учитывается только их выборка.
+    """
+
+    def handle(self, request):
+        started = time.perf_counter()
+        with IN_FLIGHT.track_inprogress():
+            response = yield
+        duration = time.perf_counter() - started
+        labels = get_view_labels(request)
+        REQUESTS.labels(*labels, response.status_code).inc()
+        LATENCY.labels(*labels).observe(duration)
+        RESPONSE_SIZE.labels(*labels).observe(get_response_size(response))
+        recorder = getattr(request, 'sql_recorder', None)
+        if recorder is not None:
+            DB_QUERIES.labels(*labels).observe(recorder.count)
+            DB_DURATION.labels(*labels).observe(recorder.duration)
+        return response
+
+
+def get_registry():
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,157 @@
+import json
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .queries import QueryRecorder, record_queries
+
+logger = logging.getLogger('api.sql')
+
+PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+NUMBER = re.compile(r'\b\d+\b')
+
+
+def get_shape(sql):
+    """
+    Форма запроса: SQL без значений. Списки параметров IN (...)
+    разной длины и числа в тексте запроса сворачиваются.
+    """
+    return NUMBER.sub('N', PLACEHOLDER_LIST.sub('%s, ...', sql))
+
+
+class ShapeRecorder(QueryRecorder):
+    """Учёт запросов по формам для поиска повторов (N+1)."""
+
+    def __init__(self):
+        super().__init__()
+        self.shapes = defaultdict(lambda: [0, 0.0])
+
+    def record(self, sql, params, many, duration):
+        shape = self.shapes[get_shape(sql)]
+        shape[0] += 1
+        shape[1] += duration
+
+    def get_repeated(self, threshold):
+        """Формы, выполненные не меньше threshold раз за запрос."""
+        return sorted(
+            (
+                {'sql': sql, 'count': count, 'ms': round(duration * 1000, 2)}
+                for sql, (count, duration) in self.shapes.items()
+                if count >= threshold
+            ),
+            key=lambda shape: -shape['count']
+        )
+
+
+class StepMiddleware:
+    """
+    Middleware для WSGI и ASGI без переключения потоков.
+
+    Наследник описывает обработку генератором handle(request):
+    код до yield выполняется перед вьюхой, yield возвращает ответ,
+    а return — итоговый ответ. Под ASGI генератор выполняется в цикле
+    событий, поэтому обращаться к базе в handle нельзя.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def handle(self, request):
+        return (yield)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        steps = self.handle(request)
+        next(steps)
+        try:
+            response = self.get_response(request)
+        except BaseException as error:
+            steps.throw(error)
+            raise
+        return self.finish(steps, response)
+
+    async def acall(self, request):
+        steps = self.handle(request)
+        next(steps)
+        try:
+            response = await self.get_response(request)
+        except BaseException as error:
+            steps.throw(error)
+            raise
+        return self.finish(steps, response)
+
+    def finish(self, steps, response):
+        try:
+            steps.send(response)
+        except StopIteration as stop:
+            return stop.value
+        raise RuntimeError('handle() должен содержать один yield.')
+
+
+class SQLInstrumentationMiddleware(StepMiddleware):
+    """
+    Количество и время SQL-запросов на HTTP-запрос без DEBUG.
+    Для доли запросов SQL_SAMPLE_RATE запросы всех соединений
+    учитываются через record_queries; результат отдаётся в заголовке
+    Server-Timing и пишется в лог api.sql. Повторы одной формы запроса
+    от SQL_REPEATED_THRESHOLD раз (N+1) пишутся с уровнем WARNING.
+    """
+
+    def handle(self, request):
+        if random.random() >= settings.SQL_SAMPLE_RATE:
+            return (yield)
+        recorder = request.sql_recorder = ShapeRecorder()
+        started = time.perf_counter()
+        with record_queries(recorder):
+            response = yield
+        duration = time.perf_counter() - started
+        repeated = recorder.get_repeated(settings.SQL_REPEATED_THRESHOLD)
+        if settings.SQL_SERVER_TIMING:
+            self.add_server_timing(response, recorder, duration, repeated)
+        self.log(request, response, recorder, duration, repeated)
+        return response
+
+    def add_server_timing(self, response, recorder, duration, repeated):
+        metrics = [
+            f'db;dur={recorder.duration * 1000:.2f};'
+            f'desc="{recorder.count} queries, {recorder.rows} rows"',
+            f'app;dur={(duration - recorder.duration) * 1000:.2f}',
+        ]
+        if repeated:
+            metrics.append(f'nplusone;desc="{len(repeated)} repeated"')
+        if response.has_header('Server-Timing'):
+            metrics.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(metrics)
+
+    def log(self, request, response, recorder, duration, repeated):
+        level = logging.WARNING if repeated else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'ms': round(duration * 1000, 2),
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 2),
+            'rows': recorder.rows,
+            'repeated': repeated,
+        }
+        logger.log(
+            level, json.dumps(record, ensure_ascii=False),
+            extra={'sql': record}
+        )
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+INDEX_NAME = 'ingredient_name_prefix_idx'
+
+
+def create_index(apps, schema_editor):
+    """
+    Индекс для поиска ингредиентов по началу имени (name__istartswith):
+    Django строит условие UPPER("name"::text) LIKE UPPER(%s), обычный
+    btree-индекс для LIKE в PostgreSQL не подходит.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON recipes_ingredient '
+        '((UPPER("name"::text)) text_pattern_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
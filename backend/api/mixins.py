@@ -0,0 +1,205 @@
+import hashlib
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from recipes.catalog import catalog
+
+from .metrics import count_cache
+from .serializers import BulkIdsSerializer
+
+
+class ValuesListMixin:
+    """
+    Быстрый путь для action list.
+    Включается во вьюсете атрибутом values_list_enabled,
+    сериализатор задаётся атрибутом values_serializer_class.
+    """
+
+    values_list_enabled = True
+    values_serializer_class = None
+
+    def use_values_list(self):
+        return (self.values_list_enabled
+                and self.values_serializer_class is not None)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values_list():
+            return super().list(request, *args, **kwargs)
+        serializer = self.values_serializer_class(request)
+        rows = serializer.get_values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+        return Response(serializer.to_representation(rows))
+
+
+class ConditionalGetMixin:
+    """
+    Условный GET для action из conditional_actions.
+    Версия ответа считается одним запросом по MAX(updated_at) и COUNT,
+    при совпадении If-None-Match ответ 304 отдаётся без сериализации.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    version = None
+
+    def get_version_annotations(self):
+        """Дополнительные поля версии объекта для action retrieve."""
+        return {}
+
+    def get_version(self):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            annotations = self.get_version_annotations()
+            try:
+                version = queryset.filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                ).annotate(**annotations).values(
+                    'updated_at', *annotations
+                ).first()
+            except (ValueError, TypeError, ValidationError):
+                # Некорректный id: ответ 404 вернёт get_object.
+                return None
+            return version and dict(version, count=1)
+        return queryset.aggregate(
+            updated_at=Max('updated_at'), count=Count('pk')
+        )
+
+    def get_last_modified(self, version):
+        """Самая поздняя из дат изменения в версии."""
+        timestamps = [
+            value for value in version.values()
+            if isinstance(value, datetime)
+        ]
+        return timestamps and int(max(timestamps).timestamp())
+
+    def get_etag(self, version):
+        key = '|'.join((
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format or '',
+            repr(sorted(version.items())),
+        ))
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    def conditional(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+        version = self.version = self.get_version()
+        if not version or not version['count']:
+            return handler(request, *args, **kwargs)
+        etag = self.get_etag(version)
+        last_modified = self.get_last_modified(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class IngredientCatalogMixin:
+    """
+    Ответы из снимка каталога ингредиентов.
+    Ставится после ConditionalGetMixin: снимок используется, только
+    если его версия совпадает с версией, посчитанной по базе.
+    Полный список отдаётся потоковым FileResponse.
+    """
+
+    catalog_enabled = True
+
+    def list(self, request, *args, **kwargs):
+        """
+        Полный список без поиска отдаётся готовым JSON из снимка
+        каталога, если снимок соответствует базе.
+        """
+        if (self.catalog_enabled
+           and self.version and self.version['count']
+           and not request.query_params.get('name')
+           and request.accepted_media_type == 'application/json'):
+            snapshot = catalog.open_json(
+                self.version['count'], self.version['updated_at']
+            )
+            count_cache('ingredient-catalog', snapshot is not None)
+            if snapshot is not None:
+                file, length = snapshot
+                response = FileResponse(
+                    file, content_type='application/json'
+                )
+                response['Content-Length'] = length
+                return response
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if (self.catalog_enabled and self.version
+           and request.accepted_renderer.format == 'json'):
+            ingredient = catalog.get(
+                int(kwargs['pk']), self.version['updated_at']
+            )
+            count_cache('ingredient-catalog', ingredient is not None)
+            if ingredient is not None:
+                return Response(ingredient)
+        return super().retrieve(request, *args, **kwargs)
+
+
+class BulkRelationMixin:
+    """
+    Массовое добавление и удаление связей текущего пользователя
+    одной транзакцией с результатом по каждому id.
+    """
+
+    def bulk_relation(self, request, relation, excluded=()):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        outcomes = dict.fromkeys(
+            (pk for pk in ids if pk in excluded), 'self'
+        )
+        target_ids = [pk for pk in ids if pk not in outcomes]
+        if request.method == 'POST':
+            change, done, unchanged = relation.add_many, 'created', 'exists'
+        else:
+            change, done, unchanged = (
+                relation.remove_many, 'deleted', 'missing'
+            )
+        changed, existing = set(), set()
+        if target_ids:
+            with transaction.atomic():
+                changed = {
+                    row['id'] for row in change(request.user.id, target_ids)
+                }
+                rest = [pk for pk in target_ids if pk not in changed]
+                if rest:
+                    existing = set(relation.target_model.objects.filter(
+                        pk__in=rest
+                    ).values_list('pk', flat=True))
+        for pk in target_ids:
+            if pk in changed:
+                outcomes[pk] = done
+            elif pk in existing:
+                outcomes[pk] = unchanged
+            else:
+                outcomes[pk] = 'not_found'
+        return Response([
+            {'id': pk, 'status': outcomes[pk]} for pk in ids
+        ])
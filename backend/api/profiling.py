@@ -0,0 +1,280 @@
+"""
+Профилирование отдельных запросов по требованию.
+
+Запрос профилируется, если у него есть подписанный заголовок
+X-Profile-Signature (manage.py sign_profile_header) или параметр
+?profile= и запрос сделан сотрудником (is_staff). Значение параметра —
+режим: sample (по умолчанию) пишет стеки в формате collapsed/folded
+для flamegraph.pl и speedscope, cprofile — статистику cProfile (.prof).
+
+Под ASGI профилируются только вьюхи из api.async_views: они
+выполняются в пуле потоков, и профиль снимается в потоке вьюхи.
+
+Рядом с профилем лежит JSON с вьюсетом, action и сводкой SQL-запросов.
+Число профилей ограничено PROFILE_RATE_LIMIT в минуту на процесс,
+размер профиля — PROFILE_MAX_BYTES, каталога — PROFILE_DIR_MAX_BYTES.
+"""
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from .authentication import CachedTokenAuthentication
+from .metrics import get_view_labels
+from .middleware import ShapeRecorder, StepMiddleware
+from .queries import record_queries
+
+SIGNATURE_HEADER = 'HTTP_X_PROFILE_SIGNATURE'
+SIGNATURE_SALT = 'api.profiling'
+SIGNATURE_VALUE = 'profile'
+MODES = {'sample': '.folded', 'cprofile': '.prof'}
+PROFILE_ID = re.compile(r'^[\w-]+$')
+
+rate_lock = threading.Lock()
+recent_profiles = deque()
+
+
+def sign_profile_header():
+    return signing.TimestampSigner(salt=SIGNATURE_SALT).sign(
+        SIGNATURE_VALUE
+    )
+
+
+def has_valid_signature(request):
+    value = request.META.get(SIGNATURE_HEADER)
+    if not value:
+        return False
+    try:
+        return signing.TimestampSigner(salt=SIGNATURE_SALT).unsign(
+            value, max_age=settings.PROFILE_SIGNATURE_MAX_AGE
+        ) == SIGNATURE_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def is_staff(request):
+    """Сотрудник по сессии или по токену API."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        result = CachedTokenAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def allow_profile():
+    """Не больше PROFILE_RATE_LIMIT профилей за минуту в процессе."""
+    now = time.monotonic()
+    with rate_lock:
+        while recent_profiles and now - recent_profiles[0] > 60:
+            recent_profiles.popleft()
+        if len(recent_profiles) >= settings.PROFILE_RATE_LIMIT:
+            return False
+        recent_profiles.append(now)
+        return True
+
+
+def get_frame_name(frame):
+    code = frame.f_code
+    return (
+        f'{code.co_name} '
+        f'({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+    )
+
+
+class StackSampler:
+    """
+    Снимает стек потока thread_id каждые interval секунд
+    и считает одинаковые стеки.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(get_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path, max_bytes):
+        """Стеки по убыванию частоты, пока файл не больше max_bytes."""
+        size = 0
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                line = f'{stack} {count}\n'
+                size += len(line.encode())
+                if size > max_bytes:
+                    return True
+                file.write(line)
+        return False
+
+
+def trim_profiles(directory, max_bytes):
+    """Удалить самые старые профили, пока каталог больше max_bytes."""
+    entries = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    total = sum(entry.stat().st_size for entry in entries)
+    for entry in entries:
+        if total <= max_bytes:
+            break
+        total -= entry.stat().st_size
+        os.unlink(entry.path)
+
+
+def list_profiles():
+    """Описания профилей, новые первыми."""
+    directory = settings.PROFILE_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as file:
+                profile = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if os.path.exists(get_profile_path(profile['id'])):
+            profiles.append(profile)
+    return sorted(profiles, key=lambda profile: profile['time'], reverse=True)
+
+
+def get_profile_path(profile_id):
+    """Файл профиля по id или None, если такого нет."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    for extension in MODES.values():
+        path = os.path.join(settings.PROFILE_DIR, profile_id + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def get_mode(request):
+    mode = request.GET.get('profile')
+    if mode is not None:
+        if mode not in MODES:
+            mode = 'sample'
+        if has_valid_signature(request) or is_staff(request):
+            return mode
+        return None
+    if has_valid_signature(request):
+        return 'sample'
+    return None
+
+
+def profile_view(request, view, *args, **kwargs):
+    """Вызвать view(request, ...), профилируя его, если это запрошено."""
+    mode = get_mode(request)
+    if mode is None:
+        return view(request, *args, **kwargs)
+    if not allow_profile():
+        response = view(request, *args, **kwargs)
+        response['X-Profile'] = 'rate-limited'
+        return response
+    recorder = ShapeRecorder()
+    started = time.perf_counter()
+    with record_queries(recorder):
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                profiler.disable()
+        else:
+            profiler = StackSampler(
+                threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL
+            )
+            with profiler:
+                response = view(request, *args, **kwargs)
+    duration = time.perf_counter() - started
+    response['X-Profile'] = save_profile(
+        request, response, mode, profiler, recorder, duration
+    )
+    return response
+
+
+def save_profile(request, response, mode, profiler, recorder, duration):
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    view, action, method = get_view_labels(request)
+    profile_id = '-'.join((
+        timezone.now().strftime('%Y%m%d%H%M%S'),
+        re.sub(r'\W', '_', f'{view}_{action}'),
+        uuid.uuid4().hex[:8],
+    ))
+    path = os.path.join(directory, profile_id + MODES[mode])
+    truncated = False
+    if mode == 'cprofile':
+        profiler.dump_stats(path)
+        if os.path.getsize(path) > settings.PROFILE_MAX_BYTES:
+            os.unlink(path)
+            return 'too-large'
+    else:
+        truncated = profiler.write(path, settings.PROFILE_MAX_BYTES)
+    repeated = recorder.get_repeated(settings.SQL_REPEATED_THRESHOLD)
+    with open(os.path.join(directory, profile_id + '.json'), 'w',
+              encoding='utf-8') as file:
+        json.dump({
+            'id': profile_id,
+            'time': timezone.now().isoformat(),
+            'mode': mode,
+            'view': view,
+            'action': action,
+            'method': method.upper(),
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'ms': round(duration * 1000, 2),
+            'size': os.path.getsize(path),
+            'truncated': truncated,
+            'sql': {
+                'queries': recorder.count,
+                'ms': round(recorder.duration * 1000, 2),
+                'rows': recorder.rows,
+                'repeated': repeated,
+            },
+        }, file, ensure_ascii=False)
+    trim_profiles(directory, settings.PROFILE_DIR_MAX_BYTES)
+    return profile_id
+
+
+class ProfilingMiddleware(StepMiddleware):
+    """Профилирование запроса по подписанному заголовку или ?profile=."""
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.get_response(request)
+        return profile_view(request, self.get_response)
@@ -0,0 +1,103 @@
+"""
+Учёт SQL-запросов: количество, суммарное время и число строк,
+прочитанных из курсоров.
+
+Обработчик record_current стоит в execute_wrappers каждого соединения
+(сигнал connection_created) и передаёт запросы учётчикам из
+контекстной переменной. Поэтому учитываются запросы всех соединений,
+в том числе из потоков, в которых работают асинхронные вьюхи.
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+current_recorders = ContextVar('current_recorders', default=())
+
+
+class RowCountingCursor:
+    """Обёртка курсора драйвера БД, считающая прочитанные строки."""
+
+    def __init__(self, cursor, recorder):
+        self.cursor = cursor
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        for row in self.cursor:
+            self.recorder.rows += 1
+            yield row
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.recorder.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self.cursor.fetchmany(*args, **kwargs)
+        self.recorder.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        self.recorder.rows += len(rows)
+        return rows
+
+
+class QueryRecorder:
+    """
+    Учётчик запросов для record_queries.
+    Наследники могут переопределить record, чтобы сохранять
+    сами запросы.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.rows = 0
+
+    def record(self, sql, params, many, duration):
+        pass
+
+    def __call__(self, execute, sql, params, many, context):
+        wrapper = context['cursor']
+        if not isinstance(wrapper.cursor, RowCountingCursor):
+            wrapper.cursor = RowCountingCursor(wrapper.cursor, self)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            self.record(sql, params, many, duration)
+
+
+def record_current(execute, sql, params, many, context):
+    """Обработчик для connection.execute_wrappers."""
+    for recorder in current_recorders.get():
+        execute = functools.partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    """
+    Поставить обработчик первым: connection.execute_wrapper снимает
+    при выходе последний обработчик списка.
+    """
+    if record_current not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_current)
+
+
+@contextmanager
+def record_queries(recorder=None):
+    """Учитывать запросы всех соединений внутри блока with."""
+    recorder = recorder or QueryRecorder()
+    token = current_recorders.set(current_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        current_recorders.reset(token)
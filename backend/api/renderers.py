@@ -0,0 +1,36 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson.
+    Даты, Decimal и ленивые строки отдаются в default энкодера DRF,
+    поэтому вывод совпадает со стандартным JSONRenderer.
+    Без orjson, с отступами или ensure_ascii работает как JSONRenderer.
+    """
+
+    def use_orjson(self, indent):
+        return (orjson is not None and indent is None
+                and self.compact and not self.ensure_ascii)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if data is None or not self.use_orjson(indent):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Как и JSONRenderer, экранируем \u2028 и \u2029.
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
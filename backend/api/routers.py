@@ -0,0 +1,95 @@
+"""
+Чтение с реплик базы данных.
+
+Запросы безопасными методами к вьюсетам с атрибутом
+read_from_replica = True читают с одной из реплик REPLICA_DATABASES,
+выбранной на весь запрос. Запись, чтение внутри transaction.atomic
+и токены всегда идут в основную базу. После успешного изменяющего
+запроса клиент REPLICA_STICKY_SECONDS секунд читает из основной базы,
+чтобы видеть свои изменения, пока реплики догоняют. Без общего кэша
+(REPLICA_STICKY_CACHE_ALIAS) эта привязка действует только в воркере,
+обработавшем запись.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import CountingCache
+from .middleware import StepMiddleware
+
+PRIMARY_MODELS = ('authtoken.Token',)
+
+current_replica = ContextVar('current_replica', default=None)
+sticky_cache = CountingCache(
+    'replica-sticky', settings.TOKEN_CACHE_SIZE,
+    settings.REPLICA_STICKY_SECONDS, settings.REPLICA_STICKY_CACHE_ALIAS,
+)
+
+
+class ReplicaRouter:
+    """Роутер Django для реплик (DATABASE_ROUTERS)."""
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica.get()
+        if (replica is None or model._meta.label in PRIMARY_MODELS
+           or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def get_sticky_key(request):
+    """Клиент: заголовок Authorization или пользователь сессии."""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if authorization:
+        return hashlib.md5(authorization.encode()).hexdigest()
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return None
+
+
+class ReplicaMiddleware(StepMiddleware):
+    """
+    Выбор реплики для запроса и привязка к основной базе после записи.
+    Под ASGI process_view выполняется в другом потоке и контексте,
+    поэтому реплика сбрасывается присваиванием, а не токеном.
+    """
+
+    def handle(self, request):
+        try:
+            response = yield
+        finally:
+            if getattr(request, 'replica', None) is not None:
+                current_replica.set(None)
+        if (request.method not in SAFE_METHODS
+           and response.status_code < 400):
+            key = get_sticky_key(request)
+            if key is not None:
+                sticky_cache.set(key, True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', None)
+        if (not settings.REPLICA_DATABASES
+           or request.method not in SAFE_METHODS
+           or not getattr(view, 'read_from_replica', False)):
+            return None
+        key = get_sticky_key(request)
+        if key is not None and sticky_cache.get(key):
+            return None
+        request.replica = random.choice(settings.REPLICA_DATABASES)
+        current_replica.set(request.replica)
+        return None
@@ -1,23 +1,53 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from djoser.serializers import UserCreateSerializer
 from drf_extra_fields.fields import Base64ImageField
 from django.db import transaction
-from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404
 
 from rest_framework.validators import UniqueTogetherValidator
 from rest_framework.serializers import (
-    PrimaryKeyRelatedField, ReadOnlyField, ImageField, IntegerField
+    PrimaryKeyRelatedField, ReadOnlyField, ImageField, IntegerField,
+    ListSerializer
 )
 from recipes.models import (LIMITATION, Favorite, Ingredient, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
 from users.models import Follow
 
+from .cache import get_relation_ids
+from .jobs import enqueue
+
 from rest_framework import serializers
 
 User = get_user_model()
 
 
+def get_batch_ids(serializer, obj):
+    """
+    Id объектов, выводимых вместе с obj: при выводе списка — всех
+    его элементов (для вложенного сериализатора — их полей), иначе
+    только obj. Вычисляются один раз на список.
+    """
+    path = []
+    node = serializer
+    while (node.parent is not None
+           and not isinstance(node.parent, ListSerializer)):
+        path = node.source_attrs + path
+        node = node.parent
+    items = node.parent.instance if node.parent is not None else None
+    if items is None:
+        return [obj.id]
+    batch_ids = node.parent.__dict__.setdefault('batch_ids', {})
+    key = tuple(path)
+    if key not in batch_ids:
+        for attr in path:
+            items = [getattr(item, attr) for item in items]
+        batch_ids[key] = [item.id for item in items if item is not None]
+    return batch_ids[key] + [obj.id]
+
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Сериализатор модели User.
@@ -41,10 +71,9 @@ class UserSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
         if (request and request.user.is_authenticated):
-            return Follow.objects.filter(
-                follower=request.user,
-                following=obj
-            ).exists()
+            return obj.id in get_relation_ids(
+                request, 'follows', get_batch_ids(self, obj)
+            )
         return False
 
 
@@ -70,7 +99,7 @@ class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = "__all__"
+        fields = ("id", "name", "color", "slug")
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -172,7 +201,9 @@ class RecipeListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return obj.favorite.filter(user=request.user).exists()
+        return obj.id in get_relation_ids(
+            request, 'favorites', get_batch_ids(self, obj)
+        )
 
     def get_is_in_shopping_cart(self, obj):
         """
@@ -181,7 +212,9 @@ class RecipeListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return obj.shopping_cart.filter(user=request.user).exists()
+        return obj.id in get_relation_ids(
+            request, 'shopping_cart', get_batch_ids(self, obj)
+        )
 
 
 class RecipeCreateUpdateSerializers(serializers.ModelSerializer):
@@ -211,17 +244,20 @@ class RecipeCreateUpdateSerializers(serializers.ModelSerializer):
 
     def validate(self, data):
         ingredients = data['ingredients']
+        existing = set(Ingredient.objects.filter(
+            id__in=[unique['id'] for unique in ingredients]
+        ).values_list('id', flat=True))
         ingredient_list = []
         for unique in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient, id=unique['id'])
-            if ingredient in ingredient_list:
+            if unique['id'] not in existing:
+                raise Http404('Ингредиент не найден.')
+            if unique['id'] in ingredient_list:
                 raise serializers.ValidationError(
                     'Ингредиент должен быть уникальным!')
             if int(unique.get('amount')) < 1:
                 raise serializers.ValidationError(
                     'Количество ингредиента >= 1!')
-            ingredient_list.append(ingredient)
+            ingredient_list.append(unique['id'])
         return data
 
     def validate_cooking_time(self, cooking_time):
@@ -239,13 +275,21 @@ class RecipeCreateUpdateSerializers(serializers.ModelSerializer):
 
             if ingredient_id and ingredient_amount:
                 recipe_ingredient = RecipeIngredient(
-                    ingredient=Ingredient.objects.get(id=ingredient_id),
+                    ingredient_id=ingredient_id,
                     recipe=recipe,
                     amount=ingredient_amount
                 )
                 recipe_ingredients.append(recipe_ingredient)
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    def process_image(self, recipe):
+        """Полная проверка и обработка нового изображения в фоне."""
+        enqueue(
+            'process_recipe_image',
+            {'recipe_id': recipe.id, 'name': recipe.image.name},
+            key=f'recipe-image:{recipe.image.name}'
+        )
+
     @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request')
@@ -254,6 +298,7 @@ class RecipeCreateUpdateSerializers(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=request.user, **validated_data)
         recipe.tags.set(tags)
         self.create_ingredients_amounts(recipe=recipe, ingredients=ingredients)
+        self.process_image(recipe)
         return recipe
 
     @transaction.atomic
@@ -269,9 +314,16 @@ class RecipeCreateUpdateSerializers(serializers.ModelSerializer):
             ingredients=ingredients
         )
         instance.save()
+        if 'image' in validated_data:
+            self.process_image(instance)
         return instance
 
     def to_representation(self, instance):
+        # Ингредиенты ответа одним запросом, а не по одному на строку.
+        prefetch_related_objects([instance], Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
         return RecipeListSerializer(instance, context={
             'request': self.context.get('request')
         }).data
@@ -374,8 +426,9 @@ class SubscriptionsSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            follower=request.user, following=obj).exists()
+        return obj.id in get_relation_ids(
+            request, 'follows', get_batch_ids(self, obj)
+        )
 
     def get_recipes(self, obj):
         request = self.context.get('request')
@@ -389,7 +442,7 @@ class SubscriptionsSerializer(serializers.ModelSerializer):
             recipes, many=True, context={'request': request}).data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        return obj.recipes_count
 
 
 class SubscribeListSerializer(serializers.ModelSerializer):
@@ -439,3 +492,40 @@ class PasswordSerializer(serializers.ModelSerializer):
                 "Не верный пароль. Введите пороль ещё раз."
             )
         return value
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    """
+    Сериализатор списка id для массовых операций
+    с избранным, списком покупок и подписками.
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_ITEMS,
+    )
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Один запрос внутри батча."""
+
+    method = serializers.ChoiceField(
+        choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+    )
+    path = serializers.CharField(max_length=LIMITATION)
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    """
+    Сериализатор батча запросов к API.
+    """
+
+    requests = BatchItemSerializer(
+        many=True, allow_empty=False,
+        max_length=settings.BATCH_MAX_REQUESTS,
+    )
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens, invalidate_user_tokens
+from .connections import check_connections, connection_opened
+from .queries import install as install_query_recorder
+from .slow_queries import install as install_slow_query_recorder
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Выход из системы (djoser token/logout) или удаление токена."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """Смена пароля, деактивация и прочие изменения пользователя."""
+    if created:
+        return
+    invalidate_user_tokens([instance.pk])
+
+
+@receiver(connection_created)
+def database_connected(sender, connection, **kwargs):
+    """Учёт запросов, журнал медленных запросов и метрики соединения."""
+    install_query_recorder(connection)
+    install_slow_query_recorder(connection)
+    connection_opened(connection)
+
+
+@receiver(request_started)
+def request_started_check_connections(sender, **kwargs):
+    """Проверка постоянных соединений перед запросом."""
+    check_connections()
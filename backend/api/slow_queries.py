@@ -0,0 +1,163 @@
+"""
+Журнал медленных SQL-запросов.
+
+Обработчик стоит в execute_wrappers каждого соединения (сигнал
+connection_created) и пишет запросы дольше SLOW_QUERY_THRESHOLD_MS
+в файл SLOW_QUERY_LOG строками JSON вместе с вьюсетом, action
+и параметрами запроса, при котором они выполнены. Для каждой формы
+запроса процесс один раз сохраняет план выполнения (EXPLAIN без
+ANALYZE). Отчёт — manage.py report_slow_queries.
+
+Файл общий для всех воркеров, поэтому сами они его не ротируют:
+это делает logrotate, а обработчик открывает файл заново, когда
+прежний переименован.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import WatchedFileHandler
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .metrics import get_view_labels
+from .middleware import StepMiddleware, get_shape
+
+logger = logging.getLogger('api.slow_queries')
+
+EXPLAINED_SHAPES_LIMIT = 10000
+# Запись журнала уходит в файл одним write, если она меньше буфера.
+RECORD_BUFFER_SIZE = 1024 * 1024
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+current_request = ContextVar('current_request', default=None)
+local = threading.local()
+explained_shapes = set()
+handler_lock = threading.Lock()
+
+
+def get_shape_id(shape):
+    return hashlib.md5(shape.encode()).hexdigest()[:12]
+
+
+class SharedFileHandler(WatchedFileHandler):
+    """
+    WatchedFileHandler с большим буфером: запись попадает в файл одним
+    дописыванием в конец и не перемешивается с записями других воркеров.
+    """
+
+    def _open(self):
+        return open(
+            self.baseFilename, self.mode, buffering=RECORD_BUFFER_SIZE,
+            encoding=self.encoding
+        )
+
+
+def get_log_handler():
+    """Файловый обработчик создаётся при первом медленном запросе."""
+    with handler_lock:
+        if not logger.handlers:
+            os.makedirs(
+                os.path.dirname(settings.SLOW_QUERY_LOG), exist_ok=True
+            )
+            logger.addHandler(SharedFileHandler(
+                settings.SLOW_QUERY_LOG, encoding='utf-8'
+            ))
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger.handlers[0]
+
+
+def explain(connection, sql, params):
+    """План запроса без выполнения; None, если его не получить."""
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE false) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    local.explaining = True
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                return '\n'.join(
+                    ' '.join(map(str, row)) for row in cursor.fetchall()
+                )
+    except DatabaseError:
+        return None
+    finally:
+        local.explaining = False
+
+
+def get_context():
+    request = current_request.get()
+    if request is None:
+        return {}
+    view, action, method = get_view_labels(request)
+    return {
+        'view': view,
+        'action': action,
+        'method': method.upper(),
+        'path': request.path,
+        'params': dict(request.GET.lists()),
+    }
+
+
+def slow_query_recorder(execute, sql, params, many, context):
+    """Обработчик для connection.execute_wrappers."""
+    if getattr(local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - started) * 1000
+    if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+        record_slow_query(context['connection'], sql, params, many, duration)
+    return result
+
+
+def record_slow_query(connection, sql, params, many, duration):
+    shape = get_shape(sql)
+    shape_id = get_shape_id(shape)
+    record = {
+        'time': timezone.now().isoformat(),
+        'ms': round(duration, 2),
+        'shape': shape_id,
+        'sql': shape,
+        'database': connection.alias,
+        **get_context(),
+    }
+    if (shape_id not in explained_shapes and not many
+       and sql.lstrip().upper().startswith(EXPLAINABLE)):
+        if len(explained_shapes) >= EXPLAINED_SHAPES_LIMIT:
+            explained_shapes.clear()
+        explained_shapes.add(shape_id)
+        record['explain'] = explain(connection, sql, params)
+    get_log_handler()
+    logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def install(connection):
+    """
+    Поставить обработчик первым: connection.execute_wrapper снимает
+    при выходе последний обработчик списка.
+    """
+    if (settings.SLOW_QUERY_THRESHOLD_MS
+       and slow_query_recorder not in connection.execute_wrappers):
+        connection.execute_wrappers.insert(0, slow_query_recorder)
+
+
+class SlowQueryContextMiddleware(StepMiddleware):
+    """Запоминает текущий запрос для записей журнала."""
+
+    def handle(self, request):
+        token = current_request.set(request)
+        try:
+            return (yield)
+        finally:
+            current_request.reset(token)
@@ -0,0 +1,100 @@
+"""Фоновые задачи API, выполняемые manage.py run_worker (api.jobs)."""
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+from .jobs import JobFailed, task
+
+User = get_user_model()
+
+EXIF_ORIENTATION = 0x0112
+
+
+@task('delete_user')
+def delete_user(user_id):
+    """
+    Удалить деактивированного пользователя. Рецепты с ингредиентами,
+    избранным и списками покупок удаляются пачками по
+    JOB_DELETE_BATCH_SIZE, каждая в своей транзакции.
+    """
+    if not User.objects.filter(id=user_id, is_active=False).exists():
+        return
+    recipes = Recipe.objects.filter(author_id=user_id).order_by('id')
+    while True:
+        ids = list(
+            recipes.values_list('id', flat=True)[
+                :settings.JOB_DELETE_BATCH_SIZE
+            ]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            Recipe.objects.filter(id__in=ids).delete()
+    with transaction.atomic():
+        User.objects.filter(id=user_id, is_active=False).delete()
+
+
+@task('process_recipe_image')
+def process_recipe_image(recipe_id, name):
+    """
+    Декодировать изображение рецепта целиком; повёрнутое по EXIF
+    или больше RECIPE_IMAGE_MAX_SIZE точек по стороне — повернуть,
+    уменьшить и сохранить под новым именем. Поле рецепта меняется
+    одним UPDATE, прежний файл удаляется после замены. Изображение,
+    которое не декодируется, остаётся как есть, а задача завершается
+    ошибкой без повторов.
+    """
+    recipe = Recipe.objects.filter(id=recipe_id, image=name).first()
+    if recipe is None:
+        # Рецепт удалён или изображение уже заменено.
+        return
+    storage = recipe.image.storage
+    # Ошибка чтения хранилища повторяется, ошибка декодирования — нет.
+    with storage.open(name) as file:
+        data = file.read()
+    try:
+        image = Image.open(BytesIO(data))
+        image.load()
+    except (OSError, SyntaxError, ValueError,
+            Image.DecompressionBombError) as error:
+        raise JobFailed(
+            f'Изображение {name} рецепта {recipe_id} не декодируется.'
+        ) from error
+    max_size = settings.RECIPE_IMAGE_MAX_SIZE
+    rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+    if getattr(image, 'is_animated', False) or (
+        not rotated and max(image.size) <= max_size
+    ):
+        return
+    image_format = image.format
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size))
+    buffer = BytesIO()
+    image.save(
+        buffer, format=image_format, optimize=True,
+        quality=settings.RECIPE_IMAGE_QUALITY
+    )
+    # Файл с именем name существует, хранилище выберет свободное.
+    new_name = storage.save(name, ContentFile(buffer.getvalue()))
+    if not replace_image(storage, recipe_id, name, new_name):
+        storage.delete(new_name)
+
+
+def replace_image(storage, recipe_id, name, new_name):
+    """
+    Заменить изображение рецепта, если оно всё ещё name, и удалить
+    файл name. updated_at меняется, чтобы сбросить ETag рецепта.
+    """
+    replaced = Recipe.objects.filter(id=recipe_id, image=name).update(
+        image=new_name, updated_at=timezone.now()
+    )
+    if replaced:
+        storage.delete(name)
+    return replaced
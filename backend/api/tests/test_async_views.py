@@ -0,0 +1,132 @@
+import asyncio
+import os
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import (AsyncClient, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import include, path, resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import async_views
+from api import urls as api_urls
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+
+User = get_user_model()
+
+# Маршруты как под ASGI: ASYNC_VIEWS читается при импорте api.urls.
+urlpatterns = [
+    path('api/', include((
+        async_views.get_async_urls(api_urls.router_v1.urls)
+        + api_urls.urlpatterns,
+        'api'
+    ))),
+]
+
+
+@override_settings(
+    ROOT_URLCONF='api.tests.test_async_views', THROTTLE_ENABLED=False
+)
+class AsyncViewsTest(TransactionTestCase):
+    """api.async_views: чтение в пуле потоков под ASGI."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        self.ingredient = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', image='recipe.png',
+            text='Описание', cooking_time=10
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.recipe_ingredients.create(
+            ingredient=self.ingredient, amount=200
+        )
+
+    def get(self, path, **headers):
+        # AsyncClient в Django 3.2 принимает заголовки ASGI, а не HTTP_*.
+        return asyncio.run(AsyncClient().get(path, **headers))
+
+    def test_routes(self):
+        for path_ in ('/api/recipes/', f'/api/recipes/{self.recipe.id}/',
+                      '/api/recipes/download_shopping_cart/', '/api/tags/',
+                      f'/api/tags/{self.tag.id}/', '/api/ingredients/',
+                      f'/api/ingredients/{self.ingredient.id}/'):
+            view = resolve(path_).func
+            self.assertTrue(asyncio.iscoroutinefunction(view), path_)
+            self.assertFalse(
+                asyncio.iscoroutinefunction(view.sync_view), path_
+            )
+        for path_ in ('/api/users/', '/api/batch/',
+                      f'/api/recipes/{self.recipe.id}/favorite/'):
+            view = resolve(path_).func
+            self.assertFalse(asyncio.iscoroutinefunction(view), path_)
+
+    def test_same_response_as_sync(self):
+        client = APIClient()
+        for path_ in ('/api/recipes/', f'/api/recipes/{self.recipe.id}/',
+                      '/api/tags/', '/api/ingredients/?name=му'):
+            response = self.get(path_)
+            self.assertEqual(response.status_code, 200, path_)
+            self.assertEqual(response.json(), client.get(path_).json())
+
+    def test_runs_in_pool(self):
+        threads = []
+
+        def render_view(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return render(*args, **kwargs)
+
+        render = async_views.render_view
+        with mock.patch.object(async_views, 'render_view', render_view):
+            self.get('/api/tags/')
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('api-view'))
+
+    def test_not_found(self):
+        self.assertEqual(self.get('/api/recipes/0/').status_code, 404)
+
+    def test_download_shopping_cart(self):
+        self.assertEqual(
+            self.get('/api/recipes/download_shopping_cart/').status_code,
+            401
+        )
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        response = self.get(
+            '/api/recipes/download_shopping_cart/',
+            authorization=f'Token {self.token}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ingredients.txt', response['Content-Disposition'])
+        self.assertIn('мука', response.content.decode())
+
+    def test_batch_calls_sync_view(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/batch/', {'requests': [
+            {'method': 'GET', 'path': '/api/tags/'},
+            {'method': 'GET', 'path': f'/api/recipes/{self.recipe.id}/'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.json()], [200, 200]
+        )
+
+
+class ASGIApplicationTest(SimpleTestCase):
+    """backend.asgi отдаёт приложение ASGI."""
+
+    def test_application(self):
+        with mock.patch.dict(os.environ):
+            from backend.asgi import application
+
+        self.assertTrue(asyncio.iscoroutinefunction(application.__call__))
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import invalidate_user_tokens, token_cache
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class TokenCacheTest(TestCase):
+    """
+    Кэш токенов сбрасывается после фиксации транзакции, в которой
+    удалён токен или изменён пользователь.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.addCleanup(token_cache.delete_many, [self.token.key])
+
+    def get_me(self):
+        return self.client.get('/api/users/me/').status_code
+
+    def assertCached(self, cached=True):
+        self.assertIs(token_cache.get(self.token.key) is not None, cached)
+
+    def test_deactivation_after_commit(self):
+        self.assertEqual(self.get_me(), 200)
+        self.assertCached()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.user.is_active = False
+                self.user.save(update_fields=('is_active',))
+                self.assertCached()
+        self.assertCached(False)
+        self.assertEqual(self.get_me(), 401)
+
+    def test_rolled_back_change_keeps_cache(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.user.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertCached()
+
+    def test_queryset_update(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(id=self.user.id).update(is_active=False)
+            invalidate_user_tokens([self.user.id])
+        self.assertEqual(self.get_me(), 401)
+
+    def test_logout(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertCached(False)
+        self.assertEqual(self.get_me(), 401)
+
+    def test_user_destroy(self):
+        admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', password='password'
+        )
+        admin_client = APIClient()
+        admin_client.force_authenticate(admin)
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = admin_client.delete(
+                f'/api/users/{self.user.id}/',
+                {'current_password': 'password'}
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_me(), 401)
@@ -0,0 +1,177 @@
+import base64
+import io
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+def get_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class BatchViewTest(TestCase):
+    """POST /api/batch/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(6)
+        ]
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', image='recipe.png',
+            text='Описание', cooking_time=10
+        )
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *requests, client=None):
+        response = (client or self.client).post(
+            '/api/batch/', {'requests': list(requests)}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_results_in_request_order(self):
+        results = self.batch(
+            {'method': 'GET', 'path': '/api/tags/'},
+            {'method': 'GET', 'path': f'/api/recipes/{self.recipe.id}/'},
+            {'method': 'GET', 'path': '/api/recipes/0/'},
+            {'method': 'GET', 'path': '/api/unknown/'},
+            {'method': 'GET', 'path': '/admin/'},
+            {'method': 'GET', 'path': '/api/batch/'},
+        )
+        self.assertEqual(
+            [result['status'] for result in results],
+            [200, 200, 404, 404, 400, 400]
+        )
+        self.assertEqual(results[0]['body'][0]['slug'], 'breakfast')
+        self.assertEqual(results[1]['body']['name'], 'Рецепт')
+
+    def test_invalid_batch(self):
+        item = {'method': 'GET', 'path': '/api/tags/'}
+        for requests in ([], [item] * 21, [dict(item, method='HEAD')]):
+            response = self.client.post(
+                '/api/batch/', {'requests': requests}, format='json'
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_anonymous_write(self):
+        results = self.batch(
+            {'method': 'GET', 'path': '/api/tags/'},
+            {'method': 'POST',
+             'path': f'/api/recipes/{self.recipe.id}/favorite/'},
+            client=APIClient(),
+        )
+        self.assertEqual([result['status'] for result in results], [200, 401])
+
+    def test_sub_request_error(self):
+        with mock.patch(
+            'api.views.TagViewSet.list', side_effect=RuntimeError
+        ), self.assertLogs('api.batch', 'ERROR'):
+            results = self.batch(
+                {'method': 'GET', 'path': '/api/tags/'},
+                {'method': 'GET', 'path': f'/api/recipes/{self.recipe.id}/'},
+            )
+        self.assertEqual(results[0], {'status': 500, 'body': None})
+        self.assertEqual(results[1]['status'], 200)
+
+    def test_deadline_between_sub_requests(self):
+        # Время проверяется перед подзапросами: первый укладывается
+        # в предел, остальные получают 503 без выполнения.
+        with mock.patch('api.batch.time') as time:
+            time.monotonic.side_effect = [0, 1, 10, 10]
+            results = self.batch(
+                *[{'method': 'GET', 'path': '/api/tags/'}] * 3
+            )
+        self.assertEqual(
+            [result['status'] for result in results], [200, 503, 503]
+        )
+
+    def test_relations_after_write(self):
+        path = f'/api/recipes/{self.recipe.id}/'
+        results = self.batch(
+            {'method': 'GET', 'path': path},
+            {'method': 'POST', 'path': f'{path}favorite/'},
+            {'method': 'GET', 'path': path},
+        )
+        self.assertEqual(
+            [result['status'] for result in results], [200, 201, 200]
+        )
+        self.assertFalse(results[0]['body']['is_favorited'])
+        self.assertTrue(results[2]['body']['is_favorited'])
+
+    def test_create_recipe_reads_ingredients_once(self):
+        body = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 2}
+                for ingredient in self.ingredients
+            ],
+            'tags': [self.tag.id],
+            'name': 'Новый рецепт',
+            'image': get_image(),
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        with CaptureQueriesContext(connection) as queries:
+            results = self.batch(
+                {'method': 'POST', 'path': '/api/recipes/', 'body': body}
+            )
+        self.assertEqual(results[0]['status'], 201)
+        self.assertEqual(
+            sorted(item['name'] for item in results[0]['body']['ingredients']),
+            sorted(ingredient.name for ingredient in self.ingredients)
+        )
+        self.assertEqual(len([
+            query for query in queries
+            if query['sql'].startswith('SELECT "recipes_ingredient"')
+        ]), 1)
+
+    def test_create_recipe_ingredient_errors(self):
+        body = {
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 2}],
+            'tags': [self.tag.id],
+            'name': 'Новый рецепт',
+            'image': get_image(),
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        duplicate = dict(body, ingredients=body['ingredients'] * 2)
+        missing = dict(body, ingredients=[{'id': 0, 'amount': 2}])
+        results = self.batch(
+            {'method': 'POST', 'path': '/api/recipes/', 'body': duplicate},
+            {'method': 'POST', 'path': '/api/recipes/', 'body': missing},
+        )
+        self.assertEqual([result['status'] for result in results], [400, 404])
+        self.assertEqual(Recipe.objects.count(), 1)
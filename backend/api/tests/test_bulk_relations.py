@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class BulkRelationTest(TestCase):
+    """
+    /api/recipes/favorite/, /api/recipes/shopping_cart/
+    и /api/users/subscribe/ со списком id.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        cls.authors = [
+            User.objects.create_user(
+                email=f'author{number}@example.com',
+                username=f'author{number}', password='password'
+            )
+            for number in range(2)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.authors[0], name=f'Рецепт {number}',
+                image='recipe.png', text='Описание', cooking_time=10
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def send(self, method, path, ids):
+        response = getattr(self.client, method)(
+            path, {'ids': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [(item['id'], item['status']) for item in response.json()]
+
+    def assertCounters(self, counter, values):
+        for recipe, value in zip(self.recipes, values):
+            recipe.refresh_from_db()
+            self.assertEqual(getattr(recipe, counter), value)
+
+    def test_favorites(self):
+        first, second, third = (recipe.id for recipe in self.recipes)
+        missing = third + 100
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        self.assertEqual(
+            self.send('post', '/api/recipes/favorite/',
+                      [first, second, missing, second]),
+            [(first, 'exists'), (second, 'created'), (missing, 'not_found')]
+        )
+        self.assertCounters('favorites_count', [1, 1, 0])
+        self.assertEqual(
+            self.send('delete', '/api/recipes/favorite/',
+                      [first, third, missing]),
+            [(first, 'deleted'), (third, 'missing'), (missing, 'not_found')]
+        )
+        self.assertCounters('favorites_count', [0, 1, 0])
+        self.assertEqual(
+            list(Favorite.objects.values_list('recipe_id', flat=True)),
+            [second]
+        )
+
+    def test_shopping_cart(self):
+        ids = [recipe.id for recipe in self.recipes]
+        self.assertEqual(
+            self.send('post', '/api/recipes/shopping_cart/', ids),
+            [(pk, 'created') for pk in ids]
+        )
+        self.assertCounters('in_carts_count', [1, 1, 1])
+        self.assertEqual(ShoppingCart.objects.count(), 3)
+        self.assertEqual(
+            self.send('delete', '/api/recipes/shopping_cart/', ids),
+            [(pk, 'deleted') for pk in ids]
+        )
+        self.assertCounters('in_carts_count', [0, 0, 0])
+
+    def test_subscribe(self):
+        first, second = (author.id for author in self.authors)
+        self.assertEqual(
+            self.send('post', '/api/users/subscribe/',
+                      [self.user.id, first, second]),
+            [(self.user.id, 'self'), (first, 'created'),
+             (second, 'created')]
+        )
+        self.assertEqual(
+            set(Follow.objects.values_list('following_id', flat=True)),
+            {first, second}
+        )
+        for author in self.authors:
+            author.refresh_from_db()
+            self.assertEqual(author.followers_count, 1)
+        self.assertEqual(
+            self.send('delete', '/api/users/subscribe/', [first]),
+            [(first, 'deleted')]
+        )
+
+    def test_invalid_ids(self):
+        for ids in ([], [0], ['a'], list(range(1, 102))):
+            response = self.client.post(
+                '/api/recipes/favorite/', {'ids': ids}, format='json'
+            )
+            self.assertEqual(response.status_code, 400, ids)
+
+    def test_anonymous(self):
+        response = APIClient().post(
+            '/api/recipes/favorite/', {'ids': [self.recipes[0].id]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 401)
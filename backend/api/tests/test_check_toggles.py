@@ -0,0 +1,57 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class CheckTogglesTest(TransactionTestCase):
+    """
+    manage.py check_toggles: потоки команды работают через свои
+    соединения, поэтому данные фиксируются, а не откатываются.
+    Тестовая база SQLite в памяти не допускает параллельной записи:
+    на ней запросы идут в одном потоке, с DB_TEST_NAME — в четырёх.
+    """
+
+    def setUp(self):
+        self.threads = 1 if (
+            connection.vendor == 'sqlite' and connection.is_in_memory_db()
+        ) else 4
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='password'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', image='recipe.png',
+            text='Описание', cooking_time=10
+        )
+
+    def check_toggles(self):
+        out = StringIO()
+        call_command(
+            'check_toggles', user=self.user.id, recipe=self.recipe.id,
+            author=self.author.id, threads=self.threads, rounds=3,
+            stdout=out
+        )
+        return out.getvalue()
+
+    def test_concurrent_toggles(self):
+        self.assertIn('Ошибок и расхождений нет.', self.check_toggles())
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertEqual(self.recipe.in_carts_count, 0)
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_counter_drift_fails(self):
+        Recipe.objects.filter(id=self.recipe.id).update(favorites_count=5)
+        with self.assertRaisesMessage(CommandError, 'favorites_count'):
+            self.check_toggles()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from api.fast_serializers import TagValuesSerializer
+from recipes.catalog import catalog, compile_catalog
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class CompareListSerializersTest(TestCase):
+    """manage.py compare_list_serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'сахар', 'мука')
+        ]
+        for number in range(8):
+            recipe = Recipe.objects.create(
+                author=cls.user, name=f'Рецепт {number}', image='recipe.png',
+                text='Описание', cooking_time=10
+            )
+            recipe.tags.set([tag])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in ingredients
+            )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(
+            catalog, 'path', os.path.join(directory.name, 'ingredients.bin')
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def compare(self, **options):
+        out = StringIO()
+        call_command(
+            'compare_list_serializers', repeat=1, stdout=out,
+            stderr=StringIO(), **options
+        )
+        return out.getvalue()
+
+    def test_fast_paths_match(self):
+        output = self.compare(user=self.user.id, page_size=5)
+        self.assertIn('Ответы совпадают.', output)
+        self.assertIn('ingredients: снимок каталога не собран.', output)
+
+    def test_catalog_snapshot_matches(self):
+        compile_catalog(catalog.path)
+        output = self.compare()
+        self.assertIn('Ответы совпадают.', output)
+        self.assertNotIn('снимок каталога не собран', output)
+        self.assertRegex(output, r'ingredients: .*snapshot')
+
+    def test_mismatch_fails(self):
+        with mock.patch.object(
+            TagValuesSerializer, 'to_representation', return_value=[]
+        ), self.assertRaisesMessage(CommandError, 'tags (values)'):
+            self.compare()
@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class ConditionalGetTest(TestCase):
+    """ETag и Last-Modified для тегов, ингредиентов и рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author', password='password'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', image='recipe.png',
+            text='Описание', cooking_time=10
+        )
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=1
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, path, **headers):
+        return self.client.get(path, **headers)
+
+    def assertNotModified(self, path, etag):
+        response = self.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+    def assertModified(self, path, etag):
+        """Новый ETag после изменения; старый больше не даёт 304."""
+        response = self.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_tags(self):
+        response = self.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        self.assertNotModified('/api/tags/', response['ETag'])
+        response = self.get(
+            '/api/tags/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+        etag = response['ETag']
+        self.tag.name = 'Обед'
+        self.tag.save()
+        response = self.assertModified('/api/tags/', etag)
+        self.assertEqual(response.json()[0]['name'], 'Обед')
+
+    def test_tag_detail(self):
+        path = f'/api/tags/{self.tag.id}/'
+        etag = self.get(path)['ETag']
+        self.assertNotModified(path, etag)
+        self.assertNotEqual(self.get('/api/tags/')['ETag'], etag)
+
+    def test_ingredients(self):
+        etag = self.get('/api/ingredients/')['ETag']
+        self.assertNotModified('/api/ingredients/', etag)
+        search = self.get('/api/ingredients/?name=со')
+        self.assertNotEqual(search['ETag'], etag)
+        Ingredient.objects.create(name='сахар', measurement_unit='г')
+        response = self.assertModified('/api/ingredients/', etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_recipe_detail(self):
+        path = f'/api/recipes/{self.recipe.id}/'
+        response = self.get(path)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertNotModified(path, etag)
+
+        self.client.post(f'{path}favorite/')
+        response = self.assertModified(path, etag)
+        self.assertTrue(response.json()['is_favorited'])
+
+        etag = response['ETag']
+        self.author.first_name = 'Автор'
+        self.author.save()
+        response = self.assertModified(path, etag)
+        self.assertEqual(response.json()['author']['first_name'], 'Автор')
+
+        etag = response['ETag']
+        self.ingredient.measurement_unit = 'кг'
+        self.ingredient.save()
+        response = self.assertModified(path, etag)
+        self.assertEqual(
+            response.json()['ingredients'][0]['measurement_unit'], 'кг'
+        )
+
+    def test_recipe_detail_per_user(self):
+        # Отметки пользователя входят в версию: чужой ETag не даёт 304.
+        path = f'/api/recipes/{self.recipe.id}/'
+        self.client.post(f'{path}favorite/')
+        etag = self.get(path)['ETag']
+        anonymous = APIClient().get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(anonymous.status_code, 200)
+        self.assertFalse(anonymous.json()['is_favorited'])
+
+    def test_missing_and_malformed_ids(self):
+        for path in ('/api/recipes/0/', '/api/recipes/abc/',
+                     '/api/tags/0/', '/api/ingredients/abc/'):
+            self.assertEqual(self.get(path).status_code, 404, path)
@@ -0,0 +1,113 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from prometheus_client import REGISTRY
+
+from api import connections
+
+
+def get_checks(result):
+    return REGISTRY.get_sample_value(
+        'api_db_health_checks_total', {'database': 'test', 'result': result}
+    ) or 0
+
+
+@override_settings(DB_HEALTH_CHECK_INTERVAL=10)
+class CheckConnectionsTest(SimpleTestCase):
+    """Проверка постоянных соединений перед запросом."""
+
+    def check(self, wrapper, now):
+        with mock.patch.object(connections, 'connections') as handler:
+            handler.all.return_value = [wrapper]
+            with mock.patch.object(
+                connections.time, 'monotonic', return_value=now
+            ):
+                connections.check_connections()
+
+    def get_wrapper(self, usable=True, checked_at=0):
+        return mock.Mock(
+            alias='test', connection=object(), in_atomic_block=False,
+            health_checked_at=checked_at,
+            **{'is_usable.return_value': usable}
+        )
+
+    def test_recently_checked(self):
+        wrapper = self.get_wrapper(checked_at=95)
+        self.check(wrapper, 100)
+        wrapper.is_usable.assert_not_called()
+
+    def test_usable(self):
+        wrapper = self.get_wrapper()
+        before = get_checks('ok')
+        self.check(wrapper, 100)
+        wrapper.is_usable.assert_called_once()
+        wrapper.close.assert_not_called()
+        self.assertEqual(wrapper.health_checked_at, 100)
+        self.assertEqual(get_checks('ok'), before + 1)
+
+    def test_broken_connection_is_closed(self):
+        wrapper = self.get_wrapper(usable=False)
+        before = get_checks('failed')
+        self.check(wrapper, 100)
+        wrapper.close.assert_called_once()
+        self.assertEqual(get_checks('failed'), before + 1)
+
+    def test_skipped(self):
+        for wrapper in (
+            mock.Mock(connection=None),
+            mock.Mock(connection=object(), in_atomic_block=True),
+        ):
+            self.check(wrapper, 100)
+            wrapper.is_usable.assert_not_called()
+
+
+class ConnectionReuseTest(TestCase):
+    """Соединение переживает запросы и проверяется сигналом."""
+
+    def test_request_started_checks_connections(self):
+        with mock.patch('api.signals.check_connections') as check:
+            self.client.get('/api/tags/')
+        check.assert_called_once_with()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Пул только для PostgreSQL.')
+class ConnectionPoolTest(SimpleTestCase):
+    """backend.postgresql_pool: ограничение пула и возврат соединений."""
+
+    databases = {'default'}
+
+    def get_pool(self):
+        from backend.postgresql_pool.base import CountingConnectionPool
+
+        pool = CountingConnectionPool(
+            'test', 1, 1, 0.1, **connection.get_connection_params()
+        )
+        self.addCleanup(pool.closeall)
+        return pool
+
+    def test_timeout_when_exhausted(self):
+        from backend.postgresql_pool.base import Database
+
+        pool = self.get_pool()
+        first = pool.acquire()
+        with self.assertRaises(Database.OperationalError):
+            pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+
+    def test_release_rolls_back(self):
+        from psycopg2 import extensions
+
+        pool = self.get_pool()
+        raw = pool.acquire()
+        raw.cursor().execute('SELECT 1')
+        self.assertNotEqual(
+            raw.get_transaction_status(), extensions.TRANSACTION_STATUS_IDLE
+        )
+        pool.release(raw)
+        raw = pool.acquire()
+        self.assertEqual(
+            raw.get_transaction_status(), extensions.TRANSACTION_STATUS_IDLE
+        )
+        pool.release(raw)
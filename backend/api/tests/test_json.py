@@ -0,0 +1,76 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+
+class FastJSONTest(SimpleTestCase):
+    """FastJSONRenderer и FastJSONParser совпадают со стандартными DRF."""
+
+    data = {
+        'id': 1,
+        'name': 'Борщ\u2028с «кавычками»\u2029',
+        'pub_date': datetime.datetime(
+            2023, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc
+        ),
+        'date': datetime.date(2023, 1, 2),
+        'amount': Decimal('1.50'),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'label': gettext_lazy('Имя'),
+        'nested': [{'is_favorited': True, 'image': None}],
+        2: 'ключ-число',
+    }
+
+    def test_render_matches_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data)
+        )
+
+    def test_render_indent(self):
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, renderer_context=context),
+            JSONRenderer().render(self.data, renderer_context=context)
+        )
+
+    def test_render_none(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_parse_matches_json_parser(self):
+        content = JSONRenderer().render(self.data)
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(content)),
+            JSONParser().parse(io.BytesIO(content))
+        )
+
+    def test_parse_other_encoding(self):
+        content = '{"name": "соль"}'.encode('cp1251')
+        self.assertEqual(
+            FastJSONParser().parse(
+                io.BytesIO(content), parser_context={'encoding': 'cp1251'}
+            ),
+            {'name': 'соль'}
+        )
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"name": '))
+
+    def test_invalid_body_is_bad_request(self):
+        response = APIClient().post(
+            '/api/auth/token/login/', b'{"email": ',
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
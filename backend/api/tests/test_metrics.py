@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Tag
+
+User = get_user_model()
+
+TAGS_LIST = {'view': 'TagViewSet', 'action': 'list', 'method': 'get'}
+
+
+def get_value(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(THROTTLE_ENABLED=False, SQL_SAMPLE_RATE=1)
+class MetricsTest(TestCase):
+    """/metrics и api.metrics.MetricsMiddleware."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def test_request_metrics(self):
+        requests = dict(TAGS_LIST, status='200')
+        before = {
+            'requests': get_value('api_requests_total', requests),
+            'latency': get_value(
+                'api_request_duration_seconds_count', TAGS_LIST
+            ),
+            'size': get_value('api_response_size_bytes_sum', TAGS_LIST),
+            'queries': get_value('api_db_queries_count', TAGS_LIST),
+        }
+        response = self.client.get('/api/tags/')
+        self.assertEqual(
+            get_value('api_requests_total', requests),
+            before['requests'] + 1
+        )
+        self.assertEqual(
+            get_value('api_request_duration_seconds_count', TAGS_LIST),
+            before['latency'] + 1
+        )
+        self.assertEqual(
+            get_value('api_response_size_bytes_sum', TAGS_LIST),
+            before['size'] + len(response.content)
+        )
+        self.assertEqual(
+            get_value('api_db_queries_count', TAGS_LIST),
+            before['queries'] + 1
+        )
+
+    def test_unresolved_path(self):
+        labels = {
+            'view': 'unresolved', 'action': '', 'method': 'get',
+            'status': '404',
+        }
+        before = get_value('api_requests_total', labels)
+        for number in range(3):
+            self.client.get(f'/unknown/{number}/')
+        self.assertEqual(get_value('api_requests_total', labels), before + 3)
+
+    def test_token_cache(self):
+        user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        token = Token.objects.create(user=user)
+        labels = {'cache': 'auth-token', 'result': 'hit'}
+        misses = dict(labels, result='miss')
+        before = (
+            get_value('api_cache_requests_total', labels),
+            get_value('api_cache_requests_total', misses),
+        )
+        for _ in range(2):
+            self.client.get(
+                '/api/users/me/', HTTP_AUTHORIZATION=f'Token {token}'
+            )
+        self.assertEqual(
+            (get_value('api_cache_requests_total', labels),
+             get_value('api_cache_requests_total', misses)),
+            (before[0] + 1, before[1] + 1)
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/tags/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        families = {
+            family.name: family
+            for family in text_string_to_metric_families(
+                response.content.decode()
+            )
+        }
+        for name in ('api_requests', 'api_request_duration_seconds',
+                     'api_db_queries', 'api_requests_in_flight'):
+            self.assertIn(name, families)
+        self.assertIn(
+            dict(TAGS_LIST, status='200'),
+            [sample.labels for sample in families['api_requests'].samples]
+        )
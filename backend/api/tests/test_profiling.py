@@ -0,0 +1,135 @@
+import json
+import os
+import tempfile
+from collections import deque
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import profiling
+
+User = get_user_model()
+
+
+@override_settings(THROTTLE_ENABLED=False, PROFILE_RATE_LIMIT=10)
+class ProfilingTest(TestCase):
+    """Профилирование по ?profile= и подписи, /api/profiles/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            email='staff@example.com', username='staff', password='password',
+            is_staff=True
+        )
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        profile_settings = override_settings(PROFILE_DIR=self.directory)
+        profile_settings.enable()
+        self.addCleanup(profile_settings.disable)
+        recent = mock.patch.object(profiling, 'recent_profiles', deque())
+        recent.start()
+        self.addCleanup(recent.stop)
+
+    def get_client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            token = Token.objects.get_or_create(user=user)[0]
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return client
+
+    def test_staff_profile(self):
+        client = self.get_client(self.staff)
+        response = client.get('/api/tags/?profile=cprofile')
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile']
+        with open(os.path.join(self.directory, f'{profile_id}.json'),
+                  encoding='utf-8') as file:
+            profile = json.load(file)
+        self.assertEqual(profile['mode'], 'cprofile')
+        self.assertEqual(profile['view'], 'TagViewSet')
+        self.assertEqual(profile['action'], 'list')
+        self.assertEqual(profile['status'], 200)
+        self.assertGreater(profile['sql']['queries'], 0)
+
+        response = client.get('/api/profiles/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.json()], [profile_id]
+        )
+        response = client.get(f'/api/profiles/{profile_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'{profile_id}.prof', response['Content-Disposition']
+        )
+        self.assertGreater(len(b''.join(response.streaming_content)), 0)
+        response.close()
+
+    def test_sample_mode_by_default(self):
+        response = self.get_client(self.staff).get('/api/tags/?profile=x')
+        self.assertTrue(os.path.exists(os.path.join(
+            self.directory, f'{response["X-Profile"]}.folded'
+        )))
+
+    def test_not_staff(self):
+        for client in (self.get_client(self.user), self.get_client()):
+            response = client.get('/api/tags/?profile=sample')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Profile', response)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_profiles_access(self):
+        self.assertEqual(
+            self.get_client().get('/api/profiles/').status_code, 401
+        )
+        client = self.get_client(self.user)
+        self.assertEqual(client.get('/api/profiles/').status_code, 403)
+        self.assertEqual(client.get('/api/profiles/x/').status_code, 403)
+
+    def test_missing_profile(self):
+        client = self.get_client(self.staff)
+        for profile_id in ('missing', '..%2Fsettings'):
+            response = client.get(f'/api/profiles/{profile_id}/')
+            self.assertEqual(response.status_code, 404, profile_id)
+
+    def test_signed_header(self):
+        client = self.get_client()
+        response = client.get(
+            '/api/tags/',
+            HTTP_X_PROFILE_SIGNATURE=profiling.sign_profile_header()
+        )
+        self.assertIn('X-Profile', response)
+        response = client.get(
+            '/api/tags/',
+            HTTP_X_PROFILE_SIGNATURE=profiling.sign_profile_header() + 'x'
+        )
+        self.assertNotIn('X-Profile', response)
+
+    @override_settings(PROFILE_SIGNATURE_MAX_AGE=60)
+    def test_expired_signature(self):
+        with mock.patch('django.core.signing.time.time', return_value=0):
+            signature = profiling.sign_profile_header()
+        response = self.get_client().get(
+            '/api/tags/', HTTP_X_PROFILE_SIGNATURE=signature
+        )
+        self.assertNotIn('X-Profile', response)
+
+    @override_settings(PROFILE_RATE_LIMIT=1)
+    def test_rate_limit(self):
+        client = self.get_client(self.staff)
+        self.assertNotEqual(
+            client.get('/api/tags/?profile=sample')['X-Profile'],
+            'rate-limited'
+        )
+        self.assertEqual(
+            client.get('/api/tags/?profile=sample')['X-Profile'],
+            'rate-limited'
+        )
@@ -0,0 +1,59 @@
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from api.management.commands.check_query_plans import INDEX_SCAN, Command
+from recipes.models import Ingredient, Recipe
+
+
+@skipUnless(
+    connection.vendor in INDEX_SCAN,
+    'Планы запросов проверяются на PostgreSQL и SQLite.'
+)
+class CheckQueryPlansTest(TransactionTestCase):
+    """
+    manage.py check_query_plans на данных generate_fake_data
+    с настройками планировщика по умолчанию.
+    """
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(300)
+        )
+        call_command(
+            'generate_fake_data', users=300, recipes=3000, workers=1,
+            stdout=StringIO()
+        )
+
+    def test_hot_queries_use_expected_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', analyze=True, stdout=out)
+        self.assertIn(
+            'Все запросы идут по ожидаемым индексам.', out.getvalue()
+        )
+
+    def test_other_index_fails(self):
+        # Без сортировки по pub_date запросу не нужен recipe_pub_date_idx.
+        command = Command()
+        queries = [(
+            'recipes: text',
+            Recipe.objects.filter(text='Описание').order_by(),
+            [command.index(Recipe, 'pub_date', 'id')]
+        )]
+        with mock.patch.object(
+            Command, 'get_hot_queries', return_value=queries
+        ), self.assertRaisesMessage(
+            CommandError,
+            'recipes: text: нет ни одного из индексов recipe_pub_date_idx'
+        ):
+            call_command('check_query_plans', analyze=True, stdout=StringIO())
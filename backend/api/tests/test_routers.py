@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import tempfile
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.routers import ReplicaRouter, current_replica
+from recipes.models import Favorite, Recipe, Tag
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Реплика — копия файла SQLite.')
+@override_settings(REPLICA_DATABASES=[REPLICA], THROTTLE_ENABLED=False)
+class ReplicaRouterTest(TransactionTestCase):
+    """
+    api.routers на двух базах SQLite: реплика — снимок основной базы,
+    сделанный до записи тега 'primary', и дальше не догоняет.
+    TransactionTestCase: внутри транзакции TestCase роутер всегда
+    читает из основной базы.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='password'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', image='recipe.png',
+            text='Описание', cooking_time=10
+        )
+        Tag.objects.create(name='replica', color='#49B64E', slug='replica')
+        self.user_client = self.get_client('user')
+        self.other_client = self.get_client('other')
+        self.create_replica()
+        Tag.objects.create(name='primary', color='#E26C2D', slug='primary')
+
+    def get_client(self, username):
+        user = User.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            password='password'
+        )
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}'
+        )
+        return client
+
+    def create_replica(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'replica.sqlite3')
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        replica = sqlite3.connect(path)
+        primary.connection.backup(replica)
+        replica.close()
+        connections.databases[REPLICA] = dict(
+            primary.settings_dict, NAME=path, TEST={'MIRROR': None}
+        )
+        self.addCleanup(self.remove_replica)
+
+    def remove_replica(self):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    def get_tags(self, client):
+        response = client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        return {tag['slug'] for tag in response.json()}
+
+    def test_reads_go_to_replica(self):
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            self.assertEqual(self.get_tags(APIClient()), {'replica'})
+        self.assertTrue(queries)
+
+    def test_writes_go_to_primary(self):
+        response = self.user_client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Favorite.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertFalse(Favorite.objects.using(REPLICA).exists())
+
+    def test_read_your_writes(self):
+        self.assertEqual(self.get_tags(self.user_client), {'replica'})
+        response = self.user_client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.get_tags(self.user_client), {'replica', 'primary'}
+        )
+        self.assertEqual(self.get_tags(self.other_client), {'replica'})
+
+    def test_failed_write_is_not_sticky(self):
+        response = self.user_client.delete(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.get_tags(self.user_client), {'replica'})
+
+    def test_atomic_block_reads_primary(self):
+        router = ReplicaRouter()
+        current_replica.set(REPLICA)
+        self.addCleanup(current_replica.set, None)
+        self.assertEqual(router.db_for_read(Tag), REPLICA)
+        self.assertEqual(router.db_for_read(Token), DEFAULT_DB_ALIAS)
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Tag), DEFAULT_DB_ALIAS)
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api import slow_queries
+from recipes.models import Tag
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class SlowQueryLogTest(TestCase):
+    """Журнал медленных запросов и manage.py report_slow_queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'logs', 'slow.log')
+        # Обработчик файла создаётся один раз на процесс: на время
+        # теста журнал пишется в свой файл.
+        handlers = mock.patch.object(slow_queries.logger, 'handlers', [])
+        handlers.start()
+        self.addCleanup(handlers.stop)
+        self.addCleanup(self.close_handlers)
+        shapes = mock.patch.object(slow_queries, 'explained_shapes', set())
+        shapes.start()
+        self.addCleanup(shapes.stop)
+        log_settings = override_settings(
+            SLOW_QUERY_LOG=self.path, SLOW_QUERY_THRESHOLD_MS=1e-9
+        )
+        log_settings.enable()
+        self.addCleanup(log_settings.disable)
+
+    def close_handlers(self):
+        for handler in slow_queries.logger.handlers:
+            handler.close()
+
+    def read(self):
+        for handler in slow_queries.logger.handlers:
+            handler.flush()
+        with open(self.path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def get_tag_records(self):
+        return [
+            record for record in self.read()
+            if 'recipes_tag' in record['sql']
+            and record.get('view') == 'TagViewSet'
+        ]
+
+    def test_records_with_context_and_plan(self):
+        self.client.get('/api/tags/?name=a')
+        self.client.get('/api/tags/?name=b')
+        records = self.get_tag_records()
+        self.assertTrue(records)
+        record = records[0]
+        self.assertEqual(record['action'], 'list')
+        self.assertEqual(record['method'], 'GET')
+        self.assertEqual(record['path'], '/api/tags/')
+        self.assertEqual(record['params'], {'name': ['a']})
+        self.assertEqual(record['database'], 'default')
+        self.assertGreater(record['ms'], 0)
+        self.assertTrue(record['explain'])
+        # План каждой формы запроса сохраняется один раз на процесс.
+        shapes = [item['shape'] for item in records if 'explain' in item]
+        self.assertEqual(len(shapes), len(set(shapes)))
+        self.assertIn(record['shape'], [
+            item['shape'] for item in records
+            if item['params'] == {'name': ['b']} and 'explain' not in item
+        ])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=60 * 1000)
+    def test_fast_queries_are_not_logged(self):
+        self.client.get('/api/tags/')
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_reopens_rotated_file(self):
+        self.client.get('/api/tags/')
+        os.rename(self.path, f'{self.path}.1')
+        self.client.get('/api/tags/')
+        self.assertTrue(self.get_tag_records())
+
+    def test_report(self):
+        self.client.get('/api/tags/')
+        os.rename(self.path, f'{self.path}.1')
+        self.client.get('/api/tags/')
+        out = StringIO()
+        call_command(
+            'report_slow_queries', path=self.path, order='count', stdout=out
+        )
+        report = out.getvalue()
+        self.assertIn('recipes_tag', report)
+        self.assertIn('TagViewSet.list: 2', report)
+        self.assertIn('План:', report)
+
+    def test_empty_report(self):
+        out = StringIO()
+        call_command('report_slow_queries', path=self.path, stdout=out)
+        self.assertIn('Медленных запросов нет.', out.getvalue())
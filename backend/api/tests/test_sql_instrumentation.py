@@ -0,0 +1,89 @@
+import asyncio
+import json
+import re
+
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.middleware import SQLInstrumentationMiddleware, get_shape
+from recipes.models import Tag
+
+
+def get_tags(request):
+    for tag in Tag.objects.order_by('id'):
+        Tag.objects.filter(id=tag.id).exists()
+    return HttpResponse()
+
+
+@override_settings(
+    SQL_SAMPLE_RATE=1, SQL_REPEATED_THRESHOLD=3, SQL_SERVER_TIMING=True,
+    THROTTLE_ENABLED=False,
+)
+class SQLInstrumentationTest(TestCase):
+    """api.middleware.SQLInstrumentationMiddleware."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for slug, color in (('breakfast', '#E26C2D'), ('lunch', '#49B64E'),
+                            ('dinner', '#8775D2')):
+            Tag.objects.create(name=slug, color=color, slug=slug)
+
+    def get_timing(self, response):
+        # В desc тоже есть запятые: метрики делятся по запятой перед именем.
+        return dict(
+            metric.split(';', 1)
+            for metric in re.split(r',\s*(?=\w+;)', response['Server-Timing'])
+        )
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tags/')
+        timing = self.get_timing(response)
+        self.assertRegex(timing['db'], r'^dur=\d+\.\d\d;desc=')
+        self.assertIn(f'"{len(queries)} queries, ', timing['db'])
+        self.assertRegex(timing['app'], r'^dur=\d+\.\d\d$')
+        self.assertNotIn('nplusone', timing)
+
+    def test_repeated_queries(self):
+        middleware = SQLInstrumentationMiddleware(get_tags)
+        request = RequestFactory().get('/tags/')
+        with self.assertLogs('api.sql', 'WARNING') as logs:
+            response = middleware(request)
+        self.assertEqual(
+            self.get_timing(response)['nplusone'], 'desc="1 repeated"'
+        )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 4)
+        self.assertEqual(record['rows'], 6)
+        self.assertEqual(len(record['repeated']), 1)
+        self.assertEqual(record['repeated'][0]['count'], 3)
+        self.assertIn('LIMIT N', record['repeated'][0]['sql'])
+
+    @override_settings(SQL_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/tags/'))
+
+    @override_settings(SQL_SERVER_TIMING=False)
+    def test_log_without_header(self):
+        with self.assertLogs('api.sql', 'INFO') as logs:
+            response = self.client.get('/api/tags/')
+        self.assertNotIn('Server-Timing', response)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'api:tags-list')
+        self.assertEqual(record['status'], 200)
+
+    def test_async(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = SQLInstrumentationMiddleware(get_response)
+        response = asyncio.run(middleware(RequestFactory().get('/')))
+        self.assertIn('0 queries, 0 rows', response['Server-Timing'])
+
+    def test_shape(self):
+        self.assertEqual(
+            get_shape('SELECT * FROM t WHERE id IN (%s, %s,%s) LIMIT 21'),
+            'SELECT * FROM t WHERE id IN (%s, ...) LIMIT N'
+        )
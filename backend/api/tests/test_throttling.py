@@ -0,0 +1,146 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from api import throttling
+from api.cache import LocalCache
+from api.throttling import ScopedTokenBucketThrottle
+from recipes.models import Recipe
+
+User = get_user_model()
+
+RATES = {
+    'ingredients': '2/min:3',
+    'recipes': '100/min',
+    'relations': '1/min:1',
+}
+
+
+def get_throttled(scope):
+    return REGISTRY.get_sample_value(
+        'api_throttled_total', {'scope': scope}
+    ) or 0
+
+
+@override_settings(
+    THROTTLE_ENABLED=True, THROTTLE_CACHE_ALIAS=None, THROTTLE_LOCAL_WORKERS=1
+)
+class TokenBucketThrottleTest(TestCase):
+    """api.throttling.ScopedTokenBucketThrottle."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.com', username='other', password='password'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.user, name=f'Рецепт {number}', image='recipe.png',
+                text='Описание', cooking_time=10
+            )
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        self.now = 1000.0
+        for patcher in (
+            mock.patch.object(ScopedTokenBucketThrottle, 'THROTTLE_RATES',
+                              RATES),
+            mock.patch.object(ScopedTokenBucketThrottle, 'timer',
+                              mock.Mock(side_effect=lambda: self.now)),
+            mock.patch.object(throttling, 'local_store',
+                              LocalCache(100, 60)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_client(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def get_statuses(self, client, count, path='/api/ingredients/', **extra):
+        return [
+            client.get(path, **extra).status_code for _ in range(count)
+        ]
+
+    def test_burst_and_refill(self):
+        client = self.get_client()
+        before = get_throttled('ingredients')
+        self.assertEqual(self.get_statuses(client, 3), [200] * 3)
+        response = client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(get_throttled('ingredients'), before + 1)
+        self.now += 29
+        self.assertEqual(self.get_statuses(client, 1), [429])
+        self.now += 1
+        self.assertEqual(self.get_statuses(client, 2), [200, 429])
+        self.assertEqual(get_throttled('ingredients'), before + 3)
+
+    def test_full_bucket_after_pause(self):
+        client = self.get_client()
+        self.get_statuses(client, 4)
+        self.now += 3600
+        self.assertEqual(self.get_statuses(client, 4), [200] * 3 + [429])
+
+    def test_clients_have_own_buckets(self):
+        self.assertEqual(
+            self.get_statuses(self.get_client(self.user), 4),
+            [200] * 3 + [429]
+        )
+        self.assertEqual(
+            self.get_statuses(self.get_client(self.other), 3), [200] * 3
+        )
+        client = self.get_client()
+        self.assertEqual(
+            self.get_statuses(client, 4, HTTP_X_FORWARDED_FOR='10.0.0.1'),
+            [200] * 3 + [429]
+        )
+        self.assertEqual(
+            self.get_statuses(client, 3, HTTP_X_FORWARDED_FOR='10.0.0.2'),
+            [200] * 3
+        )
+
+    def test_scopes(self):
+        client = self.get_client(self.user)
+        before = get_throttled('relations')
+        for recipe, status in zip(self.recipes, (201, 429)):
+            response = client.post(f'/api/recipes/{recipe.id}/favorite/')
+            self.assertEqual(response.status_code, status)
+        self.assertEqual(get_throttled('relations'), before + 1)
+        # У чтения рецептов свой scope, у списка пользователей его нет.
+        self.assertEqual(self.get_statuses(client, 5, '/api/recipes/'),
+                         [200] * 5)
+        self.assertEqual(self.get_statuses(client, 5, '/api/users/'),
+                         [200] * 5)
+        self.assertEqual(self.get_statuses(client, 3), [200] * 3)
+
+    @override_settings(THROTTLE_LOCAL_WORKERS=3)
+    def test_local_workers_share(self):
+        # Частота и ёмкость делятся на воркеры, но ведро не меньше 1.
+        client = self.get_client()
+        response = client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        response = client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '90')
+
+    @override_settings(THROTTLE_CACHE_ALIAS='default')
+    def test_shared_cache(self):
+        self.addCleanup(cache.clear)
+        client = self.get_client()
+        self.assertEqual(self.get_statuses(client, 4), [200] * 3 + [429])
+        self.assertTrue(cache.get('throttle_ingredients_127.0.0.1'))
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.get_statuses(self.get_client(), 5), [200] * 5)
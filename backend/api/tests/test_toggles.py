@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.toggles import favorites, follows, shopping_carts
+from recipes.models import Favorite, Recipe
+
+User = get_user_model()
+
+
+def create_recipe(author, name='Рецепт'):
+    return Recipe.objects.create(
+        author=author, name=name, image='recipe.png', text='Описание',
+        cooking_time=10
+    )
+
+
+class RelationTest(TestCase):
+    """
+    api.toggles: связь и счётчик цели меняются вместе. На PostgreSQL
+    это путь с CTE, на остальных базах — два запроса в транзакции.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author', password='password'
+        )
+        cls.recipe = create_recipe(cls.author)
+        cls.other = create_recipe(cls.author, 'Другой рецепт')
+
+    def assertCounter(self, instance, counter, value):
+        instance.refresh_from_db()
+        self.assertEqual(getattr(instance, counter), value)
+
+    def test_add_and_remove(self):
+        row = favorites.add(
+            self.user.id, self.recipe.id, ('id', 'favorites_count')
+        )
+        self.assertEqual(row, {'id': self.recipe.id, 'favorites_count': 1})
+        self.assertCounter(self.recipe, 'favorites_count', 1)
+        self.assertIsNone(favorites.add(self.user.id, self.recipe.id))
+        self.assertCounter(self.recipe, 'favorites_count', 1)
+
+        row = favorites.remove(
+            self.user.id, self.recipe.id, ('id', 'favorites_count')
+        )
+        self.assertEqual(row, {'id': self.recipe.id, 'favorites_count': 0})
+        self.assertIsNone(favorites.remove(self.user.id, self.recipe.id))
+        self.assertCounter(self.recipe, 'favorites_count', 0)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_add_many_skips_existing_and_missing(self):
+        shopping_carts.add(self.user.id, self.recipe.id)
+        rows = shopping_carts.add_many(
+            self.user.id, [self.recipe.id, self.other.id, 0]
+        )
+        self.assertEqual(rows, [{'id': self.other.id}])
+        self.assertCounter(self.recipe, 'in_carts_count', 1)
+        self.assertCounter(self.other, 'in_carts_count', 1)
+
+        rows = shopping_carts.remove_many(
+            self.user.id, [self.recipe.id, self.other.id]
+        )
+        self.assertEqual(
+            sorted(row['id'] for row in rows),
+            sorted([self.recipe.id, self.other.id])
+        )
+        self.assertCounter(self.recipe, 'in_carts_count', 0)
+        self.assertCounter(self.other, 'in_carts_count', 0)
+
+    def test_counter_is_not_negative(self):
+        follows.add(self.user.id, self.author.id)
+        User.objects.filter(id=self.author.id).update(followers_count=0)
+        self.assertIsNotNone(follows.remove(self.user.id, self.author.id))
+        self.assertCounter(self.author, 'followers_count', 0)
+
+    @skipUnless(connection.vendor == 'postgresql', 'CTE только на PostgreSQL.')
+    def test_postgresql_single_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            favorites.add(self.user.id, self.recipe.id)
+            favorites.remove(self.user.id, self.recipe.id)
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertTrue(query['sql'].startswith('WITH changed AS ('))
+
+
+class ConcurrentRelationTest(TransactionTestCase):
+    """
+    Одновременные изменения одной связи из разных потоков и соединений:
+    ровно одно из них меняет связь, счётчик не теряет обновлений.
+    """
+
+    threads = 8
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest(
+                'База SQLite в памяти не допускает параллельной записи; '
+                'нужен файл DB_TEST_NAME.'
+            )
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='password'
+        )
+        self.recipe = create_recipe(self.author)
+        self.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}',
+                password='password'
+            )
+            for number in range(self.threads)
+        ]
+
+    def run_concurrently(self, action, user_ids):
+        barrier = Barrier(len(user_ids))
+
+        def run(user_id):
+            try:
+                barrier.wait()
+                return action(user_id, self.recipe.id)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(len(user_ids)) as executor:
+            return list(executor.map(run, user_ids))
+
+    def assertFavorites(self, value):
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, value)
+        self.assertEqual(
+            Favorite.objects.filter(recipe=self.recipe).count(), value
+        )
+
+    def test_same_relation(self):
+        user_ids = [self.users[0].id] * self.threads
+        results = self.run_concurrently(favorites.add, user_ids)
+        self.assertEqual(sum(row is not None for row in results), 1)
+        self.assertFavorites(1)
+
+        results = self.run_concurrently(favorites.remove, user_ids)
+        self.assertEqual(sum(row is not None for row in results), 1)
+        self.assertFavorites(0)
+
+    def test_same_target(self):
+        user_ids = [user.id for user in self.users]
+        results = self.run_concurrently(favorites.add, user_ids)
+        self.assertTrue(all(results))
+        self.assertFavorites(self.threads)
+
+        self.run_concurrently(favorites.remove, user_ids[1:])
+        self.assertFavorites(1)
@@ -0,0 +1,126 @@
+import json
+import subprocess
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api import warmup
+from recipes.models import Tag
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class WarmUpTest(TestCase):
+    """api.warmup: шаги прогрева и закрытие соединений."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def setUp(self):
+        # Соединение теста закрывать нельзя.
+        close = mock.patch.object(warmup, 'close_connections')
+        self.close_connections = close.start()
+        self.addCleanup(close.stop)
+
+    def test_steps(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertLogs('api.warmup', 'INFO') as logs:
+                warmup.warm_up()
+        messages = [record.getMessage() for record in logs.records]
+        for name, _ in warmup.STEPS:
+            self.assertTrue(
+                any(message.startswith(f'Прогрев {name}: ')
+                    for message in messages), name
+            )
+        self.assertTrue(messages[-1].startswith('Прогрев завершён'))
+        self.assertNotIn(
+            'WARNING', [record.levelname for record in logs.records]
+        )
+        self.assertIn('recipes_tag', ' '.join(
+            query['sql'] for query in queries.captured_queries
+        ))
+        self.close_connections.assert_called_once_with()
+
+    def test_failed_step(self):
+        steps = (
+            ('broken', mock.Mock(side_effect=ValueError)),
+            ('next', mock.Mock()),
+        )
+        with mock.patch.object(warmup, 'STEPS', steps):
+            with self.assertLogs('api.warmup', 'INFO') as logs:
+                warmup.warm_up()
+        steps[1][1].assert_called_once_with()
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertEqual(
+            logs.records[0].getMessage(), 'Прогрев broken не выполнен.'
+        )
+        self.close_connections.assert_called_once_with()
+
+    def test_ready(self):
+        config = apps.get_app_config('api')
+        with mock.patch('api.warmup.warm_up') as warm_up:
+            with override_settings(STARTUP_WARMUP=False):
+                config.ready()
+            warm_up.assert_not_called()
+            with override_settings(STARTUP_WARMUP=True):
+                config.ready()
+            warm_up.assert_called_once_with()
+
+
+class CloseConnectionsTest(SimpleTestCase):
+    """Соединения и пулы закрываются перед fork воркеров."""
+
+    def test_close_connections(self):
+        plain = mock.Mock(spec=['close'])
+        pooled = mock.Mock(spec=['close', 'close_pool'])
+        with mock.patch.object(warmup, 'connections') as handler:
+            handler.all.return_value = [plain, pooled]
+            warmup.close_connections()
+        plain.close.assert_called_once_with()
+        pooled.close.assert_called_once_with()
+        pooled.close_pool.assert_called_once_with()
+
+
+class MeasureStartupTest(SimpleTestCase):
+    """manage.py measure_startup."""
+
+    def get_result(self, warmup_enabled, path):
+        first = 50 if warmup_enabled else 200
+        return subprocess.CompletedProcess([], 0, stdout=json.dumps({
+            'load': 1000 if warmup_enabled else 500,
+            'first': {path: first},
+            'second': {path: 10},
+        }))
+
+    def test_report(self):
+        environments = []
+
+        def run(args, env, **kwargs):
+            environments.append(env['STARTUP_WARMUP'])
+            return self.get_result(env['STARTUP_WARMUP'] == 'True', args[-1])
+
+        out = StringIO()
+        with mock.patch('subprocess.run', side_effect=run):
+            call_command(
+                'measure_startup', repeat=2, paths=['/api/tags/'], stdout=out
+            )
+        self.assertEqual(environments, ['False'] * 2 + ['True'] * 2)
+        self.assertEqual(out.getvalue().splitlines(), [
+            'без прогрева: загрузка приложения 500 мс',
+            '  /api/tags/: первый запрос 200.0 мс, второй 10.0 мс',
+            'с прогревом: загрузка приложения 1000 мс',
+            '  /api/tags/: первый запрос 50.0 мс, второй 10.0 мс',
+        ])
+
+    def test_child_error(self):
+        result = subprocess.CompletedProcess(
+            [], 1, stdout='', stderr='Traceback\nSystemExit: /api/x/: 404'
+        )
+        with mock.patch('subprocess.run', return_value=result):
+            with self.assertRaisesMessage(CommandError, '/api/x/: 404'):
+                call_command('measure_startup', repeat=1, stdout=StringIO())
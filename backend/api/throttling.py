@@ -0,0 +1,98 @@
+"""
+Ограничение частоты запросов по алгоритму token bucket.
+
+Состояние ключа (scope и пользователь или IP клиента) — одно число:
+момент, когда ведро снова станет полным (GCRA). На запрос приходится
+одно чтение и одна запись хранилища вместо списка отметок времени,
+как в троттлах DRF. Хранилище — LocalCache процесса или, если задан
+THROTTLE_CACHE_ALIAS, общий кэш Django. Обновление общего кэша
+не атомарно: при гонке воркеров возможны несколько лишних запросов.
+С LocalCache каждый из THROTTLE_LOCAL_WORKERS воркеров пропускает
+свою долю частоты и ёмкости ведра, чтобы лимит не умножался на
+число воркеров.
+
+Частоты задаются в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] в формате
+DRF ('100/min') с необязательной ёмкостью ведра: '100/min:20'.
+THROTTLE_ENABLED = False выключает ограничение, например для
+нагрузочных тестов.
+"""
+import math
+import threading
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+from .cache import LocalCache
+from .metrics import THROTTLED
+
+local_store = LocalCache(settings.THROTTLE_CACHE_SIZE, 60)
+local_lock = threading.Lock()
+
+
+def get_store():
+    alias = settings.THROTTLE_CACHE_ALIAS
+    return caches[alias] if alias else local_store
+
+
+class ScopedTokenBucketThrottle(SimpleRateThrottle):
+    """
+    Scope берётся из throttle_scopes вьюсета по action,
+    иначе из throttle_scope. Запросы без scope не ограничиваются.
+    """
+
+    burst = None
+
+    def __init__(self):
+        # Частота известна только после выбора scope в allow_request.
+        pass
+
+    def get_scope(self, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        return scopes.get(getattr(view, 'action', None)) or getattr(
+            view, 'throttle_scope', None
+        )
+
+    def parse_rate(self, rate):
+        if rate is None:
+            return None, None
+        rate, _, burst = rate.partition(':')
+        num_requests, duration = super().parse_rate(rate)
+        self.burst = int(burst) if burst else num_requests
+        return num_requests, duration
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(view)
+        if self.scope is None or not settings.THROTTLE_ENABLED:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        store = get_store()
+        interval = self.duration / self.num_requests
+        burst = self.burst
+        if store is local_store:
+            workers = settings.THROTTLE_LOCAL_WORKERS
+            interval *= workers
+            burst = max(burst / workers, 1)
+        capacity = interval * burst
+        now = self.timer()
+        with local_lock if store is local_store else nullcontext():
+            full_at = max(store.get(self.key) or now, now) + interval
+            self.wait_seconds = full_at - now - capacity
+            if self.wait_seconds > 0:
+                THROTTLED.labels(self.scope).inc()
+                return False
+            store.set(self.key, full_at, math.ceil(full_at - now))
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,132 @@
+"""
+Добавление и удаление связей пользователя (избранное, список покупок,
+подписки) одним атомарным запросом.
+
+На PostgreSQL вставка или удаление связи и изменение счётчика у цели
+выполняются одним запросом с CTE. На остальных базах — двумя запросами
+в одной транзакции.
+"""
+from django.db import connection, transaction
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+class Relation:
+    """
+    Описание связи: модель связи, поле владельца, поле цели
+    и счётчик на модели цели.
+    """
+
+    def __init__(self, model, owner_field, target_field, counter):
+        self.model = model
+        self.owner_field = owner_field
+        self.target_field = target_field
+        self.counter = counter
+
+    @property
+    def target_model(self):
+        return self.model._meta.get_field(self.target_field).related_model
+
+    def get_names(self, returning):
+        quote = connection.ops.quote_name
+        target = self.target_model
+        return {
+            'table': quote(self.model._meta.db_table),
+            'owner': quote(self.model._meta.get_field(
+                self.owner_field
+            ).column),
+            'target': quote(self.model._meta.get_field(
+                self.target_field
+            ).column),
+            'target_table': quote(target._meta.db_table),
+            'target_pk': quote(target._meta.pk.column),
+            'counter': quote(target._meta.get_field(self.counter).column),
+            'returning': ', '.join(
+                f'{quote(target._meta.db_table)}.'
+                f'{quote(target._meta.get_field(field).column)}'
+                for field in returning
+            ),
+        }
+
+    def execute(self, change_sql, delta, params, returning):
+        """
+        Выполнить изменение связей и счётчиков.
+        Возвращает строки цели из RETURNING для изменённых связей.
+        """
+        names = self.get_names(returning)
+        counter = (
+            '{counter} + 1' if delta > 0
+            else 'CASE WHEN {counter} > 0 THEN {counter} - 1 ELSE 0 END'
+        ).format(**names)
+        update_sql = (
+            'UPDATE {target_table} SET {counter} = ' + counter + ' '
+        ).format(**names)
+        change_sql = (change_sql + ' RETURNING {target}').format(**names)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    f'WITH changed AS ({change_sql}) {update_sql}'
+                    'FROM changed WHERE {target_table}.{target_pk} = '
+                    'changed.{target} RETURNING {returning}'.format(**names),
+                    params
+                )
+                rows = cursor.fetchall()
+            else:
+                with transaction.atomic():
+                    cursor.execute(change_sql, params)
+                    changed = [row[0] for row in cursor.fetchall()]
+                    rows = []
+                    if changed:
+                        cursor.execute(
+                            update_sql + 'WHERE {target_pk} IN ({ids}) '
+                            'RETURNING {returning}'.format(
+                                ids=placeholders(changed), **names
+                            ),
+                            changed
+                        )
+                        rows = cursor.fetchall()
+        return [dict(zip(returning, row)) for row in rows]
+
+    def add_many(self, owner_id, target_ids, returning=('id',)):
+        """
+        Создать связи с несколькими целями. Уже существующие связи
+        и несуществующие цели пропускаются.
+        """
+        return self.execute(
+            'INSERT INTO {table} ({owner}, {target}) '
+            'SELECT %s, {target_pk} FROM {target_table} '
+            'WHERE {target_pk} IN (' + placeholders(target_ids) + ') '
+            'ON CONFLICT DO NOTHING',
+            1, [owner_id, *target_ids], returning
+        )
+
+    def remove_many(self, owner_id, target_ids, returning=('id',)):
+        """Удалить связи с несколькими целями."""
+        return self.execute(
+            'DELETE FROM {table} WHERE {owner} = %s '
+            'AND {target} IN (' + placeholders(target_ids) + ')',
+            -1, [owner_id, *target_ids], returning
+        )
+
+    def add(self, owner_id, target_id, returning=('id',)):
+        """
+        Создать связь. Возвращает поля цели из RETURNING или None,
+        если связь уже есть или цели не существует.
+        """
+        rows = self.add_many(owner_id, [target_id], returning)
+        return rows[0] if rows else None
+
+    def remove(self, owner_id, target_id, returning=('id',)):
+        """Удалить связь. None, если связи не было."""
+        rows = self.remove_many(owner_id, [target_id], returning)
+        return rows[0] if rows else None
+
+
+favorites = Relation(Favorite, 'user', 'recipe', 'favorites_count')
+shopping_carts = Relation(ShoppingCart, 'user', 'recipe', 'in_carts_count')
+follows = Relation(Follow, 'follower', 'following', 'followers_count')
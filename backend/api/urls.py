@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .async_views import get_async_urls
+from .batch import BatchView
+from .views import (IngredientViewSet, ProfileViewSet, RecipeViewSet,
+                    TagViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -10,10 +14,15 @@ router_v1.register(r'users', UserViewSet, basename='users')
 router_v1.register(r'tags', TagViewSet, basename='tags')
 router_v1.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register(r'recipes', RecipeViewSet, basename='recipes')
+router_v1.register(r'profiles', ProfileViewSet, basename='profiles')
 
+router_urls = router_v1.urls
+if settings.ASYNC_VIEWS:
+    router_urls = get_async_urls(router_urls)
 
 urlpatterns = [
-    path('', include(router_v1.urls)),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
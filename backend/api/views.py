@@ -1,6 +1,11 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import os
+
+from django.db import transaction
+from django.db.models import Exists, F, Max, OuterRef, Sum
+
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from djoser.permissions import CurrentUserOrAdmin
 from djoser.views import UserViewSet
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
@@ -12,22 +17,38 @@ from users.models import Follow
 from rest_framework import status, filters
 from rest_framework import permissions
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.viewsets import (ModelViewSet, ReadOnlyModelViewSet,
+                                     ViewSet)
 from rest_framework.pagination import PageNumberPagination
 
 from .serializers import (SubscriptionsSerializer, IngredientSerializer,
                           PasswordSerializer, RecipeListSerializer,
-                          RecipeCreateUpdateSerializers, FavoriteSerializer,
-                          ShoppingCartSerializer, TagSerializer,
-                          UserCreateSerializer, UserSerializer)
-from .filters import IngredientSearch
+                          RecipeCreateUpdateSerializers, RecipeShortSerializer,
+                          TagSerializer, UserCreateSerializer, UserSerializer)
+from .fast_serializers import (IngredientValuesSerializer,
+                               RecipeListValuesSerializer, TagValuesSerializer)
+from .filters import IngredientSearch, RecipeFilter
+from .jobs import enqueue
+from .mixins import (BulkRelationMixin, ConditionalGetMixin,
+                     IngredientCatalogMixin, ValuesListMixin)
+from .profiling import get_profile_path, list_profiles
+from .throttling import ScopedTokenBucketThrottle
+from .toggles import favorites, follows, shopping_carts
 from api.permissions import IsAuthenticatedOrReadOnly, AuthorOrReadOnly
 User = get_user_model()
 
+RECIPE_SHORT_FIELDS = ('id', 'name', 'image', 'cooking_time')
+AUTHOR_VERSION_FIELDS = ('email', 'username', 'first_name', 'last_name')
+SUBSCRIPTION_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'recipes_count'
+)
+
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, ValuesListMixin,
+                 ReadOnlyModelViewSet):
     """
     ViewSet модели Tag.
     Отображение тегов.
@@ -35,11 +56,14 @@ class TagViewSet(ReadOnlyModelViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    read_from_replica = True
+    values_serializer_class = TagValuesSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, IngredientCatalogMixin,
+                        ValuesListMixin, ReadOnlyModelViewSet):
     """
     ViewSet модели Ingredient.
     Отображение ингредиентов.
@@ -47,17 +71,27 @@ class IngredientViewSet(ReadOnlyModelViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    read_from_replica = True
+    values_serializer_class = IngredientValuesSerializer
     permission_classes = (AllowAny,)
     filter_backends = [IngredientSearch]
     search_fields = ['^name']
     pagination_class = None
+    throttle_classes = (ScopedTokenBucketThrottle,)
+    throttle_scope = 'ingredients'
 
 
-class UserViewSet(UserViewSet):
+class UserViewSet(BulkRelationMixin, UserViewSet):
     """
     ViewSet модели User.
     """
     queryset = User.objects.all().order_by("id")
+    read_from_replica = True
+    throttle_classes = (ScopedTokenBucketThrottle,)
+    throttle_scopes = {
+        'subscribe': 'relations',
+        'subscribe_bulk': 'relations',
+    }
     filter_backends = (DjangoFilterBackend, filters.SearchFilter)
     serializer_class = UserCreateSerializer()
     pagination_class = PageNumberPagination
@@ -70,6 +104,8 @@ class UserViewSet(UserViewSet):
             return PasswordSerializer
         if self.action == "subscriptions":
             return SubscriptionsSerializer
+        if self.action == "destroy":
+            return super().get_serializer_class()
         return UserSerializer
 
     def get_queryset(self):
@@ -81,10 +117,25 @@ class UserViewSet(UserViewSet):
         if (self.request.method == 'POST'
            and self.request.path == '/api/users/'):
             permission_classes = [permissions.AllowAny]
+        elif self.action == 'destroy':
+            permission_classes = [CurrentUserOrAdmin]
         else:
             permission_classes = [AuthorOrReadOnly]
         return [permission() for permission in permission_classes]
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Каскадное удаление рецептов занимает много времени: пользователь
+        деактивируется сразу, а удаляется фоновой задачей delete_user.
+        """
+        instance.is_active = False
+        instance.save(update_fields=('is_active',))
+        enqueue(
+            'delete_user', {'user_id': instance.id},
+            key=f'delete-user:{instance.id}'
+        )
+
     @action(("get",), detail=False, permission_classes=(IsAuthenticated,))
     def me(self, request):
         """
@@ -124,42 +175,48 @@ class UserViewSet(UserViewSet):
         Создание и удаление подписки на пользователя.
         """
         current_user = request.user
-        following_user = get_object_or_404(User, id=id)
-        follow = Follow.objects.filter(
-            follower=current_user,
-            following=following_user
-        ).exists()
 
         if request.method == "POST":
-            if current_user == following_user:
+            if str(current_user.id) == str(id):
                 return Response(
                     {"message": "Вы не можете подписываться на самого себя"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-
-            if follow:
+            following_user = follows.add(
+                current_user.id, id, returning=SUBSCRIPTION_FIELDS
+            )
+            if following_user is None:
+                get_object_or_404(User, id=id)
                 return Response(
                     {"message": "Вы уже подписаны на этого пользователя"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            Follow.objects.create(
-                follower=current_user, following=following_user
+            serializer = SubscriptionsSerializer(
+                User(**following_user), context={'request': request}
             )
-            serializer = SubscriptionsSerializer(following_user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if request.method == "DELETE":
-            if follow:
-                follow = Follow.objects.get(
-                    follower=current_user, following=following_user
-                ).delete()
-            return Response(
-                {"message": "Вы отписались от этого пользователя."},
-                status=status.HTTP_204_NO_CONTENT
-            )
+        if follows.remove(current_user.id, id) is None:
+            get_object_or_404(User, id=id)
         return Response(
-            {"message": "Вы не подписаны на этого пользователя!"},
-            status=status.HTTP_400_BAD_REQUEST
+            {"message": "Вы отписались от этого пользователя."},
+            status=status.HTTP_204_NO_CONTENT
+        )
+
+    @action(
+        detail=False,
+        methods=("post", "delete",),
+        permission_classes=(IsAuthenticated,),
+        url_path=r"subscribe",
+        url_name="subscribe-bulk"
+    )
+    def subscribe_bulk(self, request):
+        """
+        Запрос к эндпоинту /users/subscribe/.
+        Подписка и отписка сразу от нескольких авторов.
+        """
+        return self.bulk_relation(
+            request, follows, excluded={request.user.id}
         )
 
     @action(
@@ -182,44 +239,73 @@ class UserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(BulkRelationMixin, ConditionalGetMixin, ValuesListMixin,
+                    ModelViewSet):
     """
     ViewSet модели Recipe.
     """
-    queryset = Recipe.objects.all().order_by("-pub_date")
+    queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
+    filterset_class = RecipeFilter
     pagination_class = PageNumberPagination
-
-    def get_queryset(self):
-        queryset = Recipe.objects.all()
-        tags = self.request.query_params.getlist('tags')
-        user = self.request.user
-        author = self.request.query_params.get('author')
-        is_favorite = self.request.query_params.get('is_favorited')
-        is_in_shopping_cart = self.request.query_params.get(
-            'is_in_shopping_cart'
+    values_serializer_class = RecipeListValuesSerializer
+    conditional_actions = ('retrieve',)
+    read_from_replica = True
+    throttle_classes = (ScopedTokenBucketThrottle,)
+    throttle_scope = 'recipes'
+    throttle_scopes = {
+        'favorite': 'relations',
+        'favorite_bulk': 'relations',
+        'shopping_cart': 'relations',
+        'shopping_cart_bulk': 'relations',
+    }
+
+    def get_version_annotations(self):
+        """
+        Версия рецепта зависит от тегов, ингредиентов, полей автора
+        и отметок текущего пользователя.
+        """
+        annotations = {
+            'tags_updated_at': Max('tags__updated_at'),
+            'ingredients_updated_at': Max('ingredients__updated_at'),
+        }
+        annotations.update(
+            (f'author_{field}', F(f'author__{field}'))
+            for field in AUTHOR_VERSION_FIELDS
         )
+        user = self.request.user
+        if user.is_authenticated:
+            annotations.update(
+                is_favorited=Exists(Favorite.objects.filter(
+                    recipe=OuterRef('pk'), user=user
+                )),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    recipe=OuterRef('pk'), user=user
+                )),
+                is_subscribed=Exists(Follow.objects.filter(
+                    following=OuterRef('author'), follower=user
+                )),
+            )
+        return annotations
 
-        if author:
-            queryset = queryset.filter(author_id=author)
-
-        if tags:
-            queryset = queryset.filter(tags__slug__in=tags).distinct()
-
-        if is_favorite:
-            queryset = queryset.filter(favorite__user=user)
-
-        if is_in_shopping_cart:
-            queryset = Recipe.objects.filter(shopping_cart__user=user)
-
-        return queryset
+    def get_last_modified(self, version):
+        """
+        Поля автора и отметки пользователя меняются без даты изменения
+        рецепта, поэтому ответ проверяется только по ETag.
+        """
+        return None
 
     def get_serializer_class(self):
         if self.action in ("list", "retrieve"):
             return RecipeListSerializer
         return RecipeCreateUpdateSerializers
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Рецепт удаляется в одной транзакции со счётчиками."""
+        super().perform_destroy(instance)
+
     @action(
         detail=True,
         methods=("post", "delete",),
@@ -231,33 +317,26 @@ class RecipeViewSet(ModelViewSet):
         Запрос к эндпоинту /shopping_cart/.
         Добавление рецепта в корзину и удаление.
         """
-        recipes = get_object_or_404(Recipe, pk=pk)
-        cart = ShoppingCart.objects.filter(
-            recipe=recipes, user=request.user
-        ).exists()
-
         if request.method == "POST":
-            if cart:
+            recipe = shopping_carts.add(
+                request.user.id, pk, returning=RECIPE_SHORT_FIELDS
+            )
+            if recipe is None:
+                get_object_or_404(Recipe, pk=pk)
                 return Response(
                     {"message": "Рецепт уже добавлен в корзину!"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            shopping_cart = ShoppingCart.objects.create(
-                recipe=recipes, user_id=request.user.id
-            )
-            serializer = ShoppingCartSerializer(shopping_cart)
+            serializer = RecipeShortSerializer(Recipe(**recipe))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if request.method == "DELETE":
-            if not cart:
-                return Response(
-                    {"message": "Рецепт нет в корзине!"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            ShoppingCart.objects.filter(
-                recipe=recipes, user_id=request.user.id
-            ).delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        if shopping_carts.remove(request.user.id, pk) is None:
+            get_object_or_404(Recipe, pk=pk)
+            return Response(
+                {"message": "Рецепт нет в корзине!"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=True,
@@ -270,26 +349,47 @@ class RecipeViewSet(ModelViewSet):
         Запрос к эндпоинту /favorite/.
         Добавление рецепта в избранное и удаление.
         """
-        recipe = get_object_or_404(Recipe, pk=pk)
-        favorite = Favorite.objects.filter(
-            recipe=recipe, user=request.user
-        ).exists()
-
         if request.method == "POST":
-            if favorite:
-                return Response(status=status.HTTP_400_BAD_REQUEST)
-            favorite_add = Favorite.objects.create(
-                recipe=recipe, user_id=request.user.id
+            recipe = favorites.add(
+                request.user.id, pk, returning=RECIPE_SHORT_FIELDS
             )
-            serializer = FavoriteSerializer(favorite_add)
+            if recipe is None:
+                get_object_or_404(Recipe, pk=pk)
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            serializer = RecipeShortSerializer(Recipe(**recipe))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if request.method == "DELETE":
-            if favorite:
-                favorite = Favorite.objects.get(
-                    recipe=recipe, user=request.user
-                ).delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        if favorites.remove(request.user.id, pk) is None:
+            get_object_or_404(Recipe, pk=pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=("post", "delete",),
+        permission_classes=(IsAuthenticated,),
+        url_path=r"shopping_cart",
+        url_name="shopping-cart-bulk"
+    )
+    def shopping_cart_bulk(self, request):
+        """
+        Запрос к эндпоинту /recipes/shopping_cart/.
+        Добавление в корзину и удаление сразу нескольких рецептов.
+        """
+        return self.bulk_relation(request, shopping_carts)
+
+    @action(
+        detail=False,
+        methods=("post", "delete",),
+        permission_classes=(IsAuthenticated,),
+        url_path=r"favorite",
+        url_name="favorite-bulk"
+    )
+    def favorite_bulk(self, request):
+        """
+        Запрос к эндпоинту /recipes/favorite/.
+        Добавление в избранное и удаление сразу нескольких рецептов.
+        """
+        return self.bulk_relation(request, favorites)
 
     def create_ingredients_file(self):
         """Метод для создания текстового файла списка покупок."""
@@ -320,3 +420,25 @@ class RecipeViewSet(ModelViewSet):
             'attachment; filename="ingredients.txt"'
         )
         return response
+
+
+class ProfileViewSet(ViewSet):
+    """
+    Профили запросов (api.profiling): список и скачивание файла.
+    Только для сотрудников.
+    """
+
+    permission_classes = (IsAdminUser,)
+    lookup_value_regex = r'[\w-]+'
+
+    def list(self, request):
+        return Response(list_profiles())
+
+    def retrieve(self, request, pk=None):
+        path = get_profile_path(pk)
+        if path is None:
+            raise Http404
+        return FileResponse(
+            open(path, 'rb'), as_attachment=True,
+            filename=os.path.basename(path)
+        )
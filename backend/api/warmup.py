@@ -0,0 +1,100 @@
+"""
+Прогрев процесса перед приёмом запросов (STARTUP_WARMUP).
+
+ApiConfig.ready импортирует маршруты, вьюхи и тяжёлые библиотеки,
+строит поля сериализаторов, загружает переводы и выполняет запросы
+WARMUP_PATHS в обход middleware. С preload_app (gunicorn.conf.py)
+это делается один раз в мастере gunicorn, и воркеры получают готовое
+состояние при fork. Соединения с базой после прогрева закрываются:
+воркеры не должны их наследовать.
+"""
+import inspect
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import translation
+from rest_framework import serializers as drf_serializers
+
+logger = logging.getLogger('api.warmup')
+
+WARMUP_PATHS = ('/api/tags/', '/api/ingredients/', '/api/recipes/')
+
+
+def get_host():
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def import_libraries():
+    from PIL import Image
+
+    Image.init()
+
+
+def build_serializers():
+    """Поля всех сериализаторов API: модели, валидаторы, переводы."""
+    from . import serializers
+
+    with translation.override(settings.LANGUAGE_CODE):
+        for serializer_class in vars(serializers).values():
+            if (inspect.isclass(serializer_class)
+               and issubclass(serializer_class, drf_serializers.Serializer)
+               and serializer_class.__module__ == serializers.__name__):
+                serializer_class(context={'request': None}).fields
+
+
+def request_paths():
+    """Запросы к вьюхам без middleware: кэши каталога, рендереры."""
+    factory = RequestFactory()
+    for path in WARMUP_PATHS:
+        match = resolve(path)
+        view = getattr(match.func, 'sync_view', match.func)
+        request = factory.get(path, HTTP_HOST=get_host())
+        response = view(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        response.close()
+
+
+def close_connections():
+    for connection in connections.all():
+        close_pool = getattr(connection, 'close_pool', None)
+        connection.close()
+        if close_pool is not None:
+            close_pool()
+
+
+STEPS = (
+    ('urls', lambda: reverse('api:recipes-list')),
+    ('libraries', import_libraries),
+    ('serializers', build_serializers),
+    ('requests', request_paths),
+)
+
+
+def warm_up():
+    """Выполнить шаги прогрева; ошибка шага не мешает запуску."""
+    started = time.perf_counter()
+    try:
+        for name, step in STEPS:
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                logger.warning('Прогрев %s не выполнен.', name, exc_info=True)
+                continue
+            logger.info(
+                'Прогрев %s: %.0f мс.', name,
+                (time.perf_counter() - step_started) * 1000
+            )
+    finally:
+        close_connections()
+    logger.info(
+        'Прогрев завершён за %.0f мс.', (time.perf_counter() - started) * 1000
+    )
@@ -0,0 +1,117 @@
+"""
+PostgreSQL с пулом соединений внутри процесса.
+
+Для воркеров с потоками или корутинами: соединения берутся из общего
+для процесса пула psycopg2 и возвращаются в него в конце каждого
+запроса, вместо того чтобы каждый поток держал своё соединение.
+Размер пула на процесс задаётся в DATABASES[alias]['POOL']:
+MIN_SIZE, MAX_SIZE и TIMEOUT ожидания свободного соединения.
+"""
+import threading
+import time
+
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from psycopg2 import extensions, pool
+
+from api.metrics import POOL_CONNECTS, POOL_IN_USE, POOL_WAIT
+
+Database = base.Database
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class CountingConnectionPool(pool.ThreadedConnectionPool):
+    """Пул, ограничивающий ожидание и считающий новые соединения."""
+
+    def __init__(self, alias, min_size, max_size, timeout, **params):
+        self.alias = alias
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_size)
+        super().__init__(min_size, max_size, **params)
+
+    def _connect(self, key=None):
+        POOL_CONNECTS.labels(self.alias).inc()
+        return super()._connect(key)
+
+    def acquire(self):
+        started = time.perf_counter()
+        if not self.slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                f'Нет свободных соединений в пуле {self.alias} '
+                f'за {self.timeout} с.'
+            )
+        POOL_WAIT.labels(self.alias).observe(time.perf_counter() - started)
+        try:
+            connection = self.getconn()
+        except BaseException:
+            self.slots.release()
+            raise
+        POOL_IN_USE.labels(self.alias).inc()
+        return connection
+
+    def release(self, connection):
+        try:
+            if (not connection.closed
+               and connection.get_transaction_status()
+               != extensions.TRANSACTION_STATUS_IDLE):
+                connection.rollback()
+            self.putconn(connection, close=bool(connection.closed))
+        finally:
+            POOL_IN_USE.labels(self.alias).dec()
+            self.slots.release()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self):
+        connection_pool = pools.get(self.alias)
+        if connection_pool is None:
+            with pools_lock:
+                connection_pool = pools.get(self.alias)
+                if connection_pool is None:
+                    options = self.settings_dict.get('POOL', {})
+                    connection_pool = pools[self.alias] = (
+                        CountingConnectionPool(
+                            self.alias,
+                            options.get('MIN_SIZE', 1),
+                            options.get('MAX_SIZE', 4),
+                            options.get('TIMEOUT', 5),
+                            **self.get_connection_params()
+                        )
+                    )
+        return connection_pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool().acquire()
+        # Как в базовом бэкенде, но соединение берётся из пула.
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.get_pool().release(self.connection)
+
+    def close_pool(self):
+        """Закрыть пул процесса, например перед fork воркеров gunicorn."""
+        with pools_lock:
+            connection_pool = pools.pop(self.alias, None)
+        if connection_pool is not None:
+            connection_pool.closeall()
+
+    def close_if_unusable_or_obsolete(self):
+        """Соединение возвращается в пул на границах каждого запроса."""
+        if self.connection is not None and not self.in_atomic_block:
+            self.close()
@@ -29,6 +29,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.middleware.SQLInstrumentationMiddleware",
+    "api.slow_queries.SlowQueryContextMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -36,6 +39,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.profiling.ProfilingMiddleware",
+    "api.routers.ReplicaMiddleware",
 ]
 
 ROOT_URLCONF = "backend.urls"
@@ -58,6 +63,17 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "backend.wsgi.application"
 
+# Запуск под ASGI (backend/asgi.py включает ASYNC_VIEWS): чтение
+# рецептов, тегов и ингредиентов и выгрузка списка покупок выполняются
+# в пуле из ASYNC_VIEW_THREADS потоков (api.async_views). У каждого
+# потока своё соединение с базой.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False") == "True"
+ASYNC_VIEW_THREADS = int(os.getenv("ASYNC_VIEW_THREADS", 8))
+
+# Прогрев процесса при запуске (api.warmup); gunicorn.conf.py
+# включает его для воркеров gunicorn.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "False") == "True"
+
 
 # Database
 # DATABASES = {
@@ -75,9 +91,48 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "postgres"),
         "HOST": os.getenv("DB_HOST", "db"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "POOL": {
+            "MIN_SIZE": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+            "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", 4)),
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+        },
+        "TEST": {"NAME": os.getenv("DB_TEST_NAME")},
     }
 }
 
+# Соединения живут DB_CONN_MAX_AGE секунд и проверяются перед повторным
+# использованием не чаще раза в DB_HEALTH_CHECK_INTERVAL секунд.
+# Для воркеров с потоками: DB_ENGINE=backend.postgresql_pool — общий
+# на процесс пул размера POOL, соединения возвращаются в пул после
+# каждого запроса. Всего соединений: воркеры x MAX_SIZE, это должно
+# быть меньше max_connections в PostgreSQL.
+# DB_TEST_NAME — файл тестовой базы SQLite: база в памяти (по умолчанию)
+# не допускает параллельной записи, и тесты гонок идут в одном потоке.
+
+DB_HEALTH_CHECK_INTERVAL = int(os.getenv("DB_HEALTH_CHECK_INTERVAL", 10))
+
+# Реплики для чтения (api.routers): DB_REPLICAS — через запятую
+# host[:port] реплик PostgreSQL или пути к файлам SQLite.
+
+REPLICA_DATABASES = []
+for number, replica in enumerate(
+    filter(None, os.getenv("DB_REPLICAS", "").split(",")), 1
+):
+    alias = f"replica_{number}"
+    if DATABASES["default"]["ENGINE"].endswith("sqlite3"):
+        DATABASES[alias] = dict(DATABASES["default"], NAME=replica)
+    else:
+        host, _, port = replica.partition(":")
+        DATABASES[alias] = dict(
+            DATABASES["default"], HOST=host,
+            PORT=port or DATABASES["default"]["PORT"]
+        )
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["api.routers.ReplicaRouter"]
+
 
 # Password validation
 
@@ -118,6 +173,13 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Снимок каталога ингредиентов (manage.py compile_ingredients)
+
+INGREDIENT_CATALOG_PATH = os.getenv(
+    "INGREDIENT_CATALOG_PATH",
+    os.path.join(BASE_DIR, "catalog", "ingredients.bin")
+)
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Custom user model
@@ -131,19 +193,157 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": [
         "rest_framework.pagination.PageNumberPagination",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "PAGE_SIZE": 6,
     "SEARCH_PARAM": "name",
+    # api.throttling: запросов за период и ёмкость ведра после ":".
+    # Это лимиты на клиента для всего сервиса: без общего кэша
+    # (THROTTLE_CACHE_ALIAS) каждый воркер пропускает свою долю —
+    # частоту и ёмкость, делённые на THROTTLE_LOCAL_WORKERS.
+    "DEFAULT_THROTTLE_RATES": {
+        "recipes": os.getenv("THROTTLE_RECIPES", "120/min:30"),
+        "ingredients": os.getenv("THROTTLE_INGREDIENTS", "300/min:60"),
+        "relations": os.getenv("THROTTLE_RELATIONS", "60/min:20"),
+    },
+    # Прокси перед приложением (nginx): IP клиента из X-Forwarded-For.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 1)),
 }
 
+# Хранилище троттлинга: THROTTLE_CACHE_ALIAS — алиас из CACHES
+# для общего между воркерами счётчика, пустое значение — память
+# процесса. Тогда лимит делится на THROTTLE_LOCAL_WORKERS воркеров
+# (gunicorn.conf.py подставляет их число): запросы клиента
+# распределяются между воркерами, и в сумме лимит близок к заданному.
+
+THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "True") == "True"
+THROTTLE_CACHE_SIZE = int(os.getenv("THROTTLE_CACHE_SIZE", 100000))
+THROTTLE_CACHE_ALIAS = os.getenv("THROTTLE_CACHE_ALIAS") or None
+THROTTLE_LOCAL_WORKERS = int(os.getenv("THROTTLE_LOCAL_WORKERS", 1))
+
+# Кэш токенов: TOKEN_CACHE_ALIAS — алиас из CACHES для общего
+# между воркерами кэша, пустое значение — кэш внутри процесса.
+
+TOKEN_CACHE_TIMEOUT = int(os.getenv("TOKEN_CACHE_TIMEOUT", 60))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_ALIAS = os.getenv("TOKEN_CACHE_ALIAS") or None
+
+# Учёт SQL-запросов (api.middleware.SQLInstrumentationMiddleware):
+# доля учитываемых запросов, порог повторов одной формы запроса (N+1)
+# и заголовок Server-Timing.
+
+SQL_SAMPLE_RATE = float(os.getenv("SQL_SAMPLE_RATE", 0.1))
+SQL_REPEATED_THRESHOLD = int(os.getenv("SQL_REPEATED_THRESHOLD", 5))
+SQL_SERVER_TIMING = os.getenv("SQL_SERVER_TIMING", "True") == "True"
+
+# Журнал медленных запросов (manage.py report_slow_queries):
+# порог в миллисекундах (0 — выключен) и файл. Воркеры пишут в один
+# файл и не ротируют его; ротация — logrotate по logrotate.conf
+# (сервис logrotate в infra/docker-compose.yml), отчёт читает копии
+# SLOW_QUERY_LOG.1 ... .N, где N — SLOW_QUERY_LOG_BACKUPS (rotate).
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_LOG = os.getenv(
+    "SLOW_QUERY_LOG", os.path.join(BASE_DIR, "logs", "slow_queries.log")
+)
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Профилирование запросов (api.profiling).
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_RATE_LIMIT = int(os.getenv("PROFILE_RATE_LIMIT", 6))
+PROFILE_SAMPLE_INTERVAL = 0.001
+PROFILE_MAX_BYTES = 5 * 1024 * 1024
+PROFILE_DIR_MAX_BYTES = 200 * 1024 * 1024
+PROFILE_SIGNATURE_MAX_AGE = 60 * 60
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.sql": {
+            "handlers": ["console"],
+            "level": os.getenv("SQL_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+        "api.warmup": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "api.jobs": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Сколько секунд клиент читает из основной базы после своей записи.
+# Отметки о записи хранятся в REPLICA_STICKY_CACHE_ALIAS, иначе
+# в TOKEN_CACHE_ALIAS. По умолчанию оба пусты и кэш — память процесса:
+# запись в одном воркере не привязывает к основной базе чтения того же
+# клиента в других воркерах, и они могут не увидеть его изменений.
+# Для нескольких воркеров задайте общий кэш (алиас из CACHES).
+
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+REPLICA_STICKY_CACHE_ALIAS = (
+    os.getenv("REPLICA_STICKY_CACHE_ALIAS") or TOKEN_CACHE_ALIAS
+)
+
 DJOSER = {
     "LOGIN_FIELD": "email",
 }
 
+# Админка: списки таблиц больше порога без фильтров показывают
+# оценку числа строк из статистики PostgreSQL вместо COUNT(*).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Фоновые задачи (api.jobs, manage.py run_worker): попытки с задержкой
+# JOB_RETRY_DELAY * 2 ** (попытка - 1), но не больше JOB_RETRY_MAX_DELAY
+# секунд. Задача, выполняющаяся дольше JOB_TIMEOUT секунд, считается
+# зависшей и возвращается в очередь.
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", 60 * 60))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))
+JOB_RETENTION_DAYS = 7
+JOB_DELETE_BATCH_SIZE = 500
+
+# Изображения рецептов уменьшаются фоновой задачей до этого размера
+# по большей стороне.
+
+RECIPE_IMAGE_MAX_SIZE = 1600
+RECIPE_IMAGE_QUALITY = 85
+
+BULK_MAX_ITEMS = 100
+
+# Батч запросов (api.batch): не больше BATCH_MAX_REQUESTS подзапросов.
+# BATCH_MAX_SECONDS — мягкий предел: время проверяется только между
+# подзапросами, начатый подзапрос не прерывается, поэтому батч может
+# длиться дольше на время самого медленного подзапроса. Оставшиеся
+# подзапросы получают статус 503.
+
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_SECONDS = 5
+
 MIN_VALUE_COOKING_TIME = 1
 VALUE_AMOUNT = 1
 LIMITATION = 200
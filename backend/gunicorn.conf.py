@@ -0,0 +1,53 @@
+"""
+Настройки gunicorn. Файл подхватывается из рабочего каталога
+при запуске gunicorn.
+
+Приложение загружается в мастере до fork (preload_app) и прогревается
+там же (api.warmup), поэтому новые воркеры не платят за импорт и
+первые запросы. Число воркеров по умолчанию зависит от числа CPU и
+класса воркера. Воркер перезапускается после max_requests запросов
+со случайной добавкой до max_requests_jitter, чтобы воркеры
+не перезапускались одновременно.
+"""
+import multiprocessing
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+METRICS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+CPU_COUNT = multiprocessing.cpu_count()
+
+os.environ.setdefault('STARTUP_WARMUP', 'True')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+# Асинхронным воркерам хватает процесса на CPU.
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS',
+    CPU_COUNT if 'uvicorn' in worker_class else CPU_COUNT * 2 + 1
+))
+# Лимиты api.throttling в памяти процесса делятся между воркерами.
+os.environ.setdefault('THROTTLE_LOCAL_WORKERS', str(workers))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get(
+    'GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10
+))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+
+def on_starting(server):
+    """Удалить метрики воркеров прошлого запуска."""
+    if METRICS_DIR:
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Перестать учитывать gauge завершившегося воркера."""
+    if METRICS_DIR:
+        multiprocess.mark_process_dead(worker.pid)
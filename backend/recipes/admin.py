@@ -1,59 +1,109 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Prefetch
 
+from .catalog import compile_catalog
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                      ShoppingCart, Tag)
+from .paginators import EstimatedCountPaginator, PaginatedInlineFormSet
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Список без полного COUNT(*): число строк без фильтров оценивается,
+    а число всех объектов рядом с результатами поиска не выводится.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = Recipe.ingredients.through
+    formset = PaginatedInlineFormSet
+    template = 'admin/edit_inline/paginated_tabular.html'
+    autocomplete_fields = ('ingredient',)
     extra = 1
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient'
+        )
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.page_number = request.GET.get(
+            f'{formset.get_default_prefix()}-page'
+        )
+        return formset
+
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(ScalableAdmin):
     list_display = (
-        'id', 'author', 'name',
-        'text', 'cooking_time', 'get_favorites', 'get_ingredients'
+        'id', 'author', 'name', 'cooking_time', 'pub_date',
+        'get_favorites', 'get_carts', 'get_ingredients'
     )
-    search_fields = (
-        "name",
-        "author__username",
-        "tags__name",
-    )
-    list_filter = ('author', 'name', 'tags')
-    empty_value_display = '-пусто-'
+    list_select_related = ('author',)
+    search_fields = ('name', '=author__username', '=author__email')
+    list_filter = ('tags', 'pub_date')
+    autocomplete_fields = ('author', 'tags')
     inlines = (RecipeIngredientInline,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('ingredients', Ingredient.objects.only('name'))
+        )
+
+    @admin.display(description='Избранное', ordering='favorites_count')
     def get_favorites(self, obj):
-        return obj.favorite.count()
-    get_favorites.short_description = 'Избранное'
+        return obj.favorites_count
 
+    @admin.display(description='В списках покупок', ordering='in_carts_count')
+    def get_carts(self, obj):
+        return obj.in_carts_count
+
+    @admin.display(description='Ингридиенты')
     def get_ingredients(self, obj):
-        return ', '.join([
-            ingredients.name for ingredients
-            in obj.ingredients.all()])
-    get_ingredients.short_description = 'Ингридиенты'
+        return ', '.join(
+            ingredient.name for ingredient in obj.ingredients.all()
+        )
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ScalableAdmin):
     list_display = ('name', 'measurement_unit')
-    search_fields = ('name',)
-    empty_value_display = '-пусто-'
+    search_fields = ('^name',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        transaction.on_commit(compile_catalog)
 
-@admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        transaction.on_commit(compile_catalog)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        transaction.on_commit(compile_catalog)
+
+
+class UserRecipeAdmin(ScalableAdmin):
     list_display = ['id', 'user', 'recipe']
-    search_fields = ['user__username', "recipe__name"]
-    empty_value_display = '-пусто-'
+    list_select_related = ('user', 'recipe')
+    search_fields = ['=user__username', '=user__email', '^recipe__name']
+    autocomplete_fields = ('user', 'recipe')
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(UserRecipeAdmin):
+    pass
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'recipe']
-    search_fields = ['user__username', 'user__email']
-    empty_value_display = '-пусто-'
+class ShoppingCartAdmin(UserRecipeAdmin):
+    pass
 
 
 @admin.register(Tag)
@@ -63,4 +113,9 @@ class TagAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-admin.site.register(RecipeIngredient)
+@admin.register(RecipeIngredient)
+class RecipeIngredientAdmin(ScalableAdmin):
+    list_display = ['id', 'recipe', 'ingredient', 'amount']
+    list_select_related = ('recipe', 'ingredient')
+    search_fields = ['^recipe__name', '^ingredient__name']
+    autocomplete_fields = ('recipe', 'ingredient')
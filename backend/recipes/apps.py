@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.STARTUP_WARMUP:
+            from .catalog import catalog
+
+            catalog.warm()
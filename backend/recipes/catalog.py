@@ -0,0 +1,200 @@
+"""
+Снимок каталога ингредиентов.
+
+Формат файла (little-endian):
+    заголовок HEADER;
+    индекс по id: max_id + 1 записей INDEX_ENTRY (смещение и длина
+    записи в блоке строк, длина 0 — ингредиента нет);
+    блок строк: updated_at в микросекундах, затем
+    "name\\0measurement_unit" в UTF-8;
+    готовый JSON полного списка ингредиентов — всегда в конце файла.
+
+Файл пишется во временный и подменяется через os.replace, поэтому
+воркеры, открывшие старую версию, дочитывают её без ошибок.
+"""
+import mmap
+import os
+import struct
+import tempfile
+
+from django.conf import settings
+
+MAGIC = b'FGIC'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sIIIqQQQQ')
+INDEX_ENTRY = struct.Struct('<II')
+RECORD_UPDATED_AT = struct.Struct('<q')
+
+
+def to_microseconds(value):
+    if not value:
+        return 0
+    return int(value.timestamp()) * 1_000_000 + value.microsecond
+
+
+def compile_catalog(path=None):
+    """Собрать снимок каталога из базы. Возвращает число ингредиентов."""
+    from api.renderers import FastJSONRenderer
+    from api.serializers import IngredientSerializer
+    from .models import Ingredient
+
+    path = path or settings.INGREDIENT_CATALOG_PATH
+    queryset = Ingredient.objects.all()
+    rows = list(queryset.values(
+        'id', 'name', 'measurement_unit', 'updated_at'
+    ))
+    content = FastJSONRenderer().render(
+        IngredientSerializer(queryset, many=True).data
+    )
+    max_id = max((row['id'] for row in rows), default=0)
+    index = bytearray(INDEX_ENTRY.size * (max_id + 1))
+    blob = bytearray()
+    for row in rows:
+        record = RECORD_UPDATED_AT.pack(
+            to_microseconds(row['updated_at'])
+        ) + f"{row['name']}\0{row['measurement_unit']}".encode()
+        INDEX_ENTRY.pack_into(
+            index, row['id'] * INDEX_ENTRY.size, len(blob), len(record)
+        )
+        blob += record
+    updated_at = max(
+        (row['updated_at'] for row in rows if row['updated_at']),
+        default=None
+    )
+    index_offset = HEADER.size
+    blob_offset = index_offset + len(index)
+    json_offset = blob_offset + len(blob)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(rows), max_id,
+        to_microseconds(updated_at),
+        index_offset, blob_offset, json_offset, len(content),
+    )
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(header)
+            file.write(index)
+            file.write(blob)
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(rows)
+
+
+class Snapshot:
+    """Открытая через mmap версия файла снимка."""
+
+    def __init__(self, path, key):
+        self.key = key
+        with open(path, 'rb') as file:
+            self.buffer = mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        (magic, version, self.count, self.max_id, self.updated_at,
+         self.index_offset, self.blob_offset, self.json_offset,
+         self.json_length) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path}: неизвестный формат снимка.')
+
+    def get(self, pk):
+        if not 0 < pk <= self.max_id:
+            return None
+        offset, length = INDEX_ENTRY.unpack_from(
+            self.buffer, self.index_offset + pk * INDEX_ENTRY.size
+        )
+        if not length:
+            return None
+        start = self.blob_offset + offset
+        (updated_at,) = RECORD_UPDATED_AT.unpack_from(self.buffer, start)
+        name, measurement_unit = self.buffer[
+            start + RECORD_UPDATED_AT.size:start + length
+        ].decode().split('\0')
+        return {
+            'id': pk,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'updated_at': updated_at,
+        }
+
+
+class IngredientCatalog:
+    """
+    Доступ к снимку каталога из воркера.
+    Файл перечитывается, когда его подменили на диске.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = None
+
+    def get_snapshot(self):
+        try:
+            stat = os.stat(self.path)
+        except (FileNotFoundError, TypeError):
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.key != key:
+            try:
+                snapshot = Snapshot(self.path, key)
+            except (OSError, ValueError, struct.error):
+                return None
+            self.snapshot = snapshot
+        return snapshot
+
+    def warm(self):
+        """Открыть снимок и прочитать его страницы при запуске процесса."""
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return False
+        for offset in range(0, len(snapshot.buffer), mmap.PAGESIZE):
+            snapshot.buffer[offset]
+        return True
+
+    def get(self, pk, updated_at=None):
+        """Ингредиент по id, если он есть в снимке и не устарел."""
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return None
+        record = snapshot.get(pk)
+        if (record is None or updated_at is not None
+           and record['updated_at'] != to_microseconds(updated_at)):
+            return None
+        del record['updated_at']
+        return record
+
+    def open_json(self, count, updated_at):
+        """
+        Файл, спозиционированный на готовом JSON полного списка,
+        и длина JSON. None, если снимок не соответствует версии в базе.
+        """
+        try:
+            file = os.fdopen(os.open(self.path, os.O_RDONLY), 'rb')
+        except (FileNotFoundError, TypeError):
+            return None
+        try:
+            (magic, version, snapshot_count, _, snapshot_updated_at, _, _,
+             json_offset, json_length) = HEADER.unpack(
+                file.read(HEADER.size)
+            )
+        except struct.error:
+            file.close()
+            return None
+        if (magic != MAGIC or version != FORMAT_VERSION
+           or snapshot_count != count
+           or snapshot_updated_at != to_microseconds(updated_at)):
+            file.close()
+            return None
+        file.seek(json_offset)
+        return file, json_length
+
+
+catalog = IngredientCatalog(settings.INGREDIENT_CATALOG_PATH)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.catalog import compile_catalog
+
+
+class Command(BaseCommand):
+    help = 'Сборка снимка каталога ингредиентов для воркеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.INGREDIENT_CATALOG_PATH,
+            help='Путь к файлу снимка.'
+        )
+
+    def handle(self, *args, **options):
+        count = compile_catalog(options['path'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Снимок каталога собран: {count} ингредиентов.'
+        ))
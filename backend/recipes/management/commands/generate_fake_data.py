@@ -0,0 +1,365 @@
+import io
+import multiprocessing
+import os
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from PIL import Image
+
+from recipes.management.commands.reconcile_counters import (COUNTERS,
+                                                            count_subquery)
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Follow
+
+User = get_user_model()
+
+WORDS = (
+    'суп', 'салат', 'пирог', 'рагу', 'омлет', 'каша', 'запеканка',
+    'паста', 'плов', 'блины', 'котлеты', 'гуляш', 'ризотто', 'шакшука',
+)
+PLACEHOLDER_COLORS = (
+    '#E26C2D', '#49B64E', '#8775D2', '#F2C94C', '#56CCF2', '#EB5757',
+)
+RELATIONS = (
+    ('follows', Follow, 'follower_id', 'following_id', 'users'),
+    ('favorites', Favorite, 'user_id', 'recipe_id', 'recipes'),
+    ('cart', ShoppingCart, 'user_id', 'recipe_id', 'recipes'),
+)
+
+# Общие данные для процессов пула: заполняются до запуска пула
+# и достаются дочерним процессам при fork.
+state = {}
+
+
+class ZipfSampler:
+    """
+    Выбор id с распределением Ципфа: вес i-го по популярности id
+    пропорционален 1 / i ** exponent. Порядок популярности задаётся
+    перемешиванием id с фиксированным seed.
+    """
+
+    def __init__(self, ids, exponent, seed):
+        self.ids = list(ids)
+        random.Random(seed).shuffle(self.ids)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.ids) + 1)
+        ))
+
+    def sample(self, rng, count, exclude=None):
+        """count разных id, кроме exclude."""
+        count = min(count, len(self.ids) - (exclude is not None))
+        result = set()
+        while len(result) < count:
+            result.update(rng.choices(
+                self.ids, cum_weights=self.cum_weights,
+                k=count - len(result)
+            ))
+            result.discard(exclude)
+        return result
+
+
+def get_rng(*key):
+    return random.Random(':'.join(map(str, key)))
+
+
+def get_chunks(start, count, batch_size):
+    return [
+        (number, first, min(batch_size, start + count - first))
+        for number, first in enumerate(
+            range(start, start + count, batch_size)
+        )
+    ]
+
+
+def init_worker():
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout = 60000')
+
+
+def create_users(chunk):
+    number, first, count = chunk
+    users = [
+        User(
+            id=pk,
+            username=f'fake{pk}',
+            email=f'fake{pk}@example.com',
+            first_name='Имя',
+            last_name=f'Фамилия{pk}',
+            password=state['password'],
+        )
+        for pk in range(first, first + count)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+    return count
+
+
+def create_recipes(chunk):
+    number, first, count = chunk
+    rng = get_rng(state['seed'], 'recipes', number)
+    recipes, ingredients, tags = [], [], []
+    for pk in range(first, first + count):
+        recipes.append(Recipe(
+            id=pk,
+            author_id=state['authors'].sample(rng, 1).pop(),
+            name=f'{rng.choice(WORDS).capitalize()} №{pk}',
+            image=rng.choice(state['images']),
+            text=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+            cooking_time=rng.randint(5, 180),
+        ))
+        size = round(rng.triangular(*state['ingredients_per_recipe']))
+        ingredients.extend(
+            RecipeIngredient(
+                recipe_id=pk, ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for ingredient_id in state['ingredients'].sample(rng, size)
+        )
+        tags.extend(
+            Recipe.tags.through(recipe_id=pk, tag_id=tag_id)
+            for tag_id in rng.sample(
+                state['tags'], rng.randint(1, min(3, len(state['tags'])))
+            )
+        )
+    batch_size = state['batch_size']
+    with transaction.atomic():
+        Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+        RecipeIngredient.objects.bulk_create(
+            ingredients, batch_size=batch_size
+        )
+        Recipe.tags.through.objects.bulk_create(tags, batch_size=batch_size)
+    return count
+
+
+def create_relations(chunk):
+    name, number, owner_ids = chunk
+    _, model, owner_field, target_field, targets = next(
+        relation for relation in RELATIONS if relation[0] == name
+    )
+    rng = get_rng(state['seed'], name, number)
+    mean = state['per_user'][name]
+    objects = []
+    for owner_id in owner_ids:
+        exclude = owner_id if targets == 'users' else None
+        objects.extend(
+            model(**{owner_field: owner_id, target_field: target_id})
+            for target_id in state[targets].sample(
+                rng, rng.randint(0, 2 * mean), exclude
+            )
+        )
+    with transaction.atomic():
+        model.objects.bulk_create(
+            objects, batch_size=state['batch_size'], ignore_conflicts=True
+        )
+    return len(objects)
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация синтетических пользователей, рецептов, подписок, '
+        'избранного и списков покупок для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Количество новых пользователей.'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=10000,
+            help='Количество новых рецептов.'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=10,
+            help='Минимальное количество тегов в базе.'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=5,
+            help='Среднее количество подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее количество избранных рецептов на пользователя.'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Среднее количество рецептов в списке покупок.'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, nargs=3, default=(3, 15, 7),
+            metavar=('MIN', 'MAX', 'MODE'),
+            help='Ингредиентов в рецепте: минимум, максимум и мода.'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help='Seed генератора случайных чисел.'
+        )
+        parser.add_argument(
+            '--password', default='password',
+            help='Пароль всех созданных пользователей.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество объектов в одном bulk_create.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Количество процессов. По умолчанию число CPU, '
+                 'для SQLite — 1: она допускает одного писателя.'
+        )
+
+    def run(self, title, function, chunks):
+        started = time.perf_counter()
+        total = 0
+        # Соединения родителя не должны достаться дочерним процессам.
+        connections.close_all()
+        if self.workers > 1 and len(chunks) > 1:
+            with multiprocessing.get_context('fork').Pool(
+                self.workers, initializer=init_worker
+            ) as pool:
+                for count in pool.imap_unordered(function, chunks):
+                    total += count
+        else:
+            init_worker()
+            for chunk in chunks:
+                total += function(chunk)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{title}: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-9):.0f} строк/с).'
+        )
+
+    def ensure_tags(self, count):
+        existing = Tag.objects.count()
+        first = (Tag.objects.aggregate(pk=Max('pk'))['pk'] or 0) + 1
+        Tag.objects.bulk_create([
+            Tag(
+                name=f'Тег {pk}', slug=f'tag-{pk}',
+                color='#{:06X}'.format(pk * 2654435761 % 0x1000000),
+            )
+            for pk in range(first, first + count - existing)
+        ], ignore_conflicts=True)
+        return list(Tag.objects.values_list('pk', flat=True))
+
+    def get_images(self):
+        """Небольшие картинки-заглушки, общие для всех рецептов."""
+        upload_to = Recipe._meta.get_field('image').upload_to
+        names = []
+        for number, color in enumerate(PLACEHOLDER_COLORS):
+            name = f'{upload_to}/placeholder_{number}.png'
+            if not default_storage.exists(name):
+                content = io.BytesIO()
+                Image.new('RGB', (64, 64), color).save(content, 'PNG')
+                name = default_storage.save(
+                    name, ContentFile(content.getvalue())
+                )
+            names.append(name)
+        return names
+
+    def update_counters(self):
+        started = time.perf_counter()
+        for model, counter, source, field in COUNTERS:
+            model.objects.update(**{counter: count_subquery(source, field)})
+        self.stdout.write(
+            f'Счётчики: {time.perf_counter() - started:.1f} с.'
+        )
+
+    def handle(self, *args, **options):
+        self.workers = options['workers'] or (
+            1 if connection.vendor == 'sqlite' else os.cpu_count()
+        )
+        seed = options['seed']
+        batch_size = options['batch_size']
+        ingredient_ids = list(
+            Ingredient.objects.values_list('pk', flat=True)
+        )
+        if options['recipes'] and not ingredient_ids:
+            raise CommandError(
+                'Каталог ингредиентов пуст: сначала загрузите его '
+                'командой load_csv_data.'
+            )
+        low, high, mode = options['ingredients']
+        if not 0 < low <= mode <= high:
+            raise CommandError('Нужно 0 < MIN <= MODE <= MAX.')
+        state.update(
+            seed=seed,
+            batch_size=batch_size,
+            password=make_password(options['password']),
+            ingredients_per_recipe=(low, min(high, len(ingredient_ids)),
+                                    min(mode, len(ingredient_ids))),
+            per_user={name: options[name] for name, *_ in RELATIONS},
+        )
+
+        first_user = (User.objects.aggregate(pk=Max('pk'))['pk'] or 0) + 1
+        self.run('Пользователи', create_users, get_chunks(
+            first_user, options['users'], batch_size
+        ))
+        user_ids = list(
+            User.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        if not user_ids:
+            raise CommandError('В базе нет пользователей.')
+        state['users'] = ZipfSampler(
+            user_ids, options['zipf'], f'{seed}:users'
+        )
+
+        if options['recipes']:
+            state.update(
+                authors=state['users'],
+                ingredients=ZipfSampler(
+                    ingredient_ids, options['zipf'], f'{seed}:ingredients'
+                ),
+                tags=self.ensure_tags(options['tags']),
+                images=self.get_images(),
+            )
+            first_recipe = (
+                Recipe.objects.aggregate(pk=Max('pk'))['pk'] or 0
+            ) + 1
+            # Рецепты тяжелее: пачка меньше, чтобы процессы
+            # получили работу поровну.
+            self.run('Рецепты', create_recipes, get_chunks(
+                first_recipe, options['recipes'], max(1, batch_size // 5)
+            ))
+        recipe_ids = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        state['recipes'] = ZipfSampler(
+            recipe_ids, options['zipf'], f'{seed}:recipes'
+        )
+
+        owners = [pk for pk in user_ids if pk >= first_user] if (
+            options['users']
+        ) else user_ids
+        for name, model, *_, targets in RELATIONS:
+            if not options[name] or not state[targets].ids:
+                continue
+            per_chunk = max(1, batch_size // options[name])
+            self.run(model._meta.verbose_name_plural, create_relations, [
+                (name, number, owners[first:first + per_chunk])
+                for number, first in enumerate(
+                    range(0, len(owners), per_chunk)
+                )
+            ])
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Tag, Recipe]
+            ):
+                cursor.execute(sql)
+        self.update_counters()
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы.'))
@@ -0,0 +1,301 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import defaultdict, deque
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+
+from recipes.catalog import compile_catalog
+from recipes.management.commands.export_recipes import (FORMAT, VERSION,
+                                                        open_file)
+from recipes.management.commands.generate_fake_data import init_worker
+from recipes.management.commands.reconcile_counters import count_subquery
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+# Соответствие естественных ключей выгрузки id в этой базе:
+# заполняется до запуска пула и достаётся процессам при fork.
+state = {}
+
+
+def read_records(path):
+    """Рецепты выгрузки по одному, после проверки заголовка."""
+    with open_file(path, 'r') as file:
+        try:
+            header = json.loads(next(file))
+        except (StopIteration, ValueError):
+            header = {}
+        if header.get('format') != FORMAT or header.get('version') != VERSION:
+            raise CommandError(f'{path}: это не выгрузка export_recipes.')
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def import_batch(batch):
+    """
+    Записать пачку рецептов в одной транзакции. Новые id рецептов
+    идут подряд от first_id, поэтому связи создаются без чтения
+    id обратно, а повторный запуск пропускает записанную пачку.
+    """
+    number, first_id, records = batch
+    if Recipe.objects.filter(id=first_id).exists():
+        return number, 0
+    recipes, ingredients, tags = [], [], []
+    dates = defaultdict(list)
+    for pk, record in enumerate(records, first_id):
+        recipes.append(Recipe(
+            id=pk,
+            author_id=state['authors'][record['author']['email']],
+            name=record['name'],
+            image=record['image'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+        ))
+        dates[record['pub_date']].append(pk)
+        ingredients.extend(
+            RecipeIngredient(
+                recipe_id=pk,
+                ingredient_id=state['ingredients'][
+                    item['name'], item['measurement_unit']
+                ],
+                amount=item['amount'],
+            )
+            for item in record['ingredients']
+        )
+        tags.extend(
+            Recipe.tags.through(
+                recipe_id=pk, tag_id=state['tags'][tag['slug']]
+            )
+            for tag in record['tags']
+        )
+    with transaction.atomic():
+        Recipe.objects.bulk_create(recipes)
+        # pub_date заполняется auto_now_add при вставке.
+        for pub_date, pks in dates.items():
+            Recipe.objects.filter(id__in=pks).update(pub_date=pub_date)
+        RecipeIngredient.objects.bulk_create(ingredients)
+        Recipe.tags.through.objects.bulk_create(tags)
+    return number, len(recipes) + len(ingredients) + len(tags)
+
+
+class Checkpoint:
+    """
+    Состояние загрузки в JSON-файле рядом с выгрузкой: первый id
+    рецептов и номера записанных пачек. Файл перезаписывается
+    атомарно после каждой пачки и удаляется после успешной загрузки.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.first_id = None
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                data = json.load(file)
+            self.first_id = data['first_id']
+            self.done = set(data['done'])
+
+    def save(self):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(
+                {'first_id': self.first_id, 'done': sorted(self.done)}, file
+            )
+        os.replace(temporary, self.path)
+
+    def delete(self):
+        os.remove(self.path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка рецептов из выгрузки export_recipes (NDJSON, можно '
+        'gzip) пачками bulk_create в нескольких процессах. Авторы, теги '
+        'и ингредиенты сопоставляются по естественным ключам, '
+        'недостающие создаются; рецепты получают новые id. Прерванная '
+        'загрузка продолжается с контрольной точки при повторном запуске '
+        'с тем же файлом. Запускайте без параллельной записи рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Рецептов в одной транзакции.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Количество процессов. По умолчанию число CPU, '
+                 'для SQLite — 1: она допускает одного писателя.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки, по умолчанию PATH.checkpoint.'
+        )
+
+    def scan(self, path):
+        """Первый проход: число рецептов и все внешние ключи."""
+        count = 0
+        authors, tags, ingredients = {}, {}, set()
+        for record in read_records(path):
+            count += 1
+            authors.setdefault(record['author']['email'], record['author'])
+            for tag in record['tags']:
+                tags.setdefault(tag['slug'], tag)
+            ingredients.update(
+                (item['name'], item['measurement_unit'])
+                for item in record['ingredients']
+            )
+        return count, authors, tags, ingredients
+
+    def resolve(self, authors, tags, ingredients):
+        """Создать недостающие объекты и заполнить state."""
+        existing = set(User.objects.filter(
+            email__in=authors
+        ).values_list('email', flat=True))
+        users = []
+        for email, author in authors.items():
+            if email not in existing:
+                user = User(**author, is_active=False)
+                user.set_unusable_password()
+                users.append(user)
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        Tag.objects.bulk_create(
+            [Tag(**tag) for tag in tags.values()], ignore_conflicts=True
+        )
+        known = set(Ingredient.objects.values_list(
+            'name', 'measurement_unit'
+        ))
+        new_ingredients = ingredients - known
+        Ingredient.objects.bulk_create([
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in new_ingredients
+        ])
+        if new_ingredients:
+            compile_catalog()
+        state['authors'] = dict(User.objects.filter(
+            email__in=authors
+        ).values_list('email', 'id'))
+        state['tags'] = dict(
+            Tag.objects.filter(slug__in=tags).values_list('slug', 'id')
+        )
+        # При повторах названия берётся ингредиент с меньшим id.
+        state['ingredients'] = {
+            (name, measurement_unit): pk
+            for pk, name, measurement_unit in Ingredient.objects.order_by(
+                '-id'
+            ).values_list('id', 'name', 'measurement_unit')
+        }
+        missing = (
+            set(authors) - set(state['authors'])
+            or set(tags) - set(state['tags'])
+        )
+        if missing:
+            raise CommandError(
+                'Не удалось создать авторов или теги из-за конфликта '
+                f'уникальных полей: {", ".join(sorted(missing))}.'
+            )
+        self.stdout.write(
+            f'Создано авторов: {len(users)}, '
+            f'ингредиентов: {len(new_ingredients)}.'
+        )
+
+    def get_batches(self, path, first_id, batch_size, done):
+        batch = []
+        number = 0
+        for record in read_records(path):
+            batch.append(record)
+            if len(batch) == batch_size:
+                if number not in done:
+                    yield number, first_id + number * batch_size, batch
+                batch = []
+                number += 1
+        if batch and number not in done:
+            yield number, first_id + number * batch_size, batch
+
+    def completed(self, number, rows):
+        self.checkpoint.done.add(number)
+        self.checkpoint.save()
+        self.rows += rows
+        if time.perf_counter() - self.reported > 10:
+            self.reported = time.perf_counter()
+            self.report('Загружено')
+
+    def report(self, title):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f'{title}: пачек {len(self.checkpoint.done)} из {self.batches}, '
+            f'строк: {self.rows} за {elapsed:.1f} с '
+            f'({self.rows / max(elapsed, 1e-9):.0f} строк/с).'
+        )
+
+    def run(self, batches, workers):
+        if workers == 1:
+            init_worker()
+            for batch in batches:
+                self.completed(*import_batch(batch))
+            return
+        # Соединения родителя не должны достаться дочерним процессам.
+        connections.close_all()
+        pending = deque()
+        with multiprocessing.get_context('fork').Pool(
+            workers, initializer=init_worker
+        ) as pool:
+            # Не больше двух пачек на процесс в памяти.
+            for batch in batches:
+                pending.append(pool.apply_async(import_batch, (batch,)))
+                if len(pending) >= workers * 2:
+                    self.completed(*pending.popleft().get())
+            while pending:
+                self.completed(*pending.popleft().get())
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        workers = options['workers'] or (
+            1 if connection.vendor == 'sqlite' else os.cpu_count()
+        )
+        self.checkpoint = Checkpoint(
+            options['checkpoint'] or f'{path}.checkpoint'
+        )
+        self.started = self.reported = time.perf_counter()
+        self.rows = 0
+        count, authors, tags, ingredients = self.scan(path)
+        self.batches = -(-count // batch_size)
+        if self.checkpoint.first_id is None:
+            self.checkpoint.first_id = (
+                Recipe.objects.aggregate(pk=Max('pk'))['pk'] or 0
+            ) + 1
+            self.checkpoint.save()
+        elif self.checkpoint.done:
+            self.stdout.write(
+                f'Продолжение с контрольной точки: записано пачек '
+                f'{len(self.checkpoint.done)} из {self.batches}.'
+            )
+        self.resolve(authors, tags, ingredients)
+        self.run(self.get_batches(
+            path, self.checkpoint.first_id, batch_size, self.checkpoint.done
+        ), workers)
+        connections.close_all()
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [Recipe]
+            ):
+                cursor.execute(sql)
+        author_ids = sorted(state['authors'].values())
+        for first in range(0, len(author_ids), batch_size):
+            User.objects.filter(
+                id__in=author_ids[first:first + batch_size]
+            ).update(recipes_count=count_subquery(Recipe, 'author'))
+        self.checkpoint.delete()
+        self.report('Готово')
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов в выгрузке: {count}.'
+        ))
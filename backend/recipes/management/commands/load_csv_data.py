@@ -1,6 +1,7 @@
 import csv
 
 from django.core.management import BaseCommand
+from recipes.catalog import compile_catalog
 from recipes.models import Ingredient
 
 
@@ -14,4 +15,5 @@ class Command(BaseCommand):
             reader = csv.reader(file)
             for ingridients in reader:
                 Ingredient.objects.get_or_create(**ingridients)
+        compile_catalog()
         self.stdout.write(self.style.SUCCESS('Все данные загружены.'))
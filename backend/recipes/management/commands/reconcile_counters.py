@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import (Count, F, IntegerField, OuterRef, Q,
+                              Subquery)
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'following'),
+)
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField()
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт денормализованных счётчиков рецептов и пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одной транзакции.'
+        )
+
+    def reconcile(self, model, counter, source, field, batch_size):
+        fixed = 0
+        last_pk = 0
+        while True:
+            pks = list(model.objects.filter(pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return fixed
+            last_pk = pks[-1]
+            with transaction.atomic():
+                drift = model.objects.filter(pk__in=pks).annotate(
+                    actual=count_subquery(source, field)
+                ).filter(~Q(**{counter: F('actual')})).values_list(
+                    'pk', 'actual'
+                )
+                for pk, actual in drift:
+                    model.objects.filter(pk=pk).update(**{counter: actual})
+                    fixed += 1
+
+    def handle(self, *args, **options):
+        for model, counter, source, field in COUNTERS:
+            fixed = self.reconcile(
+                model, counter, source, field, options['batch_size']
+            )
+            self.stdout.write(
+                f'{model.__name__}.{counter}: исправлено {fixed}.'
+            )
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
@@ -20,6 +20,7 @@ class Tag(models.Model):
         verbose_name="Цвет"
     )
     slug = models.SlugField(unique=True, verbose_name="Слаг тэга",)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
 
     class Meta:
         ordering = ('id', 'name')
@@ -37,6 +38,7 @@ class Ingredient(models.Model):
     measurement_unit = models.CharField(
         "Единица измерения", max_length=LIMITATION
     )
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -76,14 +78,30 @@ class Recipe(models.Model):
         default=MIN_VALUE_COOKING_TIME,
     )
     pub_date = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
     tags = models.ManyToManyField(
         Tag,
         verbose_name="Теги",
         related_name="recipes"
     )
+    favorites_count = models.PositiveIntegerField(
+        "В избранном", default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        "В списках покупок", default=0, editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date', 'id',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', 'id'], name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', 'id'],
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -113,6 +131,13 @@ class RecipeIngredient(models.Model):
 
     class Meta:
         ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                include=['amount'],
+                name='recipe_ingredient_amount_idx'
+            ),
+        ]
         verbose_name = "Колличество ингридиентов"
         verbose_name_plural = "Колличество ингридиентов"
 
@@ -143,6 +168,11 @@ class Favorite(models.Model):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
         unique_together = [["recipe", "user"]]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'], name='favorite_user_recipe_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.recipe}"
@@ -174,6 +204,11 @@ class ShoppingCart(models.Model):
                 name="shopping_list",
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'], name='cart_user_recipe_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} {self.recipe.name}"
@@ -0,0 +1,70 @@
+"""
+Постраничный вывод в админке для больших таблиц.
+
+EstimatedCountPaginator для списка без фильтров берёт число строк
+из статистики PostgreSQL, а не из COUNT(*) по всей таблице.
+PaginatedInlineFormSet показывает связанные объекты инлайна
+страницами по per_page строк.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+
+def get_estimated_count(queryset):
+    """Оценка числа строк таблицы модели или None, если её нет."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Оценка используется, если она больше
+    ADMIN_ESTIMATED_COUNT_THRESHOLD; для небольших таблиц
+    и отфильтрованных списков считается точное число.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = get_estimated_count(queryset)
+            if (estimate is not None
+               and estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD):
+                return estimate
+        return super().count
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Формы только для одной страницы связанных объектов. Номер
+    страницы — параметр <prefix>-page адреса страницы объекта.
+    """
+
+    per_page = 20
+    page_number = None
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.page_number)
+            self._queryset = list(self.page.object_list)
+        return self._queryset
+
+    @property
+    def page_range(self):
+        self.get_queryset()
+        return self.page.paginator.get_elided_page_range(self.page.number)
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+
+def update_counter(model, pk, field, delta):
+    """
+    Атомарное изменение счётчика. Сигнал post_save отправляется после
+    INSERT, поэтому в одной транзакции с записью счётчик меняется,
+    только если запись сделана внутри transaction.atomic(): создание
+    и изменение рецепта в сериализаторе, perform_destroy, задача
+    delete_user, админка. Связи API меняет через api.toggles вместе
+    со счётчиками, минуя сигналы.
+    """
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    queryset.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipe, instance.recipe_id, 'in_carts_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def cart_deleted(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, 'in_carts_count', -1)
@@ -0,0 +1,176 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes import paginators
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.paginators import EstimatedCountPaginator, get_estimated_count
+from users.models import Follow
+
+User = get_user_model()
+
+CHANGELISTS = (
+    '/admin/recipes/recipe/',
+    '/admin/recipes/ingredient/',
+    '/admin/recipes/favorite/',
+    '/admin/recipes/shoppingcart/',
+    '/admin/recipes/tag/',
+    '/admin/recipes/recipeingredient/',
+    '/admin/users/user/',
+    '/admin/users/follow/',
+)
+
+
+@override_settings(THROTTLE_ENABLED=False, SQL_SAMPLE_RATE=0)
+class AdminTest(TestCase):
+    """Страницы админки для больших таблиц (ScalableAdmin)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', password='password'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number:02}', measurement_unit='г'
+            )
+            for number in range(45)
+        ]
+        cls.recipe = cls.create_recipe(0)
+
+    @classmethod
+    def create_recipe(cls, number):
+        user = User.objects.create_user(
+            email=f'user{number}@example.com', username=f'user{number}',
+            password='password'
+        )
+        recipe = Recipe.objects.create(
+            author=user, name=f'Рецепт {number}', image='recipe.png',
+            text='Описание', cooking_time=10
+        )
+        recipe.tags.add(cls.tag)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in cls.ingredients
+        )
+        Favorite.objects.create(user=user, recipe=recipe)
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+        Follow.objects.create(follower=user, following=cls.admin)
+        return recipe
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return len(queries)
+
+    def test_changelists(self):
+        counts = [self.count_queries(path) for path in CHANGELISTS]
+        for number in range(1, 4):
+            self.create_recipe(number)
+        self.assertEqual(
+            [self.count_queries(path) for path in CHANGELISTS], counts
+        )
+
+    def test_search_without_full_count(self):
+        for path in CHANGELISTS:
+            if path == '/admin/recipes/tag/':
+                continue
+            response = self.client.get(path, {'q': 'user1'})
+            self.assertEqual(response.status_code, 200, path)
+            self.assertFalse(response.context['cl'].show_full_result_count)
+            self.assertIsNone(response.context['cl'].full_result_count)
+
+    def test_recipe_counters(self):
+        response = self.client.get('/admin/recipes/recipe/', {'o': '-6'})
+        row = response.context['cl'].result_list[0]
+        self.assertEqual(
+            (row.favorites_count, row.in_carts_count), (1, 1)
+        )
+        self.assertContains(response, 'ингредиент 00, ингредиент 01')
+
+    def test_inline_pages(self):
+        path = f'/admin/recipes/recipe/{self.recipe.id}/change/'
+        for page, count in ((None, 20), ('3', 5), ('9', 5), ('x', 20)):
+            params = {'recipe_ingredients-page': page} if page else {}
+            response = self.client.get(path, params)
+            formset = response.context['inline_admin_formsets'][0].formset
+            self.assertEqual(formset.prefix, 'recipe_ingredients')
+            self.assertEqual(formset.initial_form_count(), count, page)
+        self.assertContains(response, '?recipe_ingredients-page=2')
+        self.assertContains(response, '45 ')
+
+    def test_ingredient_autocomplete(self):
+        for name in ('сахар', 'сахарная пудра'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+        for term, names in (('сах', ['сахар, г.', 'сахарная пудра, г.']),
+                            ('пудра', [])):
+            response = self.client.get('/admin/autocomplete/', {
+                'term': term, 'app_label': 'recipes',
+                'model_name': 'recipeingredient', 'field_name': 'ingredient',
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [item['text'] for item in response.json()['results']], names
+            )
+
+    def test_ingredient_save_compiles_catalog(self):
+        with mock.patch('recipes.admin.compile_catalog') as compile_catalog:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/admin/recipes/ingredient/add/', {
+                    'name': 'соль', 'measurement_unit': 'г',
+                })
+        self.assertTrue(Ingredient.objects.filter(name='соль').exists())
+        compile_catalog.assert_called_once_with()
+
+    def test_not_staff(self):
+        self.client.force_login(User.objects.get(username='user0'))
+        for path in CHANGELISTS:
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 302, path)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Оценка числа строк вместо COUNT(*) для больших таблиц."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(3)
+        )
+
+    def get_count(self, queryset, estimate):
+        with mock.patch.object(
+            paginators, 'get_estimated_count', return_value=estimate
+        ) as get_estimate:
+            count = EstimatedCountPaginator(queryset, 10).count
+        return count, get_estimate.called
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=100)
+    def test_count(self):
+        queryset = Ingredient.objects.order_by('id')
+        self.assertEqual(self.get_count(queryset, 5000), (5000, True))
+        self.assertEqual(self.get_count(queryset, 50), (3, True))
+        self.assertEqual(self.get_count(queryset, None), (3, True))
+        self.assertEqual(
+            self.get_count(queryset.filter(name='ингредиент 1'), 5000),
+            (1, False)
+        )
+
+    def test_estimated_count(self):
+        estimate = get_estimated_count(Ingredient.objects.all())
+        if connection.vendor == 'postgresql':
+            self.assertIsInstance(estimate, int)
+        else:
+            self.assertIsNone(estimate)
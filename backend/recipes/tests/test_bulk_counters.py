@@ -0,0 +1,70 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TransactionTestCase, override_settings
+
+from recipes.management.commands.reconcile_counters import COUNTERS
+from recipes.models import Ingredient, Recipe
+
+User = get_user_model()
+
+
+class BulkCountersTest(TransactionTestCase):
+    """
+    Команды, которые пишут через bulk_create без сигналов, сами
+    пересчитывают счётчики: reconcile_counters после них ничего
+    не исправляет.
+    """
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(20)
+        )
+
+    def assertCountersConsistent(self):
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        for model, counter, *_ in COUNTERS:
+            self.assertIn(
+                f'{model.__name__}.{counter}: исправлено 0.', out.getvalue()
+            )
+
+    def test_generate_fake_data(self):
+        call_command(
+            'generate_fake_data', users=30, recipes=60, workers=1,
+            follows=3, favorites=5, cart=2, stdout=StringIO()
+        )
+        self.assertCountersConsistent()
+        totals = Recipe.objects.aggregate(
+            favorites=Sum('favorites_count'), carts=Sum('in_carts_count')
+        )
+        self.assertGreater(totals['favorites'], 0)
+        self.assertGreater(totals['carts'], 0)
+        self.assertEqual(
+            User.objects.aggregate(total=Sum('recipes_count'))['total'], 60
+        )
+
+    def test_import_recipes(self):
+        call_command(
+            'generate_fake_data', users=10, recipes=20, workers=1,
+            follows=0, favorites=3, cart=0, stdout=StringIO()
+        )
+        path = os.path.join(settings.MEDIA_ROOT, 'recipes.ndjson')
+        call_command('export_recipes', path, stdout=StringIO())
+        call_command(
+            'import_recipes', path, batch_size=7, workers=1,
+            stdout=StringIO()
+        )
+        self.assertEqual(Recipe.objects.count(), 40)
+        self.assertCountersConsistent()
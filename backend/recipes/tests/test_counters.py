@@ -0,0 +1,113 @@
+import base64
+import io
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+def get_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class CounterTransactionTest(TestCase):
+    """Счётчики меняются в одной транзакции с записью."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author', password='password'
+        )
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='password'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def create_recipe(self):
+        return self.client.post('/api/recipes/', {
+            'ingredients': [{'id': self.ingredient.id, 'amount': 2}],
+            'tags': [self.tag.id],
+            'name': 'Рецепт',
+            'image': get_image(),
+            'text': 'Описание',
+            'cooking_time': 10,
+        }, format='json')
+
+    def assertCounter(self, obj, field, value):
+        obj.refresh_from_db()
+        self.assertEqual(getattr(obj, field), value)
+
+    def test_recipe_create_and_destroy(self):
+        response = self.create_recipe()
+        self.assertEqual(response.status_code, 201)
+        self.assertCounter(self.author, 'recipes_count', 1)
+        response = self.client.delete(
+            f'/api/recipes/{response.data["id"]}/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertCounter(self.author, 'recipes_count', 0)
+
+    def test_failed_counter_rolls_back_create(self):
+        with mock.patch(
+            'recipes.signals.update_counter', side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            self.create_recipe()
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_failed_counter_rolls_back_destroy(self):
+        recipe_id = self.create_recipe().data['id']
+        with mock.patch(
+            'recipes.signals.update_counter', side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            self.client.delete(f'/api/recipes/{recipe_id}/')
+        self.assertTrue(Recipe.objects.filter(id=recipe_id).exists())
+        self.assertCounter(self.author, 'recipes_count', 1)
+
+    def test_relation_toggles(self):
+        recipe = Recipe.objects.get(id=self.create_recipe().data['id'])
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # Повторное удаление из избранного, как и раньше, отвечает 204.
+        for url, field, missing in (
+            (f'/api/recipes/{recipe.id}/favorite/', 'favorites_count', 204),
+            (f'/api/recipes/{recipe.id}/shopping_cart/', 'in_carts_count',
+             400),
+        ):
+            self.assertEqual(client.post(url).status_code, 201)
+            self.assertEqual(client.post(url).status_code, 400)
+            self.assertCounter(recipe, field, 1)
+            self.assertEqual(client.delete(url).status_code, 204)
+            self.assertEqual(client.delete(url).status_code, missing)
+            self.assertCounter(recipe, field, 0)
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(client.post(url).status_code, 201)
+        self.assertCounter(self.author, 'followers_count', 1)
+        self.assertEqual(client.delete(url).status_code, 204)
+        self.assertCounter(self.author, 'followers_count', 0)
@@ -0,0 +1,176 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+
+from recipes.management.commands import import_recipes
+from recipes.management.commands.export_recipes import GZIP_MAGIC, open_file
+from recipes.models import Favorite, Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+class ExportImportTest(TransactionTestCase):
+    """Перенос рецептов export_recipes и import_recipes."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        path_settings = override_settings(
+            MEDIA_ROOT=self.directory,
+            INGREDIENT_CATALOG_PATH=os.path.join(self.directory, 'catalog'),
+        )
+        path_settings.enable()
+        self.addCleanup(path_settings.disable)
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(20)
+        )
+        call_command(
+            'generate_fake_data', users=10, recipes=25, workers=1,
+            follows=0, favorites=3, cart=2, stdout=StringIO()
+        )
+
+    def export(self, name='recipes.ndjson'):
+        path = os.path.join(self.directory, name)
+        call_command('export_recipes', path, stdout=StringIO())
+        return path
+
+    def read(self, path):
+        """Записи выгрузки без id рецептов: они меняются при загрузке."""
+        with open_file(path, 'r') as file:
+            lines = [json.loads(line) for line in file]
+        for record in lines[1:]:
+            del record['id']
+        return lines
+
+    def import_(self, path, **options):
+        out = StringIO()
+        call_command(
+            'import_recipes', path, batch_size=7, workers=1, stdout=out,
+            **options
+        )
+        return out.getvalue()
+
+    def clear(self):
+        """Другая база: без рецептов и авторов, у ингредиентов новые id."""
+        Recipe.objects.all().delete()
+        User.objects.all().delete()
+        Tag.objects.all().delete()
+        names = list(Ingredient.objects.order_by('-id').values_list(
+            'name', 'measurement_unit'
+        ))
+        Ingredient.objects.all().delete()
+        for name, measurement_unit in names:
+            Ingredient.objects.create(
+                name=name, measurement_unit=measurement_unit
+            )
+
+    def assertCountersConsistent(self):
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertNotRegex(out.getvalue(), r'исправлено [1-9]')
+
+    def test_round_trip(self):
+        path = self.export()
+        exported = self.read(path)
+        self.assertEqual(len(exported), 26)
+        authors = {record['author']['email'] for record in exported[1:]}
+        self.clear()
+        out = self.import_(path)
+        self.assertIn(
+            f'Создано авторов: {len(authors)}, ингредиентов: 0.', out
+        )
+        self.assertIn('пачек 4 из 4', out)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+        self.assertEqual(self.read(self.export('again.ndjson')), exported)
+
+        for author in User.objects.all():
+            self.assertFalse(author.is_active)
+            self.assertFalse(author.has_usable_password())
+            self.assertEqual(
+                author.recipes_count,
+                Recipe.objects.filter(author=author).count()
+            )
+        # Избранное и списки покупок не переносятся.
+        self.assertFalse(Recipe.objects.exclude(
+            favorites_count=0, in_carts_count=0
+        ).exists())
+        self.assertCountersConsistent()
+
+        # Последовательность id сдвинута за загруженные рецепты.
+        recipe = Recipe.objects.create(
+            author=User.objects.first(), name='Новый', image='recipe.png',
+            text='Описание', cooking_time=5
+        )
+        self.assertFalse(Recipe.objects.filter(id__gt=recipe.id).exists())
+
+    def test_into_database_with_data(self):
+        path = self.export()
+        counts = dict(User.objects.values_list('email', 'recipes_count'))
+        favorites = dict(Recipe.objects.values_list('id', 'favorites_count'))
+        self.import_(path)
+        self.assertEqual(Recipe.objects.count(), 50)
+        self.assertEqual(
+            dict(User.objects.values_list('email', 'recipes_count')),
+            {email: count * 2 for email, count in counts.items()}
+        )
+        self.assertEqual(Favorite.objects.count(), sum(favorites.values()))
+        for pk, count in favorites.items():
+            self.assertEqual(Recipe.objects.get(pk=pk).favorites_count, count)
+        self.assertCountersConsistent()
+
+    def test_gzip(self):
+        path = self.export('recipes.ndjson.gz')
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(2), GZIP_MAGIC)
+        exported = self.read(path)
+        self.clear()
+        self.import_(path)
+        self.assertEqual(self.read(self.export('again.ndjson')), exported)
+
+    def test_resume(self):
+        path = self.export()
+        exported = self.read(path)
+        self.clear()
+        import_batch = import_recipes.import_batch
+
+        def fail_third(batch):
+            if batch[0] == 2:
+                raise RuntimeError
+            return import_batch(batch)
+
+        with mock.patch.object(
+            import_recipes, 'import_batch', side_effect=fail_third
+        ):
+            with self.assertRaises(RuntimeError):
+                self.import_(path)
+        self.assertEqual(Recipe.objects.count(), 14)
+        # Пачка 1 записана, но упала до сохранения контрольной точки.
+        checkpoint = f'{path}.checkpoint'
+        with open(checkpoint, encoding='utf-8') as file:
+            state = json.load(file)
+        self.assertEqual(state['done'], [0, 1])
+        state['done'] = [0]
+        with open(checkpoint, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+
+        out = self.import_(path)
+        self.assertIn('записано пачек 1 из 4', out)
+        self.assertEqual(self.read(self.export('again.ndjson')), exported)
+        self.assertFalse(os.path.exists(checkpoint))
+        self.assertCountersConsistent()
+
+    def test_not_an_export(self):
+        path = os.path.join(self.directory, 'other.ndjson')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('{"format": "other"}\n')
+        with self.assertRaisesMessage(CommandError, 'это не выгрузка'):
+            self.import_(path)
+        self.assertEqual(Recipe.objects.count(), 25)
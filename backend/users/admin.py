@@ -1,15 +1,19 @@
 from django.contrib import admin
 
+from recipes.admin import ScalableAdmin
+
 from .models import Follow, User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(ScalableAdmin):
     list_display = (
         'email',
         'username',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
     )
     search_fields = (
         'email',
@@ -19,17 +23,16 @@ class UserAdmin(admin.ModelAdmin):
     )
     exclude = ('password',)
     ordering = ('username', )
-    empty_value_display = '-пусто-'
 
 
 @admin.register(Follow)
-class FollownAdmin(admin.ModelAdmin):
+class FollownAdmin(ScalableAdmin):
     list_display = ['follower', 'following']
+    list_select_related = ('follower', 'following')
     search_fields = [
-        'following__username',
-        'following__email',
-        'follower__username',
-        'follower__email'
+        '=following__username',
+        '=following__email',
+        '=follower__username',
+        '=follower__email'
     ]
-    list_filter = ['following__username', 'follower__username']
-    empty_value_display = '-пусто-'
+    autocomplete_fields = ('follower', 'following')
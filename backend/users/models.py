@@ -22,6 +22,12 @@ class User(AbstractUser):
         max_length=150,
         unique=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False
+    )
 
     class Meta:
         ordering = ('username',)